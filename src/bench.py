@@ -0,0 +1,440 @@
+import base64
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# --------- 性能基准 ---------
+# 直接导入真实模块，对热点路径计时；涉及网络的阶段对本地 HTTP 替身测量，替身可按路由注入延迟、
+# 错误状态码和断连。结果写成 JSON（含提交号与环境），可用 compare 对比两次提交之间的差异。
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+class Context:
+    # scale 按比例缩放数据规模，便于在测试里快速跑通；repeat 为每项的计时次数
+    def __init__(self, work_dir, scale=1.0, repeat=5):
+        self.work_dir = Path(work_dir)
+        self.scale = scale
+        self.repeat = repeat
+
+    def size(self, n):
+        return max(1, int(n * self.scale))
+
+    def path(self, name):
+        return self.work_dir / name
+
+    def measure(self, fn, setup=None, repeat=None):
+        # setup 的耗时不计入；有 setup 时其返回值作为 fn 的参数
+        runs = []
+        for _ in range(repeat or self.repeat):
+            arg = setup() if setup else None
+            start = time.perf_counter()
+            fn(arg) if setup else fn()
+            runs.append(time.perf_counter() - start)
+        return runs
+
+
+class Skip(Exception):
+    pass
+
+
+# --------- 本地 HTTP 替身 ---------
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        name = self.path.lstrip("/").split("/", 1)[0]
+        route = stand_in.routes.get(name)
+        stand_in.hits[name] += 1
+        if route is None:
+            route = {"status": 404, "body": b"", "delay": 0, "drop": False, "etag": None}
+        if route["delay"]:
+            time.sleep(route["delay"])
+        if route["drop"]:
+            # 不回应直接断开，模拟代理/镜像中途掉线
+            self.close_connection = True
+            return
+        if route["etag"] and self.headers.get("If-None-Match") == route["etag"]:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(route["status"])
+        if route["etag"]:
+            self.send_header("ETag", route["etag"])
+        self.send_header("Content-Length", str(len(route["body"])))
+        self.end_headers()
+        self.wfile.write(route["body"])
+
+    def log_message(self, *args):
+        pass
+
+
+class StandIn:
+    # 按路径第一段选择行为：route("slow", delay=0.2) 之后 http://127.0.0.1:port/slow/... 都走这条规则
+    def __init__(self):
+        self.routes = {}
+        self.hits = Counter()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def route(self, name, body=b"", status=200, delay=0.0, drop=False, etag=None):
+        self.routes[name] = {"body": body, "status": status, "delay": delay, "drop": drop, "etag": etag}
+        return f"{self.base}/{name}/"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _QuietHost:
+    def log(self, msg):
+        pass
+
+    def notify(self, kind, title, text):
+        pass
+
+    def ask_text(self, title, prompt):
+        return "", False
+
+
+# --------- 测试数据 ---------
+def _lp(s):
+    return bytes([len(s)]) + s.encode()
+
+
+def make_stamp(proto, props, addr):
+    raw = bytes([proto]) + props.to_bytes(8, "little") + _lp(addr)
+    if proto == 0x01:
+        raw += _lp("k" * 32) + _lp("2.dnscrypt-cert.example")
+    elif proto == 0x02:
+        raw += b"\x00" + _lp("dns.example.org") + _lp("/dns-query")
+    elif proto == 0x03:
+        raw += b"\x00" + _lp("dot.example.org")
+    return "sdns://" + base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def synthetic_resolvers(n, seed=0):
+    # 与 public-resolvers.md 相同结构的 n 条记录
+    rnd = random.Random(seed)
+    countries = ("nl", "de", "fr", "us", "jp", "sg", "ca", "se", "ch", "uk")
+    parts = ["# public-resolvers\n\nSynthetic list for benchmarks.\n\n--\n"]
+    for i in range(n):
+        proto = rnd.choice((0x01, 0x02, 0x03))
+        addr = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:443"
+        parts.append(f"\n## bench-{rnd.choice(countries)}-{i}\n\nSynthetic resolver #{i}. Non-logging, DNSSEC.\n\n"
+                     f"{make_stamp(proto, rnd.randrange(8), addr)}\n")
+    return "".join(parts)
+
+
+def synthetic_config(tables, seed=0):
+    # 仿 dnscrypt-proxy.toml：大量注释、数组与 [static.'名称'] 表
+    rnd = random.Random(seed)
+    lines = ["##############################################", "#  dnscrypt-proxy configuration (benchmark)  #",
+             "##############################################", "",
+             "server_names = ['cloudflare', 'quad9']", "listen_addresses = ['127.0.0.1:53']",
+             "max_clients = 250", "# cache_size = 4096", "ipv4_servers = true", "ipv6_servers = false", ""]
+    for i in range(tables):
+        lines.append(f"## 说明 {i}: " + "x" * rnd.randrange(20, 80))
+        lines.append(f"[static.'bench-{i}']")
+        lines.append(f"  stamp = '{make_stamp(0x02, 7, f'10.0.{i >> 8 & 255}.{i & 255}:443')}'")
+        lines.append("")
+    lines += ["[query_log]", "  file = '/var/log/dnscrypt-proxy/query.log'", "  format = 'tsv'", ""]
+    return "\n".join(lines)
+
+
+def _release_tree(root, binary_size, seed=0):
+    base = Path(root) / "linux-x86_64"
+    base.mkdir(parents=True)
+    (base / "dnscrypt-proxy").write_bytes(random.Random(seed).randbytes(binary_size))
+    for name in ("LICENSE", "example-dnscrypt-proxy.toml", "example-blocked-names.txt", "example-cloaking-rules.txt",
+                 "example-forwarding-rules.txt", "localhost.pem"):
+        (base / name).write_text(synthetic_config(50) if name.endswith(".toml") else name * 2000, encoding="utf-8")
+    return base
+
+
+# --------- 基准项 ---------
+@benchmark("resolvers_parse")
+def bench_resolvers_parse(ctx):
+    import stamps
+    from resolvers import ResolverIndex, iter_resolvers
+    n = ctx.size(10000)
+    lines = synthetic_resolvers(n).splitlines()
+    # 每次清空印章解码缓存，测冷启动解析
+    runs = ctx.measure(lambda _: ResolverIndex(iter_resolvers(lines)), setup=stamps.clear_cache)
+    return runs, {"entries": n}
+
+
+@benchmark("populate_serverlist")
+def bench_populate_serverlist(ctx):
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication, QCheckBox, QComboBox, QTableView
+        from dnscrypt_gui_final import DNSCryptGui
+    except ImportError as e:
+        raise Skip(f"缺少 PyQt5: {e}")
+    from latency import ProbeResult
+    from resolvers import ResolverIndex, iter_resolvers
+    from server_model import ServerFilterProxy, ServerTableModel
+    app = QApplication.instance() or QApplication([])
+    n = ctx.size(10000)
+    index = ResolverIndex(iter_resolvers(synthetic_resolvers(n).splitlines()))
+    rnd = random.Random(0)
+
+    # 只借用界面上的真实方法，不启动整个窗口（避免后台线程与网络）
+    class ListHost:
+        populate_serverlist = DNSCryptGui.populate_serverlist
+        apply_attr_filter = DNSCryptGui.apply_attr_filter
+
+    host = ListHost()
+    host.servers = index
+    host.latency = {}
+    for r in index:
+        if rnd.random() < 0.5:
+            result = host.latency[r.name] = ProbeResult(r.name)
+            result.samples = [rnd.uniform(0.01, 0.5) for _ in range(3)]
+    host.server_model = ServerTableModel()
+    host.server_proxy = ServerFilterProxy()
+    host.server_proxy.setSourceModel(host.server_model)
+    host.proto_filter = QComboBox()
+    host.proto_filter.addItem("全部协议")
+    host.dnssec_filter, host.nolog_filter, host.nofilter_filter = QCheckBox(), QCheckBox(), QCheckBox()
+    host.server_list = QTableView()
+    host.server_list.setModel(host.server_proxy)
+    host.server_list.setSortingEnabled(True)
+    selected = [r.name for r in list(index)[::50]]
+
+    def run():
+        host.populate_serverlist(selected)
+        app.processEvents()
+
+    runs = ctx.measure(run)
+    return runs, {"entries": n, "with_latency": len(host.latency)}
+
+
+@benchmark("config_rewrite")
+def bench_config_rewrite(ctx):
+    from core import write_server_names
+    from toml_config import tomllib
+    tables = ctx.size(5000)
+    path = ctx.path("dnscrypt-proxy.toml")
+    path.write_text(synthetic_config(tables), encoding="utf-8")
+    names = [[f"bench-{i}", f"bench-{i + 1}", "cloudflare"] for i in range(ctx.repeat)]
+    it = iter(names)
+
+    def run():
+        ok, err = write_server_names(path, next(it))
+        if not ok:
+            raise RuntimeError(err)
+
+    # 每次都写入不同的值，确保真的发生改写和原子替换
+    runs = ctx.measure(run)
+    text = path.read_text(encoding="utf-8")
+    if tomllib.loads(text)["server_names"] != names[-1]:
+        raise RuntimeError("配置改写结果不正确")
+    return runs, {"tables": tables, "bytes": len(text.encode())}
+
+
+@benchmark("proxy_detection")
+def bench_proxy_detection(ctx):
+    from http_client import HttpClient
+    from proxy_manager import ProxyManager
+    stand_in = StandIn()
+    try:
+        body = json.dumps({"tag_name": "2.1.5", "assets": []}).encode()
+        prefixes = [
+            stand_in.route("dead", drop=True),
+            stand_in.route("broken", status=502),
+            stand_in.route("slow", body=body, delay=0.3),
+            stand_in.route("fast", body=body, delay=0.05),
+            stand_in.route("medium", body=body, delay=0.15),
+        ]
+        client = HttpClient()
+        manager = ProxyManager(_QuietHost(), score_path=ctx.path("proxy_scores.json"), client=client)
+        winners = []
+        runs = ctx.measure(lambda: winners.append(manager.race(prefixes)))
+        client.close()
+    finally:
+        stand_in.close()
+    if any(w != prefixes[3] for w in winners):
+        raise RuntimeError(f"竞速结果不正确: {winners}")
+    return runs, {"candidates": len(prefixes), "injected_latency": 0.05}
+
+
+@benchmark("list_fetch")
+def bench_list_fetch(ctx):
+    from http_client import HttpClient
+    from resolver_cache import ResolverCache
+    n = ctx.size(2000)
+    stand_in = StandIn()
+    try:
+        urls = [
+            stand_in.route("down", drop=True) + "public-resolvers.md",
+            stand_in.route("error", status=503) + "public-resolvers.md",
+            stand_in.route("mirror", body=synthetic_resolvers(n).encode(), delay=0.1, etag='"v1"') +
+            "public-resolvers.md",
+        ]
+        # 不重试，只测本项目的回退与解析路径，不把 urllib3 的退避时间算进去
+        client = HttpClient(retries=0)
+        statuses = []
+
+        def fresh():
+            path = ctx.path("resolvers_cache.json")
+            if path.exists():
+                path.unlink()
+            return ResolverCache(path, urls, client=client)
+
+        runs = ctx.measure(lambda cache: statuses.append(cache.refresh(timeout=5)[0]), setup=fresh)
+        client.close()
+    finally:
+        stand_in.close()
+    if set(statuses) != {"modified"}:
+        raise RuntimeError(f"拉取结果不正确: {statuses}")
+    return runs, {"entries": n, "mirrors": len(urls), "injected_latency": 0.1}
+
+
+@benchmark("archive_extraction")
+def bench_archive_extraction(ctx):
+    from version_store import extract_archive
+    size = ctx.size(12 * 1024 * 1024)
+    src = _release_tree(ctx.path("release"), size)
+    results = {}
+    for fmt in ("tar.gz", "zip"):
+        archive = ctx.path(f"dnscrypt-proxy.{fmt}")
+        if fmt == "zip":
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+                for p in src.iterdir():
+                    z.write(p, f"{src.name}/{p.name}")
+        else:
+            with tarfile.open(archive, "w:gz") as t:
+                t.add(src, arcname=src.name)
+
+        def fresh():
+            out = ctx.path("extract")
+            if out.exists():
+                shutil.rmtree(out)
+            out.mkdir()
+            return out
+
+        results[fmt] = ctx.measure(lambda out: extract_archive(archive, out), setup=fresh)
+    # 以 tar.gz（Linux 发行包格式）为主结果，zip 附在 extra 中
+    return results["tar.gz"], {"binary_bytes": size, "zip": summarize(results["zip"])}
+
+
+# --------- 运行与对比 ---------
+def summarize(runs):
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+        "max": max(runs),
+    }
+
+
+def _git_commit():
+    try:
+        r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+        return r.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(names=None, scale=1.0, repeat=5, log=None):
+    names = names or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"未知的基准项: {', '.join(unknown)}")
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": scale,
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    for name in names:
+        work_dir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+        try:
+            runs, extra = BENCHMARKS[name](Context(work_dir, scale, repeat))
+            entry = dict(summarize(runs), runs=runs, extra=extra)
+        except Skip as e:
+            entry = {"skipped": str(e)}
+        except Exception as e:
+            entry = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        report["results"][name] = entry
+        if log:
+            log(format_entry(name, entry))
+    return report
+
+
+def format_entry(name, entry):
+    if "skipped" in entry:
+        return f"{name:<22} 跳过: {entry['skipped']}"
+    if "error" in entry:
+        return f"{name:<22} 失败: {entry['error']}"
+    return (f"{name:<22} 中位 {entry['median'] * 1000:9.1f} ms  最小 {entry['min'] * 1000:9.1f} ms  "
+            f"最大 {entry['max'] * 1000:9.1f} ms")
+
+
+def compare(base, current, threshold=0.2):
+    # 按中位数对比两份报告；返回 (文本行, 回退的基准项)
+    rows = [("基准项", "基线(ms)", "当前(ms)", "变化")]
+    regressions = []
+    for name, entry in current["results"].items():
+        old = base.get("results", {}).get(name, {})
+        if "median" not in entry or "median" not in old:
+            rows.append((name, _fmt_ms(old.get("median")), _fmt_ms(entry.get("median")), "-"))
+            continue
+        ratio = entry["median"] / old["median"] - 1 if old["median"] else 0.0
+        flag = ""
+        if ratio > threshold:
+            flag = "  回退"
+            regressions.append(name)
+        rows.append((name, _fmt_ms(old["median"]), _fmt_ms(entry["median"]), f"{ratio * 100:+.1f}%{flag}"))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() for row in rows]
+    return lines, regressions
+
+
+def _fmt_ms(value):
+    return "-" if value is None else f"{value * 1000:.1f}"
+
+
+def save(report, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
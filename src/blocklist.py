@@ -0,0 +1,308 @@
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import metrics
+
+# --------- blocked_names 拦截列表编译 ---------
+# 每个来源逐行解析、规范化为键（域名按字符反转、"." 换成空格：ads.example.com -> "moc elpmaxe sda"），
+# 分块排序写成有序的 run 文件，来源内容哈希不变时直接复用。最终对所有 run 做一次多路归并：父域名排在
+# 其所有子域名之前，只需记住最近保留的父域名即可在顺序扫描中去掉被覆盖的子域名，内存占用与条目总数无关。
+#
+# dnscrypt-proxy 中普通名称同时匹配自身与所有子域名；"=name" 只匹配自身；含其它通配符的模式原样保留。
+CHUNK = 500000
+_SEP = " "  # 低于域名中所有合法字符，保证子域名紧跟在父域名之后
+_EXACT = "\x1f="  # 介于换行与 _SEP 之间：同名的精确匹配排在后缀匹配之后、子域名之前
+_NAME = re.compile(r"[a-z0-9_-]+(?:\.[a-z0-9_-]+)+")
+_HOST_IPS = {"0.0.0.0", "127.0.0.1", "::", "::1", "0", "255.255.255.255", "fe80::1%lo0", "ff00::0", "ff02::1",
+             "ff02::2", "ff02::3"}
+_HOST_SKIP = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost", "ip6-loopback",
+              "ip6-localnet", "ip6-mcastprefix", "ip6-allnodes", "ip6-allrouters", "ip6-allhosts", "0.0.0.0"}
+
+
+def _domain(name):
+    name = name.strip(".").lower()
+    if not name.isascii():
+        try:
+            name = name.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    if len(name) > 253 or not _NAME.fullmatch(name):
+        return None
+    return name
+
+
+def to_key(name, exact=False):
+    key = name[::-1].replace(".", _SEP)
+    return key + _EXACT if exact else key
+
+
+def from_key(key):
+    key = key.rstrip("\n")
+    if key.endswith(_EXACT):
+        return "=" + key[:-len(_EXACT)][::-1].replace(_SEP, ".")
+    return key[::-1].replace(_SEP, ".")
+
+
+def parse_line(line):
+    # 返回 ("key", 键) / ("pattern", 原样模式) / None；支持纯域名、"=域名"、"*.域名" 与 "||域名^"
+    line = line.split("#", 1)[0].strip()
+    if not line or line.startswith("!"):
+        return None
+    if line.startswith("||"):
+        if not line.endswith("^"):
+            return None
+        name = _domain(line[2:-1])
+        return ("key", to_key(name)) if name else None
+    if len(line.split()) > 1:
+        return None
+    if line.startswith("="):
+        name = _domain(line[1:])
+        return ("key", to_key(name, exact=True)) if name else None
+    if line.startswith("*.") and "*" not in line[2:]:
+        line = line[2:]
+    if "*" in line or "[" in line:
+        return ("pattern", line.lower())
+    name = _domain(line)
+    return ("key", to_key(name)) if name else None
+
+
+def iter_keys(lines, patterns):
+    # 逐行产出键，通配模式收集到 patterns；hosts 行走快速路径（IP 后可跟多个主机名）
+    for line in lines:
+        if "#" in line:
+            line = line.split("#", 1)[0]
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) > 1 and (parts[0] in _HOST_IPS or ":" in parts[0] or parts[0].replace(".", "").isdigit()):
+            for host in parts[1:]:
+                host = host.lower()
+                if host in _HOST_SKIP:
+                    continue
+                if host.isascii() and _NAME.fullmatch(host) and len(host) <= 253:
+                    yield host[::-1].replace(".", _SEP)
+                else:
+                    name = _domain(host)
+                    if name:
+                        yield to_key(name)
+            continue
+        entry = parse_line(line)
+        if entry is None:
+            continue
+        if entry[0] == "pattern":
+            patterns.add(entry[1])
+        else:
+            yield entry[1]
+
+
+def _write_run(keys, path):
+    with open(path, "w", encoding="utf-8") as f:
+        if keys:
+            f.write("\n".join(sorted(set(keys))))
+            f.write("\n")
+
+
+def sort_runs(lines, prefix, chunk=CHUNK):
+    # 按块排序去重，每块写成一个有序的 run 文件，最终由 merge 统一多路归并；返回 (run 文件列表, 键数, 模式集合)
+    runs = []
+    count = 0
+    patterns = set()
+    keys = iter_keys(lines, patterns)
+    try:
+        while True:
+            block = list(itertools.islice(keys, chunk))
+            if not block and runs:
+                break
+            runs.append(f"{prefix}.{len(runs)}.keys")
+            count += len(block)
+            _write_run(block, runs[-1])
+            if len(block) < chunk:
+                break
+    except BaseException:
+        for r in runs:
+            if os.path.exists(r):
+                os.unlink(r)
+        raise
+    return runs, count, patterns
+
+
+def compress(lines, counts=None):
+    # lines: 有序、以换行结尾的键；去重并丢弃被父域名（或同名后缀规则）覆盖的条目，直接产出输出行。
+    # 这是编译中最热的循环，去重、压缩、还原域名合在一起做
+    counts = {} if counts is None else counts
+    exact = _EXACT + "\n"
+    last = None
+    parent = ("\n",)
+    unique = written = 0
+    try:
+        for key in lines:
+            if key == last:
+                continue
+            last = key
+            unique += 1
+            if key.startswith(parent):
+                continue
+            written += 1
+            if key.endswith(exact):
+                yield "=" + key[-len(exact) - 1::-1].replace(_SEP, ".") + "\n"
+            else:
+                parent = (key[:-1] + _SEP, key[:-1] + _EXACT)
+                yield key[-2::-1].replace(_SEP, ".") + "\n"
+    finally:
+        counts["unique"] = unique
+        counts["written"] = written
+
+
+class BlocklistCompiler:
+    def __init__(self, work_dir, client=None, chunk=CHUNK):
+        self.work_dir = Path(work_dir)
+        self.client = client
+        self.chunk = chunk
+        self.manifest_path = self.work_dir / "manifest.json"
+        self.manifest = {"sources": {}, "output": None}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data.get("sources"), dict):
+                self.manifest = data
+        except (OSError, ValueError):
+            pass
+
+    def save_manifest(self):
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def fetch(self, source, dest):
+        # 把来源内容落到本地文件并计算哈希；URL 带 ETag 条件请求，304 返回 None
+        h = hashlib.sha256()
+        prev = self.manifest["sources"].get(source, {})
+        if re.match(r"^https?://", source):
+            if self.client is None:
+                from http_client import get_client
+                self.client = get_client()
+            headers = {"If-None-Match": prev["etag"]} if prev.get("etag") and _usable(prev) else {}
+            with self.client.get(source, headers=headers, stream=True, timeout=30) as r:
+                if r.status_code == 304:
+                    return None, prev.get("etag")
+                r.raise_for_status()
+                with open(dest, "wb") as f:
+                    for chunk in r.iter_content(256 * 1024):
+                        f.write(chunk)
+                        h.update(chunk)
+                return h.hexdigest(), r.headers.get("ETag")
+        with open(source, "rb") as src, open(dest, "wb") as f:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                f.write(chunk)
+                h.update(chunk)
+        return h.hexdigest(), None
+
+    def refresh_source(self, source, log):
+        # 返回该来源的清单项；内容未变时不重新解析排序
+        keys_dir = self.work_dir / "sources"
+        keys_dir.mkdir(parents=True, exist_ok=True)
+        prev = self.manifest["sources"].get(source, {})
+        raw = keys_dir / f".{os.getpid()}.{threading.get_ident()}.raw"
+        try:
+            digest, etag = self.fetch(source, raw)
+            if _usable(prev) and digest in (None, prev.get("sha256")):
+                log(f"{source}: 未变化，复用上次结果（{prev.get('count', 0)} 条）")
+                return dict(prev, etag=etag or prev.get("etag")), False
+            with open(raw, "r", encoding="utf-8", errors="replace") as f:
+                # 文件名带上来源标识，内容相同的两个来源不会共用 run 文件
+                prefix = keys_dir / f"{hashlib.sha256(source.encode()).hexdigest()[:12]}-{digest[:16]}"
+                runs, count, patterns = sort_runs(f, str(prefix), self.chunk)
+        finally:
+            if raw.exists():
+                raw.unlink()
+        _discard(prev, keep=runs)
+        log(f"{source}: {count} 条域名，{len(patterns)} 条通配模式")
+        return {"sha256": digest, "etag": etag, "runs": runs, "count": count, "patterns": sorted(patterns)}, True
+
+    def build(self, sources, output, log=print, force=False):
+        with metrics.span("blocklist.build", sources=len(sources)) as attrs:
+            stats = self.compile(sources, output, log, force)
+            attrs.update(changed=stats.get("changed"), written=stats.get("written"))
+            return stats
+
+    def compile(self, sources, output, log=print, force=False):
+        start = time.monotonic()
+        output = Path(output)
+        changed = force or not output.exists() or self.manifest.get("output") != str(output)
+        entries = {}
+        for source in sources:
+            try:
+                entries[source], modified = self.refresh_source(source, log)
+                changed = changed or modified
+            except Exception as e:
+                prev = self.manifest["sources"].get(source)
+                if not _usable(prev):
+                    raise
+                log(f"{source}: 获取失败（{e}），沿用上次结果")
+                entries[source] = prev
+        if set(entries) != set(self.manifest["sources"]):
+            changed = True
+        for source, entry in self.manifest["sources"].items():
+            if source not in entries:
+                _discard(entry)
+        self.manifest["sources"] = entries
+        if not changed:
+            self.save_manifest()
+            stats = dict(self.manifest.get("stats") or {}, changed=False)
+            log(f"所有来源均未变化，保留 {output}")
+            return stats
+        stats = self.merge(entries, output)
+        stats["seconds"] = round(time.monotonic() - start, 3)
+        self.manifest["output"] = str(output)
+        self.manifest["stats"] = stats
+        self.save_manifest()
+        log(f"编译完成：输入 {stats['input']} 条，写出 {stats['written']} 条（去掉 {stats['covered']} 条被父域名覆盖的），"
+            f"耗时 {stats['seconds']} 秒")
+        return dict(stats, changed=True)
+
+    def merge(self, entries, output):
+        # 所有来源的 run 文件一次多路归并：去重、压缩后直接写出，全程只在内存中保留每个 run 的当前行
+        output.parent.mkdir(parents=True, exist_ok=True)
+        patterns = sorted({p for e in entries.values() for p in e.get("patterns", ())})
+        total = sum(e.get("count", 0) for e in entries.values())
+        counts = {}
+        tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+        files = [open(r, "r", encoding="utf-8") for e in entries.values() for r in e["runs"]]
+        try:
+            with open(tmp, "w", encoding="utf-8") as out:
+                out.write(f"# 由 dnscrypt_gui 生成，来源 {len(entries)} 个，请勿手动编辑\n")
+                out.writelines(p + "\n" for p in patterns)
+                out.writelines(compress(heapq.merge(*files), counts))
+                out.flush()
+                os.fsync(out.fileno())
+            if output.exists():
+                shutil.copymode(output, tmp)
+            os.replace(tmp, output)
+        finally:
+            for f in files:
+                f.close()
+            if tmp.exists():
+                tmp.unlink()
+        return {"sources": len(entries), "input": total, "unique": counts["unique"],
+                "covered": counts["unique"] - counts["written"], "written": counts["written"] + len(patterns),
+                "patterns": len(patterns)}
+
+
+def _usable(entry):
+    return bool(entry and entry.get("runs")) and all(os.path.exists(r) for r in entry["runs"])
+
+
+def _discard(entry, keep=()):
+    for r in (entry or {}).get("runs", ()):
+        if r not in keep and os.path.exists(r):
+            os.unlink(r)
@@ -0,0 +1,404 @@
+import argparse
+import json
+import os
+import sys
+
+# --------- 命令行 / 无界面模式 ---------
+# 顶层只导入标准库和轻量的 core；各子命令需要的网络、下载、Qt 等模块在命令内部才导入，
+# 以保证 cron、配置管理工具批量调用时冷启动足够快。
+
+
+def make_host(args):
+    from core import ConsoleHost
+    return ConsoleHost(verbose=not args.quiet, interactive=False)
+
+
+def apply_proxy(args):
+    # --proxy 指定时直接使用，"none" 表示直连；否则沿用上次检测出的代理（不重新探测）
+    from http_client import get_client
+    client = get_client()
+    if args.proxy:
+        client.proxy_prefix = None if args.proxy == "none" else args.proxy
+        return client
+    from proxy_manager import ProxyScoreStore
+    from core import APP_DIR
+    client.proxy_prefix = ProxyScoreStore(APP_DIR / "proxy_scores.json").fresh_winner()
+    return client
+
+
+def config_path(args):
+    from core import detect_config_path
+    path = args.config or detect_config_path()
+    if not path:
+        print("未找到 dnscrypt-proxy.toml，请用 --config 指定", file=sys.stderr)
+    return path
+
+
+def cmd_detect_proxy(args):
+    from proxy_manager import ProxyManager
+    host = make_host(args)
+    manager = ProxyManager(host)
+    if args.fresh:
+        prefix = manager.race([p["prefix"] for p in manager.proxy_list])
+        if prefix:
+            manager.scores.set_winner(prefix)
+        manager.scores.save()
+    else:
+        prefix = manager.current_proxy if manager.auto_detect() else None
+    if not prefix:
+        print("没有可用的代理", file=sys.stderr)
+        return 1
+    print(prefix)
+    return 0
+
+
+def cmd_resolvers(args):
+    from core import APP_DIR, SERVER_LIST_URLS
+    from resolver_cache import ResolverCache
+    client = apply_proxy(args)
+    cache = ResolverCache(APP_DIR / "resolvers_cache.json", SERVER_LIST_URLS, client=client)
+    index = cache.load()
+    if args.refresh or index is None:
+        status, index = cache.refresh()
+        if status == "failed" and not index:
+            print("获取服务器列表失败", file=sys.stderr)
+            return 1
+    flag = lambda v: True if v else None
+    records = index.filter(proto=args.proto, country=args.country, dnssec=flag(args.dnssec),
+                           nolog=flag(args.nolog), nofilter=flag(args.nofilter))
+    if args.grep:
+        needle = args.grep.lower()
+        records = [r for r in records if needle in f"{r.name} {r.description}".lower()]
+    if args.json:
+        json.dump([
+            {"name": r.name, "protocol": r.protocol, "address": r.address, "country": r.country,
+             "dnssec": r.dnssec, "nolog": r.nolog, "nofilter": r.nofilter}
+            for r in records
+        ], sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.names:
+        print("\n".join(r.name for r in records))
+    else:
+        for r in records:
+            flags = "".join(c if v else "-" for c, v in (("D", r.dnssec), ("L", r.nolog), ("F", r.nofilter)))
+            print(f"{r.name}\t{r.protocol}\t{r.country or '-'}\t{flags}\t{r.address}")
+    return 0
+
+
+def cmd_install(args):
+    from installer import DNSCryptInstaller
+    host = make_host(args)
+    installer = DNSCryptInstaller(host, client=apply_proxy(args))
+    if args.rollback:
+        return 0 if installer.rollback() else 1
+    return 0 if installer.install() else 1
+
+
+def cmd_set_servers(args):
+    from core import write_server_names
+    path = config_path(args)
+    if not path:
+        return 2
+    names = [n for n in args.names if n]
+    if args.stdin:
+        names += [line.strip() for line in sys.stdin if line.strip()]
+    if not names:
+        print("没有指定服务器", file=sys.stderr)
+        return 2
+    ok, err = write_server_names(path, names)
+    if not ok:
+        print(f"写入失败: {err}", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print(f"已写入 {len(names)} 个服务器到 {path}", file=sys.stderr)
+    return 0
+
+
+def cmd_service(args):
+    from service_control import ServiceController, describe
+    ctl = ServiceController(unit=args.unit)
+    if args.action != "status":
+        ok, out = ctl.perform(args.action)
+        if not ok:
+            print(f"服务{args.action}失败: {out}", file=sys.stderr)
+            return 1
+    status = ctl.refresh()
+    print(json.dumps(status, ensure_ascii=False) if args.json else describe(status))
+    return 0 if args.action != "status" or status.get("ActiveState") == "active" else 3
+
+
+def load_resolvers(args):
+    from core import APP_DIR, SERVER_LIST_URLS
+    from resolver_cache import ResolverCache
+    cache = ResolverCache(APP_DIR / "resolvers_cache.json", SERVER_LIST_URLS, client=apply_proxy(args))
+    index = cache.load()
+    if index is None:
+        status, index = cache.refresh()
+    return index
+
+
+def cmd_monitor(args):
+    import time
+    from core import write_server_names
+    from health_monitor import HealthMonitor, HealthPolicy
+    from service_control import ServiceController
+    from toml_config import open_config
+    path = config_path(args)
+    if not path:
+        return 2
+    index = load_resolvers(args)
+    if not index:
+        print("没有可用的服务器列表", file=sys.stderr)
+        return 1
+    cfg = open_config(path)
+    ctl = ServiceController(unit=args.unit)
+
+    def configured():
+        return cfg.get("server_names") or []
+
+    def candidates():
+        # 只在与当前配置相同的协议中挑选候选
+        protos = {r.proto for r in (index.get(n) for n in configured()) if r is not None}
+        return [r.name for r in index if not protos or r.proto in protos]
+
+    def apply(names):
+        ok, err = write_server_names(path, names)
+        if ok and not args.no_reload:
+            ok, err = ctl.perform("restart")
+        return ok, err
+
+    def event(msg):
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+    policy = HealthPolicy(max_latency=args.max_latency / 1000, max_loss=args.max_loss, strikes=args.strikes,
+                          cooldown=args.cooldown)
+    monitor = HealthMonitor(configured, index.get, candidates, apply, policy=policy, interval=args.interval,
+                            budget=args.budget, on_event=event)
+    try:
+        monitor.run(rounds=1 if args.once else None)
+    except KeyboardInterrupt:
+        pass
+    if args.once:
+        for name in configured():
+            w = monitor.windows.get(name)
+            print(f"{name}\t{w.summary() if w else '未知服务器'}")
+    return 0
+
+
+def cmd_loadtest(args):
+    from loadgen import DEFAULT_CORPUS, compare, listen_targets, load_corpus, parse_listen, run_load
+    if args.target:
+        targets = [parse_listen(t) for t in args.target]
+    else:
+        path = config_path(args)
+        if not path:
+            return 2
+        targets = listen_targets(path)[:1]
+        if not targets:
+            print("配置中没有 listen_addresses", file=sys.stderr)
+            return 2
+    corpus = load_corpus(args.corpus) if args.corpus else DEFAULT_CORPUS
+    if not corpus:
+        print("语料为空", file=sys.stderr)
+        return 2
+    results = []
+    for host, port in targets:
+        r = run_load((host, port), corpus, count=args.count, qps=args.qps, concurrency=args.concurrency,
+                     timeout=args.timeout, seed=args.seed)
+        results.append((args.label or f"{host}:{port}", r))
+    if args.json:
+        print(json.dumps([dict(r.to_dict(), label=label) for label, r in results], ensure_ascii=False, indent=2))
+    else:
+        print("\n".join(compare(results)))
+    return 0 if all(r.answered for _, r in results) else 1
+
+
+def cmd_blocklist(args):
+    from blocklist import BlocklistCompiler
+    from core import APP_DIR, default_blocklist_path, write_blocked_names
+    compiler = BlocklistCompiler(APP_DIR / "blocklists")
+    # 不指定来源时沿用上次编译的来源
+    sources = args.sources or list(compiler.manifest["sources"])
+    if not sources:
+        print("没有指定拦截列表来源", file=sys.stderr)
+        return 2
+    if any(s.startswith(("http://", "https://")) for s in sources):
+        compiler.client = apply_proxy(args)
+    path = None
+    if args.apply or not args.output:
+        path = config_path(args)
+        if args.apply and not path:
+            return 2
+    output = args.output or compiler.manifest.get("output") or default_blocklist_path(path)
+    log = (lambda msg: print(msg, file=sys.stderr)) if not args.quiet else (lambda msg: None)
+    try:
+        stats = compiler.build(sources, output, log=log, force=args.force)
+    except Exception as e:
+        print(f"编译失败: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(dict(stats, output=str(output)), ensure_ascii=False, indent=2))
+    if args.apply:
+        ok, err = write_blocked_names(path, output)
+        if not ok:
+            print(f"写入配置失败: {err}", file=sys.stderr)
+            return 1
+        if args.reload and stats.get("changed"):
+            from service_control import ServiceController
+            ctl = ServiceController(unit=args.unit)
+            ok, out = ctl.perform("restart")
+            if not ok:
+                print(f"重启服务失败: {out}", file=sys.stderr)
+                return 1
+    return 0
+
+
+def cmd_bench(args):
+    import bench
+    if args.list:
+        print("\n".join(bench.BENCHMARKS))
+        return 0
+    log = (lambda msg: print(msg, file=sys.stderr)) if not args.quiet else None
+    try:
+        report = bench.run(args.only, scale=args.scale, repeat=args.repeat, log=log)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.output:
+        bench.save(report, args.output)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    status = 1 if any("error" in e for e in report["results"].values()) else 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            lines, regressions = bench.compare(json.load(f), report, args.threshold)
+        print("\n".join(lines), file=sys.stderr)
+        if regressions:
+            status = 1
+    return status
+
+
+def cmd_gui(args):
+    from core import ensure_dependencies
+    ensure_dependencies(("PyQt5", "requests"))
+    from dnscrypt_gui_final import main
+    return main()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="dnscrypt-gui", description="dnscrypt-proxy 管理工具（无界面模式）")
+    parser.add_argument("--config", help="dnscrypt-proxy.toml 路径，默认自动检测")
+    parser.add_argument("--proxy", help="GitHub 加速代理前缀，none 表示直连；默认沿用上次检测结果")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出过程日志")
+    parser.add_argument("--textfile", default=os.environ.get("DNSCRYPT_GUI_TEXTFILE"),
+                        help="结束时把耗时与计数写成 Prometheus textfile（可用环境变量 DNSCRYPT_GUI_TEXTFILE）")
+    parser.add_argument("--profile", metavar="FILE", help="用 cProfile 采样本次命令，结果写入 FILE")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("detect-proxy", help="检测可用的 GitHub 加速代理")
+    p.add_argument("--fresh", action="store_true", help="忽略缓存结果，重新探测所有代理")
+    p.set_defaults(func=cmd_detect_proxy)
+
+    p = sub.add_parser("resolvers", help="列出/筛选公共服务器")
+    p.add_argument("--refresh", action="store_true", help="先联网检查更新")
+    p.add_argument("--proto", help="协议，如 DNSCrypt / DoH / ODoH")
+    p.add_argument("--country", help="国家代码，如 NL")
+    p.add_argument("--dnssec", action="store_true")
+    p.add_argument("--nolog", action="store_true")
+    p.add_argument("--nofilter", action="store_true")
+    p.add_argument("--grep", help="按名称/描述过滤")
+    fmt = p.add_mutually_exclusive_group()
+    fmt.add_argument("--json", action="store_true")
+    fmt.add_argument("--names", action="store_true", help="只输出名称，每行一个")
+    p.set_defaults(func=cmd_resolvers)
+
+    p = sub.add_parser("install", help="下载并安装最新 dnscrypt-proxy")
+    p.add_argument("--rollback", action="store_true", help="回滚到上一个版本")
+    p.set_defaults(func=cmd_install)
+
+    p = sub.add_parser("set-servers", help="写入 server_names")
+    p.add_argument("names", nargs="*")
+    p.add_argument("--stdin", action="store_true", help="从标准输入读取名称（可接 resolvers --names）")
+    p.set_defaults(func=cmd_set_servers)
+
+    p = sub.add_parser("service", help="控制 dnscrypt-proxy 服务")
+    p.add_argument("action", choices=("start", "stop", "restart", "status"))
+    p.add_argument("--unit", default="dnscrypt-proxy")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_service)
+
+    p = sub.add_parser("monitor", help="持续检查已配置服务器的健康状况，劣化时自动切换")
+    p.add_argument("--interval", type=float, default=60, help="检查间隔（秒），实际间隔有 ±20%% 抖动")
+    p.add_argument("--budget", type=int, default=8, help="每轮最多探测的服务器数")
+    p.add_argument("--max-latency", type=float, default=500, help="中位延迟超过此值（毫秒）视为劣化")
+    p.add_argument("--max-loss", type=float, default=0.5, help="丢包率超过此值视为劣化")
+    p.add_argument("--strikes", type=int, default=3, help="连续劣化多少轮后切换")
+    p.add_argument("--cooldown", type=float, default=600, help="切换后的冷却时间（秒）")
+    p.add_argument("--unit", default="dnscrypt-proxy")
+    p.add_argument("--no-reload", action="store_true", help="只改配置，不重启服务")
+    p.add_argument("--once", action="store_true", help="只检查一轮并输出结果")
+    p.set_defaults(func=cmd_monitor)
+
+    p = sub.add_parser("loadtest", help="对本地 dnscrypt-proxy 监听地址压测")
+    p.add_argument("--target", action="append", help="host:port，可多次指定；默认取配置中的第一个 listen_addresses")
+    p.add_argument("--qps", type=float, default=0, help="目标QPS，0 表示不限速")
+    p.add_argument("--concurrency", type=int, default=64)
+    p.add_argument("--count", type=int, default=5000)
+    p.add_argument("--timeout", type=float, default=2.0)
+    p.add_argument("--corpus", help="域名语料文件（每行 域名 [类型]，或 tsv 查询日志）")
+    p.add_argument("--seed", type=int, default=0, help="查询序列的随机种子，相同种子可重放")
+    p.add_argument("--label", help="结果标签")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_loadtest)
+
+    p = sub.add_parser("blocklist", help="合并、去重并压缩 blocked_names 拦截列表")
+    p.add_argument("sources", nargs="*", help="hosts 文件 / 域名列表的路径或 URL；默认沿用上次的来源")
+    p.add_argument("--output", help="输出文件，默认放在配置文件旁的 blocked-names.txt")
+    p.add_argument("--force", action="store_true", help="即使来源都未变化也重新合并")
+    p.add_argument("--apply", action="store_true", help="把输出文件写入配置的 [blocked_names] blocked_names_file")
+    p.add_argument("--reload", action="store_true", help="配合 --apply，列表有变化时重启服务")
+    p.add_argument("--unit", default="dnscrypt-proxy")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_blocklist)
+
+    p = sub.add_parser("bench", help="运行性能基准，结果输出为 JSON")
+    p.add_argument("--only", action="append", help="只运行指定基准项，可多次指定")
+    p.add_argument("--list", action="store_true", help="列出所有基准项")
+    p.add_argument("--scale", type=float, default=1.0, help="数据规模倍数")
+    p.add_argument("--repeat", type=int, default=5, help="每项计时次数")
+    p.add_argument("--output", help="JSON 结果写入此文件，默认输出到标准输出")
+    p.add_argument("--compare", help="与之前的 JSON 结果对比，中位数回退超过阈值时返回 1")
+    p.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对阈值")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("gui", help="启动图形界面")
+    p.set_defaults(func=cmd_gui)
+    return parser
+
+
+def main(argv=None):
+    import metrics
+    from core import APP_DIR
+    args = build_parser().parse_args(argv)
+    # 每次运行的各阶段耗时都追加到追踪文件，事后可在界面的诊断页或直接读 JSONL 查看
+    metrics.configure(APP_DIR / "metrics" / "trace.jsonl")
+    profiler = metrics.Profiler() if args.profile else None
+    if profiler:
+        profiler.start()
+    try:
+        with metrics.span(f"cli.{args.command}"):
+            return args.func(args)
+    finally:
+        if profiler:
+            report = profiler.stop(args.profile)
+            if not args.quiet:
+                print(report, file=sys.stderr)
+        if args.textfile:
+            try:
+                metrics.registry().write_textfile(args.textfile)
+            except OSError as e:
+                print(f"写入 textfile 失败: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import importlib
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from toml_config import open_config
+
+# --------- 与界面无关的公共部分 ---------
+# 命令行与图形界面共用。这里只放轻量的导入，网络、下载等较重的模块在用到时才导入，
+# 以便命令行冷启动足够快。
+APP_DIR = Path.home() / ".dnscrypt_gui"
+
+
+class ConsoleHost:
+    # 命令行下代替窗口对象，供 ProxyManager / DNSCryptInstaller 输出日志与提示
+    # log / notify / ask_text 可能在后台线程调用，界面端的实现负责转到界面线程
+    def __init__(self, verbose=True, interactive=None):
+        self.verbose = verbose
+        self.interactive = sys.stdin.isatty() if interactive is None else interactive
+
+    def log(self, msg):
+        if self.verbose:
+            print(msg, file=sys.stderr, flush=True)
+
+    def notify(self, kind, title, text):
+        print(f"{title}: {text}", file=sys.stderr if kind != "information" else sys.stdout, flush=True)
+
+    def ask_text(self, title, prompt):
+        if not self.interactive:
+            return "", False
+        try:
+            return input(prompt), True
+        except EOFError:
+            return "", False
+
+
+# --------- 依赖检测与安装 ---------
+def ensure_package(pkg):
+    try:
+        importlib.import_module(pkg)
+        return True
+    except ImportError:
+        # 仅pip安装作为备用，推荐预装或用系统包管理器安装
+        subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
+        return True
+
+def ensure_dependencies(packages=("PyQt5", "requests")):
+    for p in packages:
+        if not ensure_package(p):
+            print(f"依赖 {p} 安装失败")
+            sys.exit(1)
+
+# --------- 动态服务器加载（多地址顺序尝试） ---------
+SERVER_LIST_URLS = [
+    "https://download.dnscrypt.info/resolvers-list/v3/public-resolvers.md",
+    "https://raw.githubusercontent.com/DNSCrypt/dnscrypt-resolvers/master/v3/public-resolvers.md",
+    "https://dnscrypt.info/resolvers-list/v3/public-resolvers.md"
+]
+
+FALLBACK_SERVERS = ["cloudflare", "dnscrypt.eu-nl", "quad9"]
+
+def fetch_server_list(proxy_prefix=None):
+    # 列表为Markdown格式，边下载边逐行解析，返回带索引的ResolverIndex
+    from resolver_cache import ResolverCache
+    from resolvers import ResolverIndex
+    status, servers = ResolverCache(None, SERVER_LIST_URLS).refresh(proxy_prefix)
+    return servers or ResolverIndex()
+
+# --------- 服务器配置写入 ---------
+def write_config(config_path, values, table=""):
+    # 一次事务写入多个键，保留注释与格式，原子替换
+    try:
+        open_config(config_path).update(values, table)
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+def write_server_names(config_path, server_names):
+    return write_config(config_path, {"server_names": list(server_names)})
+
+def write_blocked_names(config_path, blocklist_path):
+    return write_config(config_path, {"blocked_names_file": str(blocklist_path)}, table="blocked_names")
+
+def default_blocklist_path(config_path):
+    # 放在配置文件旁边，dnscrypt-proxy 以专用用户运行时也能读到
+    return Path(config_path).parent / "blocked-names.txt" if config_path else APP_DIR / "blocked-names.txt"
+
+CONFIG_CANDIDATES = [
+    "/etc/dnscrypt-proxy/dnscrypt-proxy.toml",
+    "/usr/local/etc/dnscrypt-proxy/dnscrypt-proxy.toml",
+    "/etc/dnscrypt-proxy.toml",
+    "/usr/local/dnscrypt-proxy/dnscrypt-proxy.toml",
+    "/opt/dnscrypt-proxy/dnscrypt-proxy.toml",
+]
+_config_path = None
+
+def detect_config_path():
+    # 找到后缓存，仅在缓存的文件消失时重新扫描
+    global _config_path
+    if _config_path and os.path.isfile(_config_path):
+        return _config_path
+    _config_path = next((p for p in CONFIG_CANDIDATES if os.path.isfile(p)), None)
+    return _config_path
+
+def query_log_paths(config_path):
+    # 返回 (查询日志, NX日志, 格式)；相对路径按配置文件所在目录解析
+    if not config_path:
+        return None, None, "tsv"
+    try:
+        cfg = open_config(config_path)
+        query_file = cfg.get("file", table="query_log")
+        nx_file = cfg.get("file", table="nx_log")
+        fmt = cfg.get("format", table="query_log", default="tsv")
+    except Exception:
+        return None, None, "tsv"
+    base = Path(config_path).parent
+    return (base / query_file if query_file else None), (base / nx_file if nx_file else None), fmt
@@ -0,0 +1,131 @@
+import time
+
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import (
+    QCheckBox, QComboBox, QHBoxLayout, QHeaderView, QLabel, QPlainTextEdit, QPushButton, QTableWidget,
+    QTableWidgetItem, QVBoxLayout, QWidget
+)
+
+from metrics import breakdown, load_runs
+
+# --------- 诊断面板 ---------
+# 读取追踪文件，按运行列出各阶段的次数与耗时（本次运行直接取内存中的记录），下方是逐条时间线；
+# 启动慢等问题可以事后在这里查看。cProfile 开关只采样界面线程。
+COLUMNS = ("阶段", "次数", "首次开始(ms)", "总耗时(ms)", "最长(ms)", "失败")
+
+
+def _item(value):
+    item = QTableWidgetItem()
+    item.setData(0, value)
+    return item
+
+
+class DiagnosticsPanel(QWidget):
+    def __init__(self, registry, trace_path, profiler, profile_dir, textfile, log=None, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.trace_path = trace_path
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.textfile = textfile
+        self.log = log or (lambda msg: None)
+        self.runs = {}
+        layout = QVBoxLayout()
+        row = QHBoxLayout()
+        self.run_box = QComboBox()
+        self.run_box.currentIndexChanged.connect(self.show_run)
+        refresh_btn = QPushButton("刷新")
+        refresh_btn.clicked.connect(self.refresh)
+        self.profile_check = QCheckBox("cProfile 采样（界面线程）")
+        self.profile_check.setChecked(profiler.active)
+        self.profile_check.toggled.connect(self.toggle_profile)
+        export_btn = QPushButton("导出 Prometheus")
+        export_btn.clicked.connect(self.export)
+        row.addWidget(QLabel("运行"))
+        row.addWidget(self.run_box, stretch=1)
+        for w in (refresh_btn, self.profile_check, export_btn):
+            row.addWidget(w)
+        layout.addLayout(row)
+        self.summary = QLabel()
+        layout.addWidget(self.summary)
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table, stretch=2)
+        self.detail = QPlainTextEdit()
+        self.detail.setReadOnly(True)
+        self.detail.setFont(QFont("monospace"))
+        layout.addWidget(self.detail, stretch=1)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        current = self.run_box.currentData()
+        self.runs = load_runs(self.trace_path) if self.trace_path else {}
+        # 本次运行以内存中的记录为准（追踪文件可能未配置或写入失败）
+        self.runs.pop(self.registry.run_id, None)
+        self.runs[self.registry.run_id] = self.registry.recent()
+        self.run_box.blockSignals(True)
+        self.run_box.clear()
+        for run_id in reversed(list(self.runs)):
+            label = "本次运行" if run_id == self.registry.run_id else run_id
+            self.run_box.addItem(f"{label}（{len(self.runs[run_id])} 条）", run_id)
+        index = self.run_box.findData(current) if current else 0
+        self.run_box.setCurrentIndex(max(0, index))
+        self.run_box.blockSignals(False)
+        self.show_run()
+
+    def show_run(self, *args):
+        records = self.runs.get(self.run_box.currentData(), [])
+        phases = breakdown(records)
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(phases))
+        for row, p in enumerate(phases):
+            values = (p["name"], p["count"], round(p["first"] * 1000), round(p["total"] * 1000, 1),
+                      round(p["max"] * 1000, 1), p["errors"])
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, _item(value))
+        self.table.setSortingEnabled(True)
+        spans = [r for r in records if r.get("status") != "mark"]
+        if spans:
+            end = max(r["start"] + r["duration"] for r in records)
+            slowest = max(spans, key=lambda r: r["duration"])
+            self.summary.setText(f"共 {len(spans)} 个阶段记录，跨度 {end * 1000:.0f} ms；"
+                                 f"最慢: {slowest['name']} {slowest['duration'] * 1000:.0f} ms")
+        else:
+            self.summary.setText("没有记录")
+        self.detail.setPlainText("\n".join(self.timeline(records)))
+
+    def timeline(self, records, limit=500):
+        lines = []
+        for r in sorted(records, key=lambda r: r["start"])[-limit:]:
+            attrs = " ".join(f"{k}={v}" for k, v in (r.get("attrs") or {}).items() if v is not None)
+            status = "" if r.get("status") == "ok" else f" [{r.get('error') or r.get('status')}]"
+            parent = f" ← {r['parent']}" if r.get("parent") else ""
+            lines.append(f"{r['start'] * 1000:9.0f} ms  {r['duration'] * 1000:9.1f} ms  {r['name']}{status}{parent}"
+                         f"  {attrs}".rstrip())
+        return lines
+
+    def toggle_profile(self, enabled):
+        if enabled:
+            self.profiler.start()
+            self.log("已开始 cProfile 采样")
+            return
+        path = self.profile_dir / f"{self.registry.run_id}-{time.strftime('%H%M%S')}.prof"
+        report = self.profiler.stop(path)
+        if report:
+            self.log(f"cProfile 结果已保存到 {path}")
+            self.detail.setPlainText(report)
+
+    def export(self):
+        try:
+            self.registry.write_textfile(self.textfile)
+            self.log(f"已导出 Prometheus textfile: {self.textfile}")
+        except OSError as e:
+            self.log(f"导出失败: {e}")
@@ -1,320 +1,99 @@
+import json
+import os
 import sys
-import subprocess
-import importlib
-import platform
 import threading
 import traceback
-import requests
-import json
-import os
-import shutil
-import tarfile
-import zipfile
-from pathlib import Path
-from datetime import datetime
+import metrics
+from startup import Timeline, TaskGraph
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton,
-    QListWidget, QListWidgetItem, QTextEdit, QMessageBox, QHBoxLayout,
-    QInputDialog
+    QTableView, QPlainTextEdit, QMessageBox, QHBoxLayout, QHeaderView, QComboBox,
+    QCheckBox, QInputDialog, QSpinBox, QProgressBar, QTabWidget
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QTextCursor
-from PyQt5.QtCore import pyqtSignal, QObject
-from PyQt5 import sip
-
-# 注册自定义类型
-
-if __name__ == "__main__":
-    # 注册QTextCursor，保证多线程信号队列正确传递
-    sip.register_metatype("QTextCursor<QTextCursor>")
-    
-    app = QApplication(sys.argv)
-    # 你的主窗口
-    window = DNSCryptGui()
-    window.show()
-    sys.exit(app.exec_())
-
-# --------- 依赖检测与安装 ---------
-def run_cmd(cmd):
-    try:
-        r = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        return r.returncode == 0, r.stdout + r.stderr
-    except Exception as e:
-        return False, str(e)
-
-def ensure_package(pkg):
-    try:
-        importlib.import_module(pkg)
-        return True
-    except ImportError:
-        # 仅pip安装作为备用，推荐预装或用系统包管理器安装
-        subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
-        return True
-
-def ensure_dependencies():
-    for p in ['PyQt5', 'requests']:
-        if not ensure_package(p):
-            print(f"依赖 {p} 安装失败")
-            sys.exit(1)
-
-ensure_dependencies()
-
-# --------- 代理管理 ---------
-class ProxyManager:
-    def __init__(self, parent):
-        self.parent = parent
-        # 优先使用指定有效代理列表
-        self.proxy_list = [
-            {"name": "GitHubProxy", "prefix": "https://gh-proxy.com/"},
-            {"name": "FastGit", "prefix": "https://gh.jasonzeng.dev/"},
-            {"name": "pipers", "prefix": "https://proxy.pipers.cn/"},
-            {"name": "gitmirror", "prefix": "https://hub.gitmirror.com/"},
-            {"name": "dgithub", "prefix": "https://dgithub.xyz/"}
-        ]
-        self.current_proxy = None
-
-    def test_proxy(self, prefix):
-        test_url = prefix + "https://api.github.com/repos/DNSCrypt/dnscrypt-proxy/releases/latest"
-        try:
-            r = requests.get(test_url, timeout=7)
-            return r.status_code == 200
-        except:
-            return False
-
-    def auto_detect(self):
-        for p in self.proxy_list:
-            if self.test_proxy(p["prefix"]):
-                self.current_proxy = p["prefix"]
-                self.parent.log(f"自动选用代理：{p['name']}")
-                return True
-        return self.manual_input()
-
-    def manual_input(self):
-        text, ok = QInputDialog.getText(self.parent, "输入代理前缀", "自动检测失败，请输入代理前缀（如：https://gh-proxy.com/）:")
-        if ok and text.strip():
-            if self.test_proxy(text.strip()):
-                self.current_proxy = text.strip()
-                self.parent.log(f"手动设置代理为：{text.strip()}")
-                return True
-            self.parent.log("代理测试失败，请重试")
-            QMessageBox.warning(self.parent, "无效代理", "代理测试失败，请重试")
-            return self.manual_input()
-        else:
-            self.parent.log("未设置有效代理")
-            QMessageBox.warning(self.parent, "代理设置", "未设置代理，可能影响下载速度")
-            return False
-
-# --------- 动态服务器加载（多地址顺序尝试） ---------
-SERVER_LIST_URLS = [
-    "https://download.dnscrypt.info/resolvers-list/v3/public-resolvers.md",
-    "https://raw.githubusercontent.com/DNSCrypt/dnscrypt-resolvers/master/v3/public-resolvers.md",
-    "https://dnscrypt.info/resolvers-list/v3/public-resolvers.md"
-]
-
-def fetch_server_list(proxy_prefix):
-    for url in SERVER_LIST_URLS:
-        try:
-            use_url = proxy_prefix + url if proxy_prefix else url
-            r = requests.get(use_url, timeout=10)
-            if r.status_code == 200:
-                js = r.json()
-                servers = js.get("resolvers", [])
-                if servers:
-                    return servers
-        except:
-            continue
-    return []
-
-# --------- dnscrypt-proxy 下载安装 ---------
-class DNSCryptInstaller:
-    def __init__(self, parent, proxy_prefix=None):
-        self.parent = parent
-        self.proxy_prefix = proxy_prefix
-    
-    def get_releases(self):
-        url = "https://api.github.com/repos/DNSCrypt/dnscrypt-proxy/releases"
-        if self.proxy_prefix:
-            url = self.proxy_prefix + url
-        try:
-            r = requests.get(url, timeout=15)
-            r.raise_for_status()
-            return r.json()
-        except Exception as e:
-            self.parent.log(f"获取版本列表失败: {e}")
-            return []
-
-    def select_asset_url(self, release):
-        system = platform.system()
-        arch_map = {
-            "x86_64": "linux_amd64",
-            "amd64": "linux_amd64",
-            "aarch64": "linux_arm64",
-            "arm64": "linux_arm64",
-            "armv7l": "linux_arm"
-        }
-        arch = arch_map.get(platform.machine().lower())
-        if system == "Windows": arch = "windows_amd64"
-        elif system == "Darwin": arch = "darwin_amd64"
-        if not arch:
-            raise RuntimeError("不支持的CPU架构")
-        assets = release.get("assets", [])
-        for asset in assets:
-            name = asset.get("name", "")
-            if system == "Windows" and name.endswith(".zip") and arch in name:
-                return asset["browser_download_url"]
-            elif system in ("Linux", "Darwin") and name.endswith(".tar.gz") and arch in name:
-                return asset["browser_download_url"]
-        return None
-
-    def download_and_install(self):
-        releases = self.get_releases()
-        if not releases:
-            self.parent.log("无法获得任何发行版本信息")
-            QMessageBox.critical(self.parent, "错误", "获取dnscrypt-proxy版本列表失败。")
-            return
-        # 从最新到旧版本遍历尝试下载
-        for release in releases:
-            tag_name = release.get("tag_name", "")
-            self.parent.log(f"尝试下载版本：{tag_name}")
-            url = self.select_asset_url(release)
-            if not url:
-                self.parent.log(f"版本 {tag_name} 无适合的下载包，跳过")
-                continue
-            try:
-                tmp_dir = Path.home() / ".dnscrypt_proxy_tmp"
-                tmp_dir.mkdir(exist_ok=True)
-                file_name = url.split("/")[-1]
-                archive_path = tmp_dir / file_name
-                if not archive_path.exists():
-                    download_url = self.proxy_prefix + url if self.proxy_prefix else url
-                    self.parent.log(f"下载文件：{download_url}")
-                    with requests.get(download_url, stream=True, timeout=60) as r:
-                        r.raise_for_status()
-                        with open(archive_path, "wb") as f:
-                            shutil.copyfileobj(r.raw, f)
-                install_dir = Path.home() / "dnscrypt-proxy"
-                if install_dir.exists():
-                    shutil.rmtree(install_dir)
-                install_dir.mkdir()
-                self.parent.log(f"解压文件到：{install_dir}")
-                if archive_path.suffix == ".zip":
-                    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                        zip_ref.extractall(install_dir)
-                else:
-                    with tarfile.open(archive_path, 'r:gz') as tar_ref:
-                        tar_ref.extractall(install_dir)
-                bin_path = next(install_dir.glob("dnscrypt-proxy*"))
-                if platform.system() in ("Linux", "Darwin"):
-                    bin_path.chmod(0o755)
-                self.parent.log(f"版本 {tag_name} 安装成功，路径：{bin_path}")
-                QMessageBox.information(self.parent, "安装成功", f"dnscrypt-proxy {tag_name} 安装完成")
-                return
-            except Exception:
-                self.parent.log(f"版本 {tag_name} 下载或安装失败，尝试回退到旧版本")
-                self.parent.log(traceback.format_exc())
-                continue
-        # 全部失败后提示
-        self.parent.log("所有尝试的版本下载失败")
-        QMessageBox.critical(self.parent, "错误", "所有尝试的dnscrypt-proxy版本下载失败，请检查网络或代理设置")
-
-
-
-    def extract(self, archive, outdir):
-        if archive.suffix == ".zip":
-            with zipfile.ZipFile(archive, 'r') as zip_ref:
-                zip_ref.extractall(outdir)
-        else:
-            with tarfile.open(archive, "r:gz") as tar_ref:
-                tar_ref.extractall(outdir)
-
-    def chmod_exec(self, path):
-        if platform.system() in ("Linux", "Darwin"):
-            path.chmod(0o755)
-
-    def install(self):
-        try:
-            self.parent.log("获取最新版本信息...")
-            release = self.get_latest()
-            url = self.select_asset_url(release)
-            self.parent.log(f"下载包链接：{url}")
-            tmpdir = Path.home() / ".dnscrypt_installer_tmp"
-            tmpdir.mkdir(exist_ok=True)
-            fname = url.split("/")[-1]
-            archpath = tmpdir / fname
-            if not archpath.exists():
-                self.parent.log("开始下载...")
-                self.download(url, archpath)
-                self.parent.log("下载完成")
-            inst_dir = Path.home() / "dnscrypt-proxy"
-            if inst_dir.exists():
-                shutil.rmtree(inst_dir)
-            inst_dir.mkdir()
-            self.parent.log("解压中...")
-            self.extract(archpath, inst_dir)
-            binfile = next(inst_dir.glob("dnscrypt-proxy*"))
-            self.chmod_exec(binfile)
-            self.parent.log(f"安装成功，目录：{inst_dir}")
-            QMessageBox.information(self.parent, "安装成功", f"dnscrypt-proxy安装完成至{inst_dir}")
-        except Exception as e:
-            self.parent.log(f"安装失败: {e}")
-            tb = traceback.format_exc()
-            self.parent.log(tb)
-            QMessageBox.critical(self.parent, "安装失败", f"dnscrypt-proxy安装失败: {e}")
-
-# --------- 服务器配置写入 ---------
-def write_server_names(config_path, server_names):
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        found = False
-        newlines = []
-        for line in lines:
-            if line.strip().startswith("server_names"):
-                newlines.append('server_names = ["' + '","'.join(server_names) + '"]\n')
-                found = True
-            else:
-                newlines.append(line)
-        if not found:
-            newlines.append('server_names = ["' + '","'.join(server_names) + '"]\n')
-        with open(config_path, "w", encoding="utf-8") as f:
-            f.writelines(newlines)
-        return True, None
-    except Exception as e:
-        return False, str(e)
-
-def detect_config_path():
-    candidates = [
-        "/etc/dnscrypt-proxy/dnscrypt-proxy.toml",
-        "/usr/local/etc/dnscrypt-proxy/dnscrypt-proxy.toml",
-        "/etc/dnscrypt-proxy.toml",
-        "/usr/local/dnscrypt-proxy/dnscrypt-proxy.toml",
-        "/opt/dnscrypt-proxy/dnscrypt-proxy.toml",
-    ]
-    for p in candidates:
-        if os.path.isfile(p):
-            return p
-    return None
-
-# --------- 服务控制 ---------
-def run_cmd(cmd):
-    try:
-        r = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=20)
-        return r.returncode == 0, r.stdout + r.stderr
-    except Exception as e:
-        return False, str(e)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import pyqtSignal
+from resolvers import Resolver, ResolverIndex
+from resolver_cache import ResolverCache
+from latency import run_probes, fastest
+from server_model import ServerTableModel, ServerFilterProxy, COL_NAME, COL_LATENCY
+from http_client import get_client
+from log_pipeline import LogPipeline
+from service_control import ServiceController, describe
+from query_log import QueryStats, QueryLogMonitor
+from stats_panel import StatsPanel
+from loadtest_panel import LoadTestPanel
+from diagnostics_panel import DiagnosticsPanel
+from loadgen import listen_targets
+from health_monitor import HealthMonitor
+from toml_config import open_config
+from blocklist import BlocklistCompiler
+from core import (
+    APP_DIR, SERVER_LIST_URLS, FALLBACK_SERVERS, default_blocklist_path, detect_config_path, query_log_paths,
+    write_blocked_names, write_server_names
+)
+from proxy_manager import ProxyManager
+from installer import DNSCryptInstaller
 
 # --------- UI主体 ---------
 class DNSCryptGui(QWidget):
+    probe_finished = pyqtSignal(object, int)
+    servers_ready = pyqtSignal(object)
+    log_batch = pyqtSignal(list)
+    download_progress = pyqtSignal(object, object)
+    service_result = pyqtSignal(str, bool, str, int)
+    service_status = pyqtSignal(object)
+    notice = pyqtSignal(str, str, str)
+    prompt = pyqtSignal(str, str, object)
+    blocklist_done = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("DNSCrypt GUI客户端")
         self.resize(1000, 700)
+        self.timeline = Timeline()
+        self.profiler = metrics.Profiler()
+        if os.environ.get("DNSCRYPT_GUI_PROFILE"):
+            self.profiler.start()
+        self.logger = LogPipeline(APP_DIR / "logs" / "dnscrypt_gui.log")
         self.config_path = detect_config_path()
-        self.proxy_manager = ProxyManager(self)
+        self.http = get_client()
+        self.proxy_manager = ProxyManager(self, client=self.http)
         self.manual_server = None
-        self.servers = []
-        self.installer = DNSCryptInstaller(self)
-        self.init_ui()
+        self.servers = ResolverIndex()
+        self.latency = {}
+        self.resolver_cache = ResolverCache(APP_DIR / "resolvers_cache.json", SERVER_LIST_URLS, client=self.http)
+        self.installer = DNSCryptInstaller(self, client=self.http)
+        self.query_stats = QueryStats(window=60)
+        self.fresh_servers = False
+        self.servers_lock = threading.Lock()
+        self.startup_done = False
+        self.startup_reported = False
+        self.startup_graph = None
+        self.settings = self.load_settings()
+        with self.timeline.span("init_ui"):
+            self.init_ui()
+        self.probe_finished.connect(self.on_probe_finished)
+        self.servers_ready.connect(self.on_servers_ready)
+        self.log_batch.connect(self.on_log_batch)
+        self.logger.add_sink(self.log_batch.emit)
+        self.download_progress.connect(self.on_download_progress)
+        self.installer.on_progress = self.download_progress.emit
+        self.notice.connect(self.on_notice)
+        self.prompt.connect(self.on_prompt, Qt.BlockingQueuedConnection)
+        self.blocklist_done.connect(self.on_blocklist_done)
+        self.service_result.connect(self.on_service_result)
+        self.service_status.connect(self.on_service_status)
+        self.service = ServiceController(on_result=self.service_result.emit, on_status=self.service_status.emit)
+        self.service.start_polling()
+        query_file, nx_file, fmt = query_log_paths(self.config_path)
+        self.query_monitor = QueryLogMonitor(self.query_stats, query_file, nx_file, fmt,
+                                             offsets_path=APP_DIR / "query_log_offsets.json")
+        self.query_monitor.start()
+        self.health = HealthMonitor(self.configured_servers, lambda name: self.servers.get(name),
+                                    self.failover_candidates, self.apply_failover, on_event=self.log)
+        self.toggle_health_monitor(self.health_check.isChecked())
+        if query_file or nx_file:
+            self.log(f"统计查询日志: {query_file or '-'} / {nx_file or '-'}")
         threading.Thread(target=self.startup_tasks, daemon=True).start()
 
     def init_ui(self):
@@ -329,19 +108,83 @@ class DNSCryptGui(QWidget):
         layout.addLayout(manual_layout)
 
         layout.addWidget(QLabel("在线服务器列表（多选）"))
-        self.server_list = QListWidget()
-        self.server_list.setSelectionMode(QListWidget.MultiSelection)
+        filter_layout = QHBoxLayout()
+        self.filter_in = QLineEdit()
+        self.filter_in.setPlaceholderText("搜索名称/描述/国家")
+        self.filter_in.textChanged.connect(self.server_proxy_text_changed)
+        self.proto_filter = QComboBox()
+        self.proto_filter.addItem("全部协议")
+        self.proto_filter.currentIndexChanged.connect(self.apply_attr_filter)
+        self.dnssec_filter = QCheckBox("DNSSEC")
+        self.nolog_filter = QCheckBox("无日志")
+        self.nofilter_filter = QCheckBox("无过滤")
+        for cb in (self.dnssec_filter, self.nolog_filter, self.nofilter_filter):
+            cb.stateChanged.connect(self.apply_attr_filter)
+        check_all_btn = QPushButton("全选")
+        check_all_btn.clicked.connect(lambda: self.check_visible(True))
+        uncheck_all_btn = QPushButton("全不选")
+        uncheck_all_btn.clicked.connect(lambda: self.check_visible(False))
+        filter_layout.addWidget(self.filter_in, stretch=1)
+        for w in (self.proto_filter, self.dnssec_filter, self.nolog_filter, self.nofilter_filter,
+                  check_all_btn, uncheck_all_btn):
+            filter_layout.addWidget(w)
+        layout.addLayout(filter_layout)
+
+        self.server_model = ServerTableModel(self)
+        self.server_proxy = ServerFilterProxy(self)
+        self.server_proxy.setSourceModel(self.server_model)
+        self.server_list = QTableView()
+        self.server_list.setModel(self.server_proxy)
+        self.server_list.setSortingEnabled(True)
+        self.server_list.setSelectionBehavior(QTableView.SelectRows)
+        self.server_list.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.server_list.verticalHeader().setDefaultSectionSize(22)
+        self.server_list.verticalHeader().hide()
+        self.server_list.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.server_list.horizontalHeader().setStretchLastSection(True)
+        self.server_list.setColumnWidth(COL_NAME, 240)
         layout.addWidget(self.server_list)
 
         apply_auto_btn = QPushButton("应用自动服务器配置")
         apply_auto_btn.clicked.connect(self.apply_auto_servers)
         layout.addWidget(apply_auto_btn)
 
+        probe_layout = QHBoxLayout()
+        self.probe_btn = QPushButton("测速并自动选择最快的服务器")
+        self.probe_btn.clicked.connect(self.probe_servers)
+        self.fastest_n = QSpinBox()
+        self.fastest_n.setRange(1, 20)
+        self.fastest_n.setValue(3)
+        self.fastest_n.setPrefix("数量: ")
+        probe_layout.addWidget(self.probe_btn, stretch=1)
+        probe_layout.addWidget(self.fastest_n)
+        self.health_check = QCheckBox("自动健康检查与故障切换")
+        # 自动切换会改写 server_names 并重启服务，默认关闭，由用户开启后记住选择
+        self.health_check.setChecked(bool(self.config_path) and self.settings.get("health_check", False))
+        self.health_check.toggled.connect(self.on_health_check_toggled)
+        probe_layout.addWidget(self.health_check)
+        layout.addLayout(probe_layout)
+
         self.install_btn = QPushButton("下载并安装最新dnscrypt-proxy")
         self.install_btn.clicked.connect(self.install_dnscrypt_proxy)
-        layout.addWidget(self.install_btn)
+        rollback_btn = QPushButton("回滚到上一个版本")
+        rollback_btn.clicked.connect(self.rollback_dnscrypt_proxy)
+        install_layout = QHBoxLayout()
+        install_layout.addWidget(self.install_btn, stretch=1)
+        install_layout.addWidget(rollback_btn)
+        self.blocklist_btn = QPushButton("编译拦截列表")
+        self.blocklist_btn.clicked.connect(self.build_blocklist)
+        install_layout.addWidget(self.blocklist_btn)
+        layout.addLayout(install_layout)
+        self.download_bar = QProgressBar()
+        self.download_bar.setRange(0, 1000)
+        self.download_bar.setFormat("%p%")
+        self.download_bar.hide()
+        layout.addWidget(self.download_bar)
 
         btn_layout = QHBoxLayout()
+        self.service_label = QLabel("服务状态: 未知")
+        btn_layout.addWidget(self.service_label, stretch=1)
         self.start_btn = QPushButton("启动服务")
         self.stop_btn = QPushButton("停止服务")
         self.restart_btn = QPushButton("重启服务")
@@ -353,47 +196,270 @@ class DNSCryptGui(QWidget):
         btn_layout.addWidget(self.restart_btn)
         layout.addLayout(btn_layout)
 
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
-        layout.addWidget(self.log_text, stretch=1)
+        self.log_text.setMaximumBlockCount(self.logger.ring.maxlen)
+        self.stats_panel = StatsPanel(self.query_stats)
+        tabs = QTabWidget()
+        tabs.addTab(self.log_text, "日志")
+        tabs.addTab(self.stats_panel, "查询统计")
+        self.loadtest_panel = LoadTestPanel(lambda: listen_targets(self.config_path) if self.config_path else [],
+                                            log=self.log)
+        tabs.addTab(self.loadtest_panel, "压测")
+        self.diagnostics_panel = DiagnosticsPanel(metrics.registry(), APP_DIR / "metrics" / "trace.jsonl", self.profiler,
+                                                  APP_DIR / "profiles", metrics_textfile(), log=self.log)
+        tabs.addTab(self.diagnostics_panel, "诊断")
+        layout.addWidget(tabs, stretch=1)
         self.setLayout(layout)
 
+    def load_settings(self):
+        try:
+            with open(APP_DIR / "gui_settings.json", "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save_setting(self, key, value):
+        self.settings[key] = value
+        path = APP_DIR / "gui_settings.json"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.settings, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            self.log(f"保存设置失败: {e}")
+
     def log(self,msg):
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.log_text.append(f"[{ts}] {msg}")
-        print(msg)
+        # 可在任意线程调用，由日志管线批量刷新到界面
+        self.logger.write(msg)
+
+    def notify(self, kind, title, text):
+        # ProxyManager / DNSCryptInstaller 可能在后台线程提示，统一转到界面线程弹框
+        self.notice.emit(kind, title, text)
+
+    def on_notice(self, kind, title, text):
+        getattr(QMessageBox, kind)(self, title, text)
+
+    def ask_text(self, title, prompt):
+        # 代理检测在后台线程里可能要求手动输入：输入框必须在界面线程创建，后台线程阻塞等待结果
+        if threading.current_thread() is threading.main_thread():
+            return QInputDialog.getText(self, title, prompt)
+        reply = []
+        self.prompt.emit(title, prompt, reply)
+        return reply[0] if reply else ("", False)
+
+    def on_prompt(self, title, prompt, reply):
+        reply.append(QInputDialog.getText(self, title, prompt))
+
+    def on_log_batch(self, lines):
+        self.log_text.appendPlainText("\n".join(lines))
+
+    def closeEvent(self, event):
+        if self.startup_graph is not None:
+            self.startup_graph.shutdown(cancel=True)
+        self.health.close(wait=False)
+        self.service.close()
+        self.query_monitor.close()
+        if self.profiler.active:
+            self.profiler.stop(APP_DIR / "profiles" / f"{metrics.registry().run_id}.prof")
+        try:
+            metrics.registry().write_textfile(metrics_textfile())
+        except OSError:
+            pass
+        self.logger.close()
+        super().closeEvent(event)
 
     def startup_tasks(self):
-        try:
-            self.log("自动检测代理...")
-            if not self.proxy_manager.auto_detect():
-                self.log("代理检测失败，未使用代理，下载可能不稳定")
-                self.installer.proxy_prefix = None
+        # 读缓存、检测代理、直连获取服务器列表同时开始；走代理的获取依赖代理检测，
+        # 直连与代理两路先成功者胜出并取消另一路
+        graph = TaskGraph(self.timeline)
+        graph.add("cache", self.load_cached_servers)
+        graph.add("proxy", self.detect_proxy)
+        graph.add("resolvers_direct", lambda g: self.fetch_resolvers(g, "resolvers_direct", "resolvers_proxied", False))
+        graph.add("resolvers_proxied", lambda g: self.fetch_resolvers(g, "resolvers_proxied", "resolvers_direct", True),
+                  deps=("proxy",))
+        graph.add("servers", self.finish_servers, deps=("cache", "resolvers_direct", "resolvers_proxied"))
+        self.startup_graph = graph
+        graph.run()
+        for name, e in graph.errors.items():
+            self.log(f"启动任务 {name} 异常: {e}")
+        self.startup_done = True
+        self.report_startup()
+
+    def emit_servers(self, servers, fresh):
+        # 新获取的列表优先；缓存只在还没有新列表时显示
+        with self.servers_lock:
+            if not fresh and self.fresh_servers:
+                return False
+            self.fresh_servers = self.fresh_servers or fresh
+        self.servers_ready.emit(servers)
+        return True
+
+    def load_cached_servers(self, graph):
+        cached = self.resolver_cache.load()
+        if cached and self.emit_servers(cached, False):
+            self.log(f"已从本地缓存加载 {len(cached)} 个服务器，后台检查更新")
+        return cached
+
+    def detect_proxy(self, graph):
+        self.log("自动检测代理...")
+        if not self.proxy_manager.auto_detect(on_switch=self.on_proxy_switch):
+            self.log("代理检测失败，未使用代理，下载可能不稳定")
+            self.http.proxy_prefix = None
+        else:
+            self.http.proxy_prefix = self.proxy_manager.current_proxy
+        return self.http.proxy_prefix
+
+    def fetch_resolvers(self, graph, name, rival, proxied):
+        if proxied and not graph.results.get("proxy"):
+            return None
+        self.log(f"获取服务器列表（{'代理' if proxied else '直连'}），多地址尝试...")
+        status, servers = self.resolver_cache.refresh(proxied=proxied, cancel=graph.cancel_event(name))
+        if status in ("modified", "not_modified"):
+            graph.cancel(rival)
+            if status == "modified":
+                self.emit_servers(servers, True)
             else:
-                self.installer.proxy_prefix = self.proxy_manager.current_proxy
-
-            self.log("获取服务器列表，多地址尝试...")
-            servers = fetch_server_list(self.installer.proxy_prefix)
-            if not servers:
-                self.log("所有地址尝试失败，使用本地备份服务器")
-                servers = [
-                    {"name": "cloudflare", "address": "one.one.one.one:53"},
-                    {"name": "dnscrypt.eu-nl", "address": "dnscrypt-eu.privacydns.org:443"},
-                    {"name": "quad9", "address": "dns.quad9.net:443"},
-                ]
-            self.servers = servers
+                self.log("服务器列表无变化")
+        return status
+
+    def finish_servers(self, graph):
+        statuses = (graph.results.get("resolvers_direct"), graph.results.get("resolvers_proxied"))
+        if "modified" in statuses or "not_modified" in statuses:
+            return
+        if self.resolver_cache.index:
+            self.log("服务器列表更新失败，继续使用本地缓存")
+            return
+        self.log("所有地址尝试失败，使用本地备份服务器")
+        self.emit_servers(ResolverIndex(Resolver(name) for name in FALLBACK_SERVERS), True)
+
+    def report_startup(self):
+        # 启动任务结束且服务器列表已显示后，输出各阶段耗时并追加到历史记录
+        with self.servers_lock:
+            if self.startup_reported or not self.startup_done or "first_paint" not in self.timeline.marks:
+                return
+            self.startup_reported = True
+        self.log("启动耗时:\n" + "\n".join(self.timeline.summary()))
+        self.timeline.save(APP_DIR / "startup_timings.jsonl")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.timeline.mark("window_shown")
+
+    def on_first_paint(self):
+        if self.timeline.mark("first_paint"):
+            self.report_startup()
+
+    def on_proxy_switch(self, prefix):
+        self.http.proxy_prefix = prefix
+
+    def on_servers_ready(self, servers):
+        self.servers = servers
+        with self.timeline.span("populate"):
             self.populate_serverlist()
-        except Exception as e:
-            self.log(f"启动异常: {e}")
-            self.log(traceback.format_exc())
+        # 排在本轮绘制之后执行，记录服务器列表第一次真正显示的时刻
+        QTimer.singleShot(0, self.on_first_paint)
+
+    def populate_serverlist(self, selected=None):
+        with metrics.span("ui.populate", entries=len(self.servers)):
+            self.server_model.set_servers(self.servers, self.latency, selected)
+            current = self.proto_filter.currentText()
+            self.proto_filter.blockSignals(True)
+            self.proto_filter.clear()
+            self.proto_filter.addItem("全部协议")
+            self.proto_filter.addItems(self.servers.protocols())
+            self.proto_filter.setCurrentIndex(max(0, self.proto_filter.findText(current)))
+            self.proto_filter.blockSignals(False)
+            self.apply_attr_filter()
+            if self.latency:
+                # 有测速结果时按中位延迟排序，未测速的排在最后
+                self.server_list.sortByColumn(COL_LATENCY, Qt.AscendingOrder)
+
+    def server_proxy_text_changed(self, text):
+        self.server_proxy.set_text(text)
+
+    def apply_attr_filter(self, *args):
+        # 直接用ResolverIndex的位图过滤，不逐条检查记录
+        proto = self.proto_filter.currentText() if self.proto_filter.currentIndex() > 0 else None
+        flags = {
+            "dnssec": self.dnssec_filter.isChecked() or None,
+            "nolog": self.nolog_filter.isChecked() or None,
+            "nofilter": self.nofilter_filter.isChecked() or None,
+        }
+        if proto is None and not any(flags.values()):
+            self.server_proxy.set_mask(None)
+        else:
+            self.server_proxy.set_mask(self.servers.mask(proto=proto, **flags))
+
+    def configured_servers(self):
+        if not self.config_path:
+            return []
+        try:
+            return open_config(self.config_path).get("server_names") or []
+        except Exception:
+            return []
+
+    def failover_candidates(self):
+        # 最近一次测速的排名优先，其余按列表顺序
+        ranked = fastest(self.latency, len(self.latency))
+        seen = set(ranked)
+        return ranked + [r.name for r in self.servers if r.name not in seen]
 
-    def populate_serverlist(self):
-        self.server_list.clear()
-        for s in self.servers:
-            item = QListWidgetItem(f"{s['name']} - {s['address']}")
-            item.setData(Qt.UserRole,s)
-            item.setSelected(True)
-            self.server_list.addItem(item)
+    def apply_failover(self, names):
+        # 在健康检查线程中调用；服务重启经服务控制器排队，不阻塞
+        success, err = write_server_names(self.config_path, names)
+        if success:
+            self.service.request("restart")
+        return success, err
+
+    def on_health_check_toggled(self, enabled):
+        self.save_setting("health_check", enabled)
+        self.toggle_health_monitor(enabled)
+
+    def toggle_health_monitor(self, enabled):
+        if enabled and self.config_path:
+            self.health.start()
+        else:
+            self.health.close(wait=False)
+
+    def check_visible(self, checked):
+        self.server_model.set_all_checked(self.server_proxy.visible_names(), checked)
+
+    def probe_servers(self):
+        n = self.fastest_n.value()
+        servers = list(self.servers)
+        self.probe_btn.setEnabled(False)
+        self.log(f"开始测速 {len(servers)} 个服务器...")
+
+        def _probe():
+            try:
+                results = run_probes(servers)
+            except Exception:
+                self.log(traceback.format_exc())
+                results = {}
+            self.probe_finished.emit(results, n)
+        threading.Thread(target=_probe, daemon=True).start()
+
+    def on_probe_finished(self, results, n):
+        self.probe_btn.setEnabled(True)
+        if not results:
+            return
+        self.latency = results
+        best = fastest(results, n)
+        self.log(f"测速完成，{sum(r.ok for r in results.values())}/{len(results)} 个可用，最快：{best}")
+        self.populate_serverlist(selected=set(best))
+        if not best:
+            QMessageBox.warning(self, "警告", "没有可用的服务器")
+            return
+        success, err = write_server_names(self.config_path, best)
+        if success:
+            self.manual_server = None
+            self.log(f"已写入最快的 {len(best)} 个服务器")
+        else:
+            QMessageBox.critical(self, "失败", f"写入失败: {err}")
 
     def apply_manual_server(self):
         srv = self.manual_in.text().strip()
@@ -409,11 +475,7 @@ class DNSCryptGui(QWidget):
             QMessageBox.critical(self, "失败", f"写入失败: {err}")
 
     def apply_auto_servers(self):
-        selected = [
-            self.server_list.item(i).data(Qt.UserRole)['name']
-            for i in range(self.server_list.count())
-            if self.server_list.item(i).isSelected()
-        ]
+        selected = self.server_model.selected_names()
         if not selected:
             QMessageBox.warning(self, "警告", "请至少选择一个服务器")
             return
@@ -434,17 +496,88 @@ class DNSCryptGui(QWidget):
                 self.install_btn.setEnabled(True)
         threading.Thread(target=_install, daemon=True).start()
 
+    def build_blocklist(self):
+        if not self.config_path:
+            QMessageBox.warning(self, "错误", "未找到 dnscrypt-proxy.toml")
+            return
+        compiler = BlocklistCompiler(APP_DIR / "blocklists", client=self.http)
+        text, ok = QInputDialog.getMultiLineText(self, "拦截列表来源", "每行一个 hosts 文件 / 域名列表的路径或 URL：",
+                                                 "\n".join(compiler.manifest["sources"]))
+        sources = [line.strip() for line in text.splitlines() if line.strip()] if ok else []
+        if not sources:
+            return
+        output = compiler.manifest.get("output") or default_blocklist_path(self.config_path)
+
+        def _build():
+            try:
+                stats = compiler.build(sources, output, log=self.log)
+                success, err = write_blocked_names(self.config_path, output)
+                if not success:
+                    self.notify("critical", "失败", f"写入配置失败: {err}")
+                elif stats.get("changed"):
+                    self.service.request("restart")
+            except Exception as e:
+                self.log(traceback.format_exc())
+                self.notify("critical", "编译失败", str(e))
+            finally:
+                # 按钮只能在界面线程操作，编译结束后发信号恢复
+                self.blocklist_done.emit()
+        self.blocklist_btn.setEnabled(False)
+        threading.Thread(target=_build, daemon=True).start()
+
+    def on_blocklist_done(self):
+        self.blocklist_btn.setEnabled(True)
+
+    def on_download_progress(self, done, total):
+        self.download_bar.show()
+        if not total:
+            self.download_bar.setRange(0, 0)
+            return
+        self.download_bar.setRange(0, 1000)
+        self.download_bar.setValue(int(done * 1000 / total))
+        self.download_bar.setFormat(f"%p%  {done / 1048576:.1f}/{total / 1048576:.1f} MB")
+
+    def rollback_dnscrypt_proxy(self):
+        try:
+            key = self.installer.rollback()
+        except Exception as e:
+            self.log(traceback.format_exc())
+            QMessageBox.critical(self, "回滚失败", str(e))
+            return
+        if key:
+            QMessageBox.information(self, "回滚成功", f"已切换到 {key}")
+        else:
+            QMessageBox.warning(self, "回滚", "没有可回滚的版本")
+
     def run_service(self, action):
-        ok, out = run_cmd(f"sudo systemctl {action} dnscrypt-proxy")
+        # 只投递请求，命令在后台执行；执行期间的重复点击会被合并
+        if self.service.request(action):
+            self.log(f"服务{action}已提交")
+        else:
+            self.log(f"服务{action}已与待执行的操作合并")
+
+    def on_service_result(self, action, ok, out, merged):
+        note = f"（合并了 {merged} 次重复请求）" if merged else ""
         if ok:
-            self.log(f"服务{action}成功")
-            QMessageBox.information(self, "通知", f"服务{action}成功")
+            self.log(f"服务{action}成功{note}")
         else:
             self.log(f"服务{action}失败: {out}")
             QMessageBox.warning(self, "错误", f"服务{action}失败: {out}")
 
-if __name__ == '__main__':
+    def on_service_status(self, status):
+        self.service_label.setText(f"服务状态: {describe(status)}")
+
+def metrics_textfile():
+    # 设置 DNSCRYPT_GUI_TEXTFILE 时写到 node_exporter 的 textfile 目录
+    return os.environ.get("DNSCRYPT_GUI_TEXTFILE") or APP_DIR / "metrics" / "dnscrypt_gui.prom"
+
+
+def main():
+    metrics.configure(APP_DIR / "metrics" / "trace.jsonl")
     app = QApplication(sys.argv)
     gui = DNSCryptGui()
     gui.show()
-    sys.exit(app.exec_())
+    return app.exec_()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import random
+import statistics
+import threading
+import time
+from collections import deque
+
+from latency import percentile, probeable, run_probes
+
+# --------- 服务器健康监测与自动切换 ---------
+# 按带抖动的间隔复测当前 server_names，并在探测预算内轮流测几个候选；每个服务器保留最近若干次
+# 样本的滑动窗口。判定劣化与判定可用的阈值不同（回差），且需连续多轮劣化、切换后有冷却期，
+# 避免在两个服务器之间来回切换。无法测速的服务器（无stamp或无地址）不参与探测，也不会被判为劣化。
+
+
+class HealthPolicy:
+    def __init__(self, max_latency=0.5, max_loss=0.5, good_ratio=0.7, good_loss=0.1, strikes=3,
+                 cooldown=600, min_samples=3, margin=0.2):
+        self.max_latency = max_latency  # 中位延迟超过此值（秒）视为劣化
+        self.max_loss = max_loss  # 丢包率超过此值视为劣化
+        self.good_ratio = good_ratio  # 候选的中位延迟须低于 max_latency * good_ratio
+        self.good_loss = good_loss  # 候选的丢包率须不高于此值
+        self.strikes = strikes  # 连续劣化轮数达到此值才切换
+        self.cooldown = cooldown  # 切换后冷却时间（秒）
+        self.min_samples = min_samples
+        self.margin = margin  # 候选须比被替换者快这个比例
+
+
+class HealthWindow:
+    __slots__ = ("samples",)
+
+    def __init__(self, size=10):
+        self.samples = deque(maxlen=size)
+
+    def add(self, result):
+        for s in result.samples:
+            self.samples.append(s)
+        for _ in range(result.failures):
+            self.samples.append(None)
+
+    def latencies(self):
+        return [s for s in self.samples if s is not None]
+
+    @property
+    def median(self):
+        values = self.latencies()
+        return statistics.median(values) if values else None
+
+    @property
+    def p95(self):
+        return percentile(self.latencies(), 95)
+
+    @property
+    def loss(self):
+        return (len(self.samples) - len(self.latencies())) / len(self.samples) if self.samples else 1.0
+
+    def degraded(self, policy):
+        if len(self.samples) < policy.min_samples:
+            return False
+        return self.loss > policy.max_loss or (self.median or 0) > policy.max_latency
+
+    def healthy(self, policy):
+        if len(self.samples) < policy.min_samples or self.median is None:
+            return False
+        return self.loss <= policy.good_loss and self.median <= policy.max_latency * policy.good_ratio
+
+    def summary(self):
+        if self.median is None:
+            return f"不可达（{len(self.samples)} 次）"
+        return f"中位 {self.median * 1000:.0f} ms，丢包 {self.loss * 100:.0f}%"
+
+
+class HealthMonitor:
+    # servers(): 当前配置的服务器名；lookup(name): 名称 -> Resolver；candidates(): 按优先顺序的候选名称；
+    # apply(names): 写配置并重载服务，返回 (成功, 错误信息)
+    def __init__(self, servers, lookup, candidates, apply, policy=None, interval=60, jitter=0.2, budget=8,
+                 attempts=2, timeout=2.0, window=10, probe=run_probes, on_event=None, clock=time.monotonic):
+        self.servers = servers
+        self.lookup = lookup
+        self.candidates = candidates
+        self.apply = apply
+        self.policy = policy or HealthPolicy()
+        self.interval = interval
+        self.jitter = jitter
+        self.budget = budget
+        self.attempts = attempts
+        self.timeout = timeout
+        self.window = window
+        self.probe = probe
+        self.on_event = on_event
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.strikes = {}
+        self.cooldown_until = 0
+        self.cursor = 0
+        self.unprobeable = set()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def emit(self, msg):
+        if self.on_event:
+            self.on_event(msg)
+
+    def stats(self, name):
+        with self.lock:
+            w = self.windows.get(name)
+            if w is None:
+                w = self.windows[name] = HealthWindow(self.window)
+            return w
+
+    def pick_probes(self, configured):
+        # 配置中的服务器每轮必测，剩余预算轮流分给候选
+        room = max(0, self.budget - len(configured))
+        pool = [n for n in self.candidates() if n not in configured]
+        if not pool or not room:
+            return []
+        start = self.cursor % len(pool)
+        picked = (pool[start:] + pool[:start])[:room]
+        self.cursor = start + len(picked)
+        return picked
+
+    def run_round(self):
+        configured = list(self.servers() or [])
+        names = configured + self.pick_probes(configured)
+        resolvers = []
+        for r in (self.lookup(n) for n in names):
+            if r is None:
+                continue
+            if not probeable(r):
+                if r.name in configured and r.name not in self.unprobeable:
+                    self.emit(f"{r.name} 无法测速，不参与健康检查与自动切换")
+                self.unprobeable.add(r.name)
+                continue
+            self.unprobeable.discard(r.name)
+            resolvers.append(r)
+        if not resolvers:
+            return None
+        results = self.probe(resolvers, attempts=self.attempts, timeout=self.timeout)
+        for name, result in results.items():
+            self.stats(name).add(result)
+        return self.evaluate(configured)
+
+    def evaluate(self, configured):
+        worst = None
+        for name in configured:
+            w = self.windows.get(name)
+            if w is not None and name not in self.unprobeable and w.degraded(self.policy):
+                self.strikes[name] = self.strikes.get(name, 0) + 1
+                if self.strikes[name] >= self.policy.strikes and (worst is None or self.strikes[name] > self.strikes[worst]):
+                    worst = name
+            else:
+                self.strikes.pop(name, None)
+        if worst is None:
+            return None
+        now = self.clock()
+        if now < self.cooldown_until:
+            return None
+        replacement = self.best_candidate(configured, self.windows[worst])
+        if replacement is None:
+            self.emit(f"{worst} 持续劣化（{self.windows[worst].summary()}），暂无可替换的候选")
+            return None
+        new = [replacement if n == worst else n for n in configured]
+        ok, err = self.apply(new)
+        if not ok:
+            self.emit(f"切换 {worst} → {replacement} 失败: {err}")
+            return None
+        # 每轮最多切换一个，并进入冷却期
+        self.cooldown_until = now + self.policy.cooldown
+        self.strikes.pop(worst, None)
+        self.emit(f"{worst} 劣化（{self.windows[worst].summary()}），已切换为 {replacement}"
+                  f"（{self.windows[replacement].summary()}）")
+        return worst, replacement
+
+    def best_candidate(self, configured, bad):
+        best = None
+        limit = bad.median * (1 - self.policy.margin) if bad.median is not None and bad.loss <= self.policy.max_loss else None
+        for name, w in list(self.windows.items()):
+            if name in configured or not w.healthy(self.policy):
+                continue
+            if limit is not None and w.median > limit:
+                continue
+            if best is None or w.median < self.windows[best].median:
+                best = name
+        return best
+
+    def next_delay(self):
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def start(self):
+        if self.thread is None:
+            # 每次启动用新的停止事件，避免尚未退出的旧线程被重新唤醒
+            self.stopped = threading.Event()
+            self.thread = threading.Thread(target=self.run, args=(None, self.stopped), name="health-monitor",
+                                           daemon=True)
+            self.thread.start()
+
+    def run(self, rounds=None, stopped=None):
+        stopped = stopped or self.stopped
+        done = 0
+        while not stopped.is_set():
+            try:
+                self.run_round()
+            except Exception as e:
+                self.emit(f"健康检查异常: {e}")
+            done += 1
+            if rounds is not None and done >= rounds:
+                break
+            stopped.wait(self.next_delay())
+
+    def close(self, wait=True):
+        self.stopped.set()
+        if self.thread:
+            if wait:
+                self.thread.join(timeout=2)
+            self.thread = None
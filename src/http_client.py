@@ -0,0 +1,220 @@
+import socket
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.retry import Retry
+
+import metrics
+
+# --------- 共享HTTP客户端 ---------
+# 所有网络请求共用一个Session：按主机保持长连接池、统一重试退避与代理前缀改写，
+# 并记录每次请求的 DNS/建连/TLS/首字节/总耗时，供界面和统计读取。
+_local = threading.local()
+
+
+class RequestTiming:
+    __slots__ = ("method", "url", "host", "status", "dns", "connect", "tls",
+                 "first_byte", "total", "reused", "error", "started")
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        self.host = urlsplit(url).hostname or ""
+        self.status = None
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.first_byte = None
+        self.total = None
+        self.reused = True
+        self.error = None
+        self.started = time.time()
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self):
+        return (f"RequestTiming({self.host} {self.status} dns={self.dns * 1000:.0f}ms "
+                f"connect={self.connect * 1000:.0f}ms tls={self.tls * 1000:.0f}ms "
+                f"ttfb={(self.first_byte or 0) * 1000:.0f}ms total={(self.total or 0) * 1000:.0f}ms)")
+
+
+def _current():
+    return getattr(_local, "timing", None)
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        # 自己解析一次以单独计时，再按解析结果逐个地址建连（与urllib3相同的回退顺序），
+        # 每个地址只连一次，也不再按主机名重复解析
+        rec = _current()
+        host = self._dns_host
+        t0 = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host.strip("[]"), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to resolve {host}: {e}") from e
+        addrs = list(dict.fromkeys(info[4][0] for info in infos))
+        if not addrs:
+            raise NewConnectionError(self, f"Failed to resolve {host}: getaddrinfo returns an empty list")
+        t1 = time.perf_counter()
+        if rec is not None:
+            # 建连失败时也保留解析耗时
+            rec.reused = False
+            rec.dns += t1 - t0
+        try:
+            for i, addr in enumerate(addrs):
+                self._dns_host = addr
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if i == len(addrs) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+        t2 = time.perf_counter()
+        self._tcp_elapsed = t2 - t0
+        if rec is not None:
+            rec.connect += t2 - t1
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        self._tcp_elapsed = 0.0
+        t0 = time.perf_counter()
+        super().connect()
+        rec = _current()
+        if rec is not None:
+            rec.tls += max(0.0, time.perf_counter() - t0 - self._tcp_elapsed)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def make_retry(total=2):
+    return Retry(
+        total=total,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+
+
+def _session(retry, pool_maxsize):
+    s = requests.Session()
+    adapter = TimedAdapter(pool_connections=16, pool_maxsize=pool_maxsize, max_retries=retry)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+class HttpClient:
+    def __init__(self, proxy_prefix=None, retries=2, pool_maxsize=8, history=500):
+        self.proxy_prefix = proxy_prefix
+        self.session = _session(make_retry(retries), pool_maxsize)
+        # 测速类请求不重试，避免拉长竞速时间
+        self.probe_session = _session(Retry(total=0, raise_on_status=False), pool_maxsize)
+        self.timings = deque(maxlen=history)
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def rewrite(self, url, prefix=None, proxied=True):
+        if prefix is None and proxied:
+            prefix = self.proxy_prefix
+        return prefix + url if prefix else url
+
+    def get(self, url, prefix=None, proxied=True, retry=True, **kwargs):
+        return self.request("GET", self.rewrite(url, prefix, proxied), retry=retry, **kwargs)
+
+    def request(self, method, url, retry=True, **kwargs):
+        session = self.session if retry else self.probe_session
+        rec = RequestTiming(method, url)
+        _local.timing = rec
+        start = time.perf_counter()
+        try:
+            r = session.request(method, url, **kwargs)
+        except Exception as e:
+            rec.error = type(e).__name__
+            rec.total = time.perf_counter() - start
+            self.record(rec)
+            raise
+        finally:
+            _local.timing = None
+        rec.status = r.status_code
+        rec.first_byte = r.elapsed.total_seconds()
+        if kwargs.get("stream"):
+            # 流式响应在关闭时才算结束
+            close = r.close
+
+            def _close():
+                if rec.total is None:
+                    rec.total = time.perf_counter() - start
+                    self.record(rec)
+                close()
+            r.close = _close
+        else:
+            rec.total = time.perf_counter() - start
+            self.record(rec)
+        return r
+
+    def record(self, rec):
+        with self.lock:
+            self.timings.append(rec)
+            listeners = list(self.listeners)
+        total = rec.total or 0.0
+        metrics.record("http.fetch", time.monotonic() - total, total, error=rec.error, host=rec.host, code=rec.status,
+                       dns=round(rec.dns, 6), connect=round(rec.connect, 6), tls=round(rec.tls, 6),
+                       ttfb=rec.first_byte, reused=rec.reused)
+        metrics.count("http_requests", host=rec.host, result=rec.error or rec.status)
+        for fn in listeners:
+            fn(rec)
+
+    def recent(self, host=None):
+        with self.lock:
+            items = list(self.timings)
+        return [t for t in items if host is None or t.host == host]
+
+    def close(self):
+        self.session.close()
+        self.probe_session.close()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HttpClient()
+        return _default
@@ -0,0 +1,145 @@
+import platform
+import traceback
+from pathlib import Path
+
+from core import APP_DIR
+from downloader import SegmentedDownloader, parse_digest, sha256_file
+from http_client import get_client
+from release_cache import ReleaseCache, ReleaseIndex
+from version_store import VersionStore
+
+# --------- dnscrypt-proxy 下载安装 ---------
+class DNSCryptInstaller:
+    def __init__(self, parent, proxy_prefix=None, client=None):
+        self.parent = parent
+        self.client = client or get_client()
+        if proxy_prefix is not None:
+            self.client.proxy_prefix = proxy_prefix
+        self.on_progress = None
+        self.store = VersionStore(APP_DIR / "store", Path.home() / "dnscrypt-proxy")
+        self.release_cache = ReleaseCache(APP_DIR / "releases_cache.json", client=self.client)
+
+    @property
+    def proxy_prefix(self):
+        return self.client.proxy_prefix
+
+    @proxy_prefix.setter
+    def proxy_prefix(self, prefix):
+        self.client.proxy_prefix = prefix
+
+    def get_releases(self):
+        # 版本元数据带ETag缓存在本地，网络失败时沿用缓存
+        try:
+            return self.release_cache.fetch()
+        except Exception as e:
+            if self.release_cache.releases:
+                self.parent.log(f"获取版本列表失败，使用本地缓存: {e}")
+                return self.release_cache.releases
+            self.parent.log(f"获取版本列表失败: {e}")
+            return []
+
+    def get_latest(self):
+        if not self.get_releases():
+            raise RuntimeError("无法获得任何发行版本信息")
+        release = self.release_cache.index.newest()
+        if not release:
+            raise RuntimeError(f"没有适合当前平台（{platform.system()} {platform.machine()}）的版本")
+        return release
+
+    def select_asset_url(self, release):
+        asset = self.select_asset(release)
+        return asset["browser_download_url"] if asset else None
+
+    def select_asset(self, release):
+        index = self.release_cache.index or ReleaseIndex([release])
+        return index.asset(release)
+
+    def download(self, url, dest, sha256=None):
+        self.parent.log(f"下载文件：{self.client.rewrite(url)}")
+        SegmentedDownloader(url, dest, progress=self.on_progress, client=self.client).run(sha256)
+
+    def fetch_archive(self, asset, tmp_dir):
+        # 已缓存的归档先按发布的SHA256校验，不一致则删除重下；下载中的分段不会出现在目标路径
+        url = asset["browser_download_url"]
+        sha256 = parse_digest(asset.get("digest"))
+        tmp_dir.mkdir(exist_ok=True)
+        archive_path = tmp_dir / url.split("/")[-1]
+        if not sha256:
+            self.parent.log(f"{asset.get('name')} 未提供SHA256校验值，跳过校验")
+        if archive_path.exists():
+            if not sha256 or sha256_file(archive_path) == sha256:
+                self.parent.log(f"使用已缓存的归档：{archive_path}")
+                return archive_path
+            self.parent.log("缓存的归档校验失败，重新下载")
+            archive_path.unlink()
+        self.download(url, archive_path, sha256)
+        return archive_path
+
+    def download_and_install(self):
+        releases = self.get_releases()
+        if not releases:
+            self.parent.log("无法获得任何发行版本信息")
+            self.parent.notify("critical", "错误", "获取dnscrypt-proxy版本列表失败。")
+            return
+        # 从最新到旧版本遍历尝试下载，只遍历当前平台有下载包的版本；正式版全部失败后才尝试预发布版
+        index = self.release_cache.index
+        stable = index.installable()
+        previews = [r for r in index.installable(prerelease=True) if r.get("prerelease")]
+        for release in stable + previews:
+            tag_name = release.get("tag_name", "")
+            self.parent.log(f"尝试下载{'预发布' if release.get('prerelease') else ''}版本：{tag_name}")
+            asset = self.select_asset(release)
+            try:
+                bin_path = self.install_release(release, asset, Path.home() / ".dnscrypt_proxy_tmp")
+                self.parent.log(f"版本 {tag_name} 安装成功，路径：{bin_path}")
+                self.parent.notify("information", "安装成功", f"dnscrypt-proxy {tag_name} 安装完成")
+                return
+            except Exception:
+                self.parent.log(f"版本 {tag_name} 下载或安装失败，尝试回退到旧版本")
+                self.parent.log(traceback.format_exc())
+                continue
+        # 全部失败后提示
+        self.parent.log("所有尝试的版本下载失败")
+        self.parent.notify("critical", "错误", "所有尝试的dnscrypt-proxy版本下载失败，请检查网络或代理设置")
+
+    def install_release(self, release, asset, tmp_dir):
+        # 已在本地版本库中的版本直接切换链接，无需下载解压
+        tag = release.get("tag_name", "")
+        sha256 = parse_digest(asset.get("digest"))
+        key = self.store.key(tag, sha256) if sha256 else self.store.find_tag(tag)
+        if key and self.store.has(key):
+            self.parent.log(f"版本 {tag} 已在本地版本库，直接切换")
+        else:
+            archive_path = self.fetch_archive(asset, tmp_dir)
+            self.parent.log(f"解压并入库：{tag}")
+            key = self.store.add(tag, archive_path, sha256)
+        self.store.activate(key)
+        return self.store.binary()
+
+    def rollback(self):
+        key = self.store.rollback()
+        if key:
+            self.parent.log(f"已回滚到版本：{key}")
+        else:
+            self.parent.log("没有可回滚的版本")
+        return key
+
+    def install(self):
+        try:
+            self.parent.log("获取最新版本信息...")
+            release = self.get_latest()
+            asset = self.select_asset(release)
+            if not asset:
+                raise RuntimeError(f"版本 {release.get('tag_name', '')} 无适合的下载包")
+            self.parent.log(f"下载包链接：{asset['browser_download_url']}")
+            binfile = self.install_release(release, asset, Path.home() / ".dnscrypt_installer_tmp")
+            inst_dir = self.store.active
+            self.parent.log(f"安装成功，目录：{inst_dir}，可执行文件：{binfile}")
+            self.parent.notify("information", "安装成功", f"dnscrypt-proxy安装完成至{inst_dir}")
+            return True
+        except Exception as e:
+            self.parent.log(f"安装失败: {e}")
+            tb = traceback.format_exc()
+            self.parent.log(tb)
+            self.parent.notify("critical", "安装失败", f"dnscrypt-proxy安装失败: {e}")
+            return False
@@ -0,0 +1,188 @@
+import asyncio
+import math
+import os
+import random
+import statistics
+import struct
+import time
+
+# --------- 服务器延迟测速 ---------
+# DNSCrypt / 普通DNS 走UDP：前者查询证书TXT记录（即握手第一步），后者查询根NS；
+# DoQ 同样走UDP：发一个未知版本号的QUIC长包头数据包，服务器按 RFC 9000 §6 回复明文的版本协商包，
+# 恰好一个往返，不需要做TLS握手。DoH/DoT 及中继只测TCP建连耗时。所有探测在同一事件循环内并发，受信号量限制。
+QTYPE_NS = 2
+QTYPE_TXT = 16
+UDP_PROTOS = (0x00, 0x01, 0x04)
+QUIC_PROBE_VERSION = 0x1a2a3a4a  # RFC 9000 §15 预留的 0x?a?a?a?a 版本，服务器不会支持
+QUIC_MIN_DATAGRAM = 1200  # 小于此长度的客户端首包服务器不予回应
+
+
+def build_query(qname, qtype, qid, rd=True):
+    labels = b"".join(bytes([len(l)]) + l.encode("ascii") for l in qname.strip(".").split(".") if l)
+    header = struct.pack(">HHHHHH", qid, 0x0100 if rd else 0, 1, 0, 0, 0)
+    return header + labels + b"\x00" + struct.pack(">HH", qtype, 1)
+
+
+def build_quic_probe(dcid, scid):
+    # 长包头：首字节 0xC0，版本号，DCID/SCID 各带长度前缀，补零到最小长度
+    header = bytes([0xC0]) + struct.pack(">I", QUIC_PROBE_VERSION) + bytes([len(dcid)]) + dcid + bytes([len(scid)]) + scid
+    return header + bytes(QUIC_MIN_DATAGRAM - len(header))
+
+
+def is_version_negotiation(data, scid):
+    # 版本协商包：长包头、版本号为0，其DCID回显我们的SCID
+    if len(data) < 7 or not data[0] & 0x80 or data[1:5] != b"\x00\x00\x00\x00":
+        return False
+    return data[6:6 + data[5]] == scid
+
+
+def percentile(values, p):
+    # 最近秩法
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class ProbeResult:
+    __slots__ = ("name", "samples", "failures")
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+        self.failures = 0
+
+    @property
+    def ok(self):
+        return bool(self.samples)
+
+    @property
+    def min(self):
+        return min(self.samples) if self.samples else None
+
+    @property
+    def median(self):
+        return statistics.median(self.samples) if self.samples else None
+
+    @property
+    def p95(self):
+        return percentile(self.samples, 95)
+
+    @property
+    def loss(self):
+        total = len(self.samples) + self.failures
+        return self.failures / total if total else 1.0
+
+    def sort_key(self):
+        return (not self.ok, self.median or 0, self.loss)
+
+    def summary(self):
+        if not self.ok:
+            return "超时"
+        return f"{self.min * 1000:.0f}/{self.median * 1000:.0f}/{self.p95 * 1000:.0f} ms"
+
+    def __repr__(self):
+        return f"ProbeResult({self.name!r}, {self.summary()})"
+
+
+class _UDPProbe(asyncio.DatagramProtocol):
+    def __init__(self, match, fut):
+        self.match = match
+        self.fut = fut
+
+    def datagram_received(self, data, addr):
+        if self.match(data) and not self.fut.done():
+            self.fut.set_result(time.perf_counter())
+
+    def error_received(self, exc):
+        if not self.fut.done():
+            self.fut.set_exception(exc)
+
+
+def _dns_reply(qid):
+    return lambda data: len(data) >= 2 and struct.unpack(">H", data[:2])[0] == qid
+
+
+async def probe_udp(host, port, payload, match, timeout):
+    # match(data) 判断收到的数据报是否是本次探测的应答
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(lambda: _UDPProbe(match, fut), remote_addr=(host, port))
+    try:
+        start = time.perf_counter()
+        transport.sendto(payload)
+        end = await asyncio.wait_for(fut, timeout)
+        return end - start
+    finally:
+        transport.close()
+
+
+async def probe_tcp(host, port, timeout):
+    start = time.perf_counter()
+    _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return elapsed
+
+
+async def probe_once(stamp, timeout):
+    ep = stamp.endpoint()
+    if not ep:
+        raise OSError("stamp无可用地址")
+    host, port = ep
+    if stamp.proto == 0x04:
+        dcid, scid = os.urandom(8), os.urandom(8)
+        return await probe_udp(host, port, build_quic_probe(dcid, scid),
+                               lambda data: is_version_negotiation(data, scid), timeout)
+    if stamp.proto in UDP_PROTOS:
+        qid = random.randrange(1, 0xFFFF)
+        if stamp.proto == 0x01:
+            payload = build_query(stamp.provider, QTYPE_TXT, qid, rd=False)
+        else:
+            payload = build_query(".", QTYPE_NS, qid)
+        return await probe_udp(host, port, payload, _dns_reply(qid), timeout)
+    return await probe_tcp(host, port, timeout)
+
+
+async def probe_resolver(resolver, sem, attempts, timeout):
+    result = ProbeResult(resolver.name)
+    stamp = resolver.stamp
+    if stamp is None:
+        result.failures = attempts
+        return result
+    for _ in range(attempts):
+        async with sem:
+            try:
+                result.samples.append(await probe_once(stamp, timeout))
+            except (OSError, ValueError, asyncio.TimeoutError):
+                result.failures += 1
+    return result
+
+
+async def probe_all(resolvers, attempts=3, concurrency=64, timeout=2.0):
+    sem = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*(probe_resolver(r, sem, attempts, timeout) for r in resolvers))
+    return {r.name: r for r in results}
+
+
+def run_probes(resolvers, attempts=3, concurrency=64, timeout=2.0):
+    # 供工作线程调用的同步入口
+    return asyncio.run(probe_all(resolvers, attempts, concurrency, timeout))
+
+
+def probeable(resolver):
+    # 没有stamp或stamp里没有可连接的地址时无法测速；健康监测应跳过，而不是当成丢包
+    stamp = resolver.stamp
+    return stamp is not None and stamp.endpoint() is not None
+
+
+def rank(results):
+    return sorted(results.values(), key=ProbeResult.sort_key)
+
+
+def fastest(results, n):
+    return [r.name for r in rank(results) if r.ok][:n]
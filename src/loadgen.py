@@ -0,0 +1,232 @@
+import asyncio
+import itertools
+import random
+import struct
+import time
+from collections import Counter
+
+from latency import build_query, percentile
+
+# --------- 本地监听地址压测 ---------
+# 按目标QPS开环发送（到点就发，不等前一个应答），并用并发上限约束在途查询数。
+# 并发占满时查询只能推迟发送，延迟从计划发送时刻算起，积压的等待计入分位数（避免协同遗漏），
+# 推迟超过一个发送间隔的查询另计为 late。
+# 域名序列由语料和随机种子决定，相同参数可重放，便于对比不同配置。
+QTYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "PTR": 12, "MX": 15, "TXT": 16, "AAAA": 28, "SRV": 33, "HTTPS": 65}
+RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+DEFAULT_CORPUS = [
+    (name, qtype)
+    for name in (
+        "google.com", "youtube.com", "facebook.com", "baidu.com", "wikipedia.org", "qq.com", "amazon.com",
+        "taobao.com", "twitter.com", "instagram.com", "linkedin.com", "bilibili.com", "github.com",
+        "microsoft.com", "apple.com", "netflix.com", "zhihu.com", "weibo.com", "jd.com", "reddit.com",
+        "cloudflare.com", "stackoverflow.com", "office.com", "bing.com", "yahoo.com", "163.com",
+        "sina.com.cn", "aliyun.com", "tencent.com", "mozilla.org", "python.org", "dnscrypt.info",
+    )
+    for qtype in ("A", "AAAA")
+]
+
+
+def parse_listen(addr):
+    # "127.0.0.1:53" / "[::1]:53" -> (host, port)
+    addr = addr.strip()
+    if addr.startswith("["):
+        host, _, port = addr[1:].partition("]:")
+    else:
+        host, _, port = addr.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"无法解析的监听地址: {addr}")
+    if host in ("0.0.0.0", "::"):
+        host = "127.0.0.1" if host == "0.0.0.0" else "::1"
+    return host, int(port)
+
+
+def listen_targets(config_path):
+    from toml_config import open_config
+    return [parse_listen(a) for a in open_config(config_path).get("listen_addresses") or []]
+
+
+def load_corpus(path):
+    # 每行 "域名 [类型]"；也接受 dnscrypt-proxy 的 tsv 查询日志，可直接重放真实流量
+    entries = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split("\t") if "\t" in line else line.split()
+            if line.startswith("[") and len(parts) >= 4:
+                name, qtype = parts[2], parts[3]
+            else:
+                name, qtype = parts[0], parts[1] if len(parts) > 1 else "A"
+            qtype = qtype.upper()
+            if qtype in QTYPES:
+                entries.append((name.rstrip("."), qtype))
+    return entries
+
+
+def sequence(corpus, count, seed=0):
+    # 以种子打乱后循环取用，相同 (语料, 数量, 种子) 得到相同的查询序列
+    order = list(corpus)
+    random.Random(seed).shuffle(order)
+    return list(itertools.islice(itertools.cycle(order), count))
+
+
+class LoadResult:
+    def __init__(self, target, qps, concurrency):
+        self.target = target
+        self.qps = qps
+        self.concurrency = concurrency
+        self.sent = 0
+        self.late = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.rcodes = Counter()
+        self.latencies = []
+        self.duration = 0.0
+
+    @property
+    def answered(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        return self.answered / self.duration if self.duration else 0.0
+
+    def pct(self, p):
+        value = percentile(self.latencies, p)
+        return None if value is None else value * 1000
+
+    def to_dict(self):
+        return {
+            "target": f"{self.target[0]}:{self.target[1]}",
+            "qps": self.qps,
+            "concurrency": self.concurrency,
+            "sent": self.sent,
+            "late": self.late,
+            "answered": self.answered,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rcodes": dict(self.rcodes),
+            "duration": self.duration,
+            "throughput": self.throughput,
+            "p50_ms": self.pct(50),
+            "p95_ms": self.pct(95),
+            "p99_ms": self.pct(99),
+        }
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def compare(results):
+    # results: [(标签, LoadResult)]，返回并排对比的文本表格
+    rows = [("配置", "发送", "推迟", "应答", "吞吐(qps)", "P50", "P95", "P99", "超时", "错误")]
+    for label, r in results:
+        rows.append((label, str(r.sent), str(r.late), str(r.answered), f"{r.throughput:.0f}", _ms(r.pct(50)),
+                     _ms(r.pct(95)), _ms(r.pct(99)), str(r.timeouts), str(r.errors)))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() for row in rows]
+
+
+class _Socket(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.waiting = {}
+        self.transport = None
+        self.next_id = random.randrange(1, 0xFFFF)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def alloc(self):
+        for _ in range(0x10000):
+            self.next_id = self.next_id % 0xFFFF + 1
+            if self.next_id not in self.waiting:
+                return self.next_id
+        raise RuntimeError("查询ID耗尽")
+
+    def datagram_received(self, data, addr):
+        if len(data) < 4:
+            return
+        qid = struct.unpack(">H", data[:2])[0]
+        fut = self.waiting.pop(qid, None)
+        if fut is not None and not fut.done():
+            fut.set_result((time.perf_counter(), data[3] & 0x0F))
+
+    def error_received(self, exc):
+        # ICMP 不可达等错误无法对应到具体查询，让所有在途查询失败
+        for fut in self.waiting.values():
+            if not fut.done():
+                fut.set_exception(exc)
+        self.waiting.clear()
+
+
+async def _query(sock, result, name, qtype, timeout, sem, scheduled=None):
+    # scheduled 为计划发送时刻（限速模式），延迟从它算起；不限速时从实际发送算起
+    loop = asyncio.get_running_loop()
+    try:
+        qid = sock.alloc()
+        fut = loop.create_future()
+        sock.waiting[qid] = fut
+        start = time.perf_counter()
+        sock.transport.sendto(build_query(name, QTYPES[qtype], qid))
+        try:
+            end, rcode = await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            sock.waiting.pop(qid, None)
+            result.timeouts += 1
+            return
+        except OSError:
+            result.errors += 1
+            return
+        result.latencies.append(end - (start if scheduled is None else scheduled))
+        result.rcodes[RCODES.get(rcode, str(rcode))] += 1
+        if rcode not in (0, 3):
+            result.errors += 1
+    finally:
+        sem.release()
+
+
+async def run_load_async(target, queries, qps=0, concurrency=64, timeout=2.0, sockets=8, progress=None):
+    loop = asyncio.get_running_loop()
+    host, port = target
+    result = LoadResult(target, qps, concurrency)
+    socks = []
+    for _ in range(max(1, min(sockets, concurrency))):
+        _, proto = await loop.create_datagram_endpoint(_Socket, remote_addr=(host, port))
+        socks.append(proto)
+    sem = asyncio.Semaphore(concurrency)
+    tasks = set()
+    start = time.perf_counter()
+    interval = 1.0 / qps if qps else 0
+    try:
+        for i, (name, qtype) in enumerate(queries):
+            scheduled = None
+            if interval:
+                scheduled = start + i * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await sem.acquire()
+            if scheduled is not None and time.perf_counter() - scheduled > interval:
+                result.late += 1
+            task = loop.create_task(_query(socks[i % len(socks)], result, name, qtype, timeout, sem, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            result.sent += 1
+            if progress and result.sent % 1000 == 0:
+                progress(result.sent, len(queries))
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        result.duration = time.perf_counter() - start
+        for s in socks:
+            s.transport.close()
+    return result
+
+
+def run_load(target, corpus=None, count=1000, qps=0, concurrency=64, timeout=2.0, seed=0, progress=None):
+    # 供工作线程/命令行调用的同步入口；qps=0 表示不限速，仅受并发上限约束
+    queries = sequence(corpus or DEFAULT_CORPUS, count, seed)
+    return asyncio.run(run_load_async(target, queries, qps, concurrency, timeout, progress=progress))
@@ -0,0 +1,99 @@
+import threading
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import (
+    QComboBox, QHBoxLayout, QLabel, QLineEdit, QPlainTextEdit, QPushButton, QSpinBox, QVBoxLayout, QWidget
+)
+
+from loadgen import compare, parse_listen, run_load
+
+# --------- 本地压测面板 ---------
+# 压测在工作线程中运行，结果经信号回到界面线程；本次会话的所有结果并排显示，方便对比不同配置。
+
+
+def _spin(low, high, value, prefix, special=None):
+    box = QSpinBox()
+    box.setRange(low, high)
+    box.setValue(value)
+    box.setPrefix(prefix)
+    if special:
+        box.setSpecialValueText(special)
+    return box
+
+
+class LoadTestPanel(QWidget):
+    finished = pyqtSignal(str, object)
+
+    def __init__(self, targets, log=None, parent=None):
+        super().__init__(parent)
+        self.targets = targets
+        self.log = log or (lambda msg: None)
+        self.results = []
+        layout = QVBoxLayout()
+        row = QHBoxLayout()
+        self.target = QComboBox()
+        self.target.setEditable(True)
+        self.qps = _spin(0, 200000, 500, "QPS: ", "QPS: 不限")
+        self.concurrency = _spin(1, 4096, 64, "并发: ")
+        self.count = _spin(10, 10000000, 5000, "查询数: ")
+        self.label = QLineEdit()
+        self.label.setPlaceholderText("本次配置的标签，如 cache_size=4096")
+        self.start_btn = QPushButton("开始压测")
+        self.start_btn.clicked.connect(self.start)
+        row.addWidget(QLabel("目标"))
+        row.addWidget(self.target, stretch=1)
+        for w in (self.qps, self.concurrency, self.count, self.label, self.start_btn):
+            row.addWidget(w)
+        layout.addLayout(row)
+        self.output = QPlainTextEdit()
+        self.output.setReadOnly(True)
+        self.output.setFont(QFont("monospace"))
+        layout.addWidget(self.output, stretch=1)
+        self.setLayout(layout)
+        self.finished.connect(self.on_finished)
+
+    def refresh_targets(self):
+        current = self.target.currentText()
+        self.target.clear()
+        try:
+            self.target.addItems(f"[{h}]:{p}" if ":" in h else f"{h}:{p}" for h, p in self.targets())
+        except Exception as e:
+            self.log(f"读取 listen_addresses 失败: {e}")
+        if current:
+            self.target.setCurrentText(current)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.target.count():
+            self.refresh_targets()
+
+    def start(self):
+        try:
+            target = parse_listen(self.target.currentText())
+        except ValueError as e:
+            self.output.appendPlainText(str(e))
+            return
+        label = self.label.text().strip() or f"#{len(self.results) + 1}"
+        qps, concurrency, count = self.qps.value(), self.concurrency.value(), self.count.value()
+        self.start_btn.setEnabled(False)
+        self.log(f"开始压测 {target[0]}:{target[1]}，QPS {qps or '不限'}，并发 {concurrency}，共 {count} 个查询")
+
+        def _run():
+            try:
+                result = run_load(target, count=count, qps=qps, concurrency=concurrency)
+            except Exception as e:
+                result = e
+            self.finished.emit(label, result)
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def on_finished(self, label, result):
+        self.start_btn.setEnabled(True)
+        if isinstance(result, Exception):
+            self.output.appendPlainText(f"{label}: 压测失败: {result}")
+            return
+        self.results.append((label, result))
+        self.log(f"压测 {label} 完成：吞吐 {result.throughput:.0f} qps，推迟发送 {result.late}，"
+                 f"超时 {result.timeouts}，错误 {result.errors}")
+        self.output.setPlainText("\n".join(compare(self.results)))
@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+# --------- 日志管线 ---------
+# 任意线程调用 write() 只做一次无锁入队；后台线程负责写环形缓冲和滚动日志文件，
+# 并按固定帧率把积攒的行批量交给各个sink（界面通过Qt信号接收）。
+
+
+class RotatingFile:
+    def __init__(self, path, max_bytes=1024 * 1024, backups=3):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(self.path, "a", encoding="utf-8")
+
+    def write_lines(self, lines):
+        # 一批可能很大，按大小分段写入，保证单个文件不会远超上限
+        size = self.f.tell()
+        buf = []
+        for line in lines:
+            buf.append(line)
+            size += len(line.encode("utf-8")) + 1
+            if size >= self.max_bytes:
+                self.f.write("\n".join(buf) + "\n")
+                self.rotate()
+                buf = []
+                size = 0
+        if buf:
+            self.f.write("\n".join(buf) + "\n")
+        self.f.flush()
+
+    def rotate(self):
+        self.f.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self.f = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self.f.close()
+
+
+class LogPipeline:
+    def __init__(self, path=None, capacity=5000, fps=10, max_bytes=1024 * 1024, backups=3, console=True):
+        self.q = queue.SimpleQueue()
+        self.ring = deque(maxlen=capacity)
+        self.interval = 1.0 / fps
+        self.sinks = []
+        self.console = console
+        self.file = RotatingFile(path, max_bytes, backups) if path else None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="log-pipeline", daemon=True)
+        self.thread.start()
+
+    def write(self, msg):
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.q.put(f"[{ts}] {msg}")
+
+    def add_sink(self, fn):
+        self.sinks.append(fn)
+
+    def recent(self, n=None):
+        lines = list(self.ring)
+        return lines if n is None else lines[-n:]
+
+    def drain(self, first=None, limit=10000):
+        batch = [] if first is None else [first]
+        while len(batch) < limit:
+            try:
+                batch.append(self.q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def handle(self, batch):
+        self.ring.extend(batch)
+        if self.file:
+            try:
+                self.file.write_lines(batch)
+            except OSError:
+                pass
+        if self.console:
+            print("\n".join(batch), flush=False)
+
+    def emit(self, pending):
+        for fn in self.sinks:
+            try:
+                fn(pending)
+            except Exception:
+                pass
+
+    def run(self):
+        pending = []
+        last_emit = time.monotonic()
+        while not self.stopped.is_set():
+            wait = max(0.0, self.interval - (time.monotonic() - last_emit)) if pending else self.interval
+            try:
+                first = self.q.get(timeout=wait)
+            except queue.Empty:
+                first = None
+            batch = self.drain(first)
+            if batch:
+                self.handle(batch)
+                pending.extend(batch)
+                # 界面一帧最多显示环形缓冲大小的行数，多余的旧行直接丢弃
+                if len(pending) > self.ring.maxlen:
+                    del pending[:-self.ring.maxlen]
+            if pending and time.monotonic() - last_emit >= self.interval:
+                self.emit(pending)
+                pending = []
+                last_emit = time.monotonic()
+        rest = self.drain()
+        if rest:
+            self.handle(rest)
+            pending.extend(rest)
+        if pending:
+            self.emit(pending)
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join(timeout=2)
+        if self.file:
+            self.file.close()
@@ -0,0 +1,284 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+# --------- 耗时与计数埋点 ---------
+# 各模块用 span("阶段名", 属性=...) 包住一段操作、用 count() 累加计数；所有记录进入同一个进程级 Registry。
+# 每条 span 结束时分发给 sink（如 JSONL 追踪文件），聚合结果可导出为 Prometheus textfile。
+# 只依赖标准库，命令行冷启动时导入也不会变慢。
+PREFIX = "dnscrypt_gui"
+ORIGIN = time.monotonic()
+_METRIC_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _metric(name):
+    return _METRIC_NAME.sub("_", name)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    return "{" + ",".join(f'{k}="{_label(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+
+class Registry:
+    def __init__(self, run_id=None, history=2000, origin=ORIGIN):
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.started = time.time()
+        self.origin = origin
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.spans = {}
+        self.records = deque(maxlen=history)
+        self.sinks = []
+        self.local = threading.local()
+
+    def add_sink(self, fn):
+        self.sinks.append(fn)
+
+    def remove_sink(self, fn):
+        if fn in self.sinks:
+            self.sinks.remove(fn)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        # 产出 attrs 字典，调用方可在 with 块内补充属性（如状态码、条目数）
+        stack = self.local.__dict__.setdefault("stack", [])
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        begin = time.monotonic()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            self.record(name, begin, time.monotonic() - begin, error=error, parent=parent, **attrs)
+
+    def timed(self, name):
+        def wrap(fn):
+            @wraps(fn)
+            def inner(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def record(self, name, begin, duration, error=None, parent=None, **attrs):
+        # begin 为 time.monotonic() 取值；外部已计时的事件（HTTP 请求、启动阶段）也走这里，
+        # 未指定 parent 时归到当前线程正在进行的 span 之下
+        if parent is None:
+            stack = getattr(self.local, "stack", None)
+            parent = stack[-1] if stack else None
+        rec = {
+            "run": self.run_id,
+            "name": name,
+            "start": round(begin - self.origin, 6),
+            "duration": round(duration, 6),
+            "status": "error" if error else attrs.pop("status", "ok"),
+            "thread": threading.current_thread().name,
+        }
+        if parent:
+            rec["parent"] = parent
+        if error:
+            rec["error"] = error
+        if attrs:
+            rec["attrs"] = attrs
+        with self.lock:
+            agg = self.spans.get(name)
+            if agg is None:
+                agg = self.spans[name] = {"count": 0, "sum": 0.0, "max": 0.0, "last": 0.0, "errors": 0}
+            agg["count"] += 1
+            agg["sum"] += duration
+            agg["max"] = max(agg["max"], duration)
+            agg["last"] = duration
+            if rec["status"] in ("error", "failed"):
+                agg["errors"] += 1
+            self.records.append(rec)
+            sinks = list(self.sinks)
+        for fn in sinks:
+            try:
+                fn(rec)
+            except Exception:
+                pass
+        return rec
+
+    def mark(self, name, **attrs):
+        return self.record(name, time.monotonic(), 0.0, status="mark", **attrs)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def recent(self):
+        with self.lock:
+            return list(self.records)
+
+    def prometheus(self):
+        with self.lock:
+            spans = {k: dict(v) for k, v in self.spans.items()}
+            counters = dict(self.counters)
+        out = [
+            f"# HELP {PREFIX}_run_start_timestamp_seconds 本次运行的开始时间",
+            f"# TYPE {PREFIX}_run_start_timestamp_seconds gauge",
+            f"{PREFIX}_run_start_timestamp_seconds{_labels([('run', self.run_id)])} {self.started:.3f}",
+        ]
+        if spans:
+            out += [f"# HELP {PREFIX}_span_seconds 各阶段耗时", f"# TYPE {PREFIX}_span_seconds summary"]
+            for name in sorted(spans):
+                lb = _labels([("span", name)])
+                out.append(f"{PREFIX}_span_seconds_sum{lb} {spans[name]['sum']:.6f}")
+                out.append(f"{PREFIX}_span_seconds_count{lb} {spans[name]['count']}")
+            for metric, field, kind, help_text in (("span_last_seconds", "last", "gauge", "最近一次耗时"),
+                                                   ("span_max_seconds", "max", "gauge", "最长一次耗时"),
+                                                   ("span_errors_total", "errors", "counter", "失败次数")):
+                out += [f"# HELP {PREFIX}_{metric} {help_text}", f"# TYPE {PREFIX}_{metric} {kind}"]
+                for name in sorted(spans):
+                    out.append(f"{PREFIX}_{metric}{_labels([('span', name)])} {spans[name][field]:g}")
+        for name in sorted({k[0] for k in counters}):
+            metric = f"{PREFIX}_{_metric(name)}_total"
+            out.append(f"# TYPE {metric} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    out.append(f"{metric}{_labels(labels)} {value:g}")
+        return "\n".join(out) + "\n"
+
+    def write_textfile(self, path):
+        # node_exporter 的 textfile 收集器要求原子替换，避免读到半个文件
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+class JsonlTrace:
+    # 每条 span 一行 JSON；超过 max_bytes 时轮转为 .1，旧追踪在重启后仍可查看
+    def __init__(self, path, max_bytes=5 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def __call__(self, rec):
+        line = json.dumps(rec, ensure_ascii=False, default=str) + "\n"
+        with self.lock:
+            if self.file is None:
+                return
+            if self.file.tell() + len(line) > self.max_bytes:
+                self.file.close()
+                os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def load_runs(path):
+    # 读取追踪文件（含轮转出的 .1），按运行分组，返回 OrderedDict: run_id -> [记录]，按出现先后排列
+    path = Path(path)
+    runs = OrderedDict()
+    for p in (path.with_name(path.name + ".1"), path):
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(rec, dict) and "run" in rec:
+                        runs.setdefault(rec["run"], []).append(rec)
+        except OSError:
+            continue
+    return runs
+
+
+def breakdown(records):
+    # 汇总一次运行：按阶段名统计次数、总耗时与最长耗时，按总耗时降序
+    phases = {}
+    for rec in records:
+        if rec.get("status") == "mark":
+            continue
+        p = phases.setdefault(rec["name"], {"name": rec["name"], "count": 0, "total": 0.0, "max": 0.0,
+                                            "first": rec["start"], "errors": 0})
+        p["count"] += 1
+        p["total"] += rec["duration"]
+        p["max"] = max(p["max"], rec["duration"])
+        p["first"] = min(p["first"], rec["start"])
+        p["errors"] += rec.get("status") in ("error", "failed")
+    return sorted(phases.values(), key=lambda p: -p["total"])
+
+
+class Profiler:
+    # cProfile 开关：只采样调用 start() 的线程（cProfile 的限制），stop() 返回耗时最多的函数列表
+    def __init__(self):
+        self.profile = None
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def start(self):
+        import cProfile
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self, path=None, limit=25):
+        import io
+        import pstats
+        if self.profile is None:
+            return ""
+        self.profile.disable()
+        profile, self.profile = self.profile, None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(str(path))
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+_default = Registry()
+span = _default.span
+timed = _default.timed
+record = _default.record
+mark = _default.mark
+count = _default.count
+
+
+def registry():
+    return _default
+
+
+_trace = None
+
+
+def configure(trace_path=None):
+    # 进程启动时调用一次：挂上 JSONL 追踪文件
+    global _trace
+    if trace_path and _trace is None:
+        try:
+            _trace = JsonlTrace(trace_path)
+        except OSError:
+            return None
+        _default.add_sink(_trace)
+    return _trace
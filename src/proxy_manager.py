@@ -0,0 +1,204 @@
+import threading
+import time
+import json
+import os
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from core import APP_DIR
+from http_client import get_client
+
+# --------- 代理管理 ---------
+class ProxyScoreStore:
+    # 每个代理的延迟EWMA与连续失败次数，落盘保存，超过TTL视为过期
+    def __init__(self, path, ttl=6 * 3600, alpha=0.3):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.data = {"winner": None, "proxies": {}}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data.get("proxies"), dict):
+                self.data = {"winner": data.get("winner"), "proxies": data["proxies"]}
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        with self.lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+    def record(self, prefix, latency):
+        with self.lock:
+            entry = self.data["proxies"].setdefault(prefix, {"ewma": None, "failures": 0, "checked_at": 0})
+            if latency is None:
+                entry["failures"] += 1
+            else:
+                prev = entry["ewma"]
+                entry["ewma"] = latency if prev is None else self.alpha * latency + (1 - self.alpha) * prev
+                entry["failures"] = 0
+            entry["checked_at"] = time.time()
+
+    def set_winner(self, prefix):
+        with self.lock:
+            self.data["winner"] = prefix
+
+    def fresh_winner(self):
+        with self.lock:
+            prefix = self.data.get("winner")
+            entry = self.data["proxies"].get(prefix)
+            if not prefix or not entry:
+                return None
+            if entry["failures"] or time.time() - entry["checked_at"] > self.ttl:
+                return None
+            return prefix
+
+    def healthy(self, prefixes):
+        with self.lock:
+            return {
+                p: self.data["proxies"][p]["ewma"] for p in prefixes
+                if p in self.data["proxies"] and not self.data["proxies"][p]["failures"]
+                and self.data["proxies"][p]["ewma"] is not None
+            }
+
+    def best(self, prefixes):
+        healthy = self.healthy(prefixes)
+        return min(healthy, key=healthy.get) if healthy else None
+
+class ProxyManager:
+    def __init__(self, parent, score_path=None, client=None):
+        self.parent = parent
+        self.client = client or get_client()
+        # 优先使用指定有效代理列表
+        self.proxy_list = [
+            {"name": "GitHubProxy", "prefix": "https://gh-proxy.com/"},
+            {"name": "FastGit", "prefix": "https://gh.jasonzeng.dev/"},
+            {"name": "pipers", "prefix": "https://proxy.pipers.cn/"},
+            {"name": "gitmirror", "prefix": "https://hub.gitmirror.com/"},
+            {"name": "dgithub", "prefix": "https://dgithub.xyz/"}
+        ]
+        self.current_proxy = None
+        self.scores = ProxyScoreStore(score_path or APP_DIR / "proxy_scores.json")
+
+    def probe_proxy(self, prefix):
+        # 返回延迟（秒），失败返回None
+        test_url = "https://api.github.com/repos/DNSCrypt/dnscrypt-proxy/releases/latest"
+        start = time.monotonic()
+        try:
+            r = self.client.get(test_url, prefix=prefix, retry=False, timeout=7)
+            if r.status_code == 200:
+                metrics.count("proxy_probes", result="ok")
+                return time.monotonic() - start
+        except Exception:
+            pass
+        metrics.count("proxy_probes", result="failed")
+        return None
+
+    def test_proxy(self, prefix):
+        return self.probe_proxy(prefix) is not None
+
+    def race(self, prefixes):
+        # 同时探测所有候选，第一个成功返回的即延迟最低者；其余探测在后台跑完并记录评分
+        if not prefixes:
+            return None
+        with metrics.span("proxy.race", candidates=len(prefixes)) as attrs:
+            attrs["winner"] = winner = self.run_race(prefixes)
+            return winner
+
+    def run_race(self, prefixes):
+        pool = ThreadPoolExecutor(max_workers=len(prefixes))
+        futures = {pool.submit(self.probe_proxy, p): p for p in prefixes}
+        winner = None
+        remaining = len(futures)
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def on_done(fut):
+            nonlocal winner, remaining
+            prefix = futures[fut]
+            latency = fut.result()
+            self.scores.record(prefix, latency)
+            with lock:
+                if latency is not None and winner is None:
+                    winner = prefix
+                    done.set()
+                remaining -= 1
+                if remaining == 0:
+                    self.scores.save()
+                    done.set()
+
+        for fut in futures:
+            fut.add_done_callback(on_done)
+        pool.shutdown(wait=False)
+        done.wait()
+        return winner
+
+    def auto_detect(self, on_switch=None):
+        with metrics.span("proxy.detect") as attrs:
+            found = self.detect(on_switch, attrs)
+            attrs["proxy"] = self.current_proxy if found else None
+            return found
+
+    def detect(self, on_switch, attrs):
+        name_of = {p["prefix"]: p["name"] for p in self.proxy_list}
+        prefixes = list(name_of)
+        cached = self.scores.fresh_winner()
+        if cached in name_of:
+            attrs["source"] = "cache"
+            self.current_proxy = cached
+            self.parent.log(f"沿用上次代理：{name_of[cached]}，后台复测其余代理")
+            threading.Thread(target=self.recheck, args=(prefixes, on_switch), daemon=True).start()
+            return True
+        winner = self.race(prefixes)
+        attrs["source"] = "race"
+        if winner:
+            self.current_proxy = winner
+            self.scores.set_winner(winner)
+            self.scores.save()
+            self.parent.log(f"自动选用代理：{name_of[winner]}")
+            return True
+        attrs["source"] = "manual"
+        return self.manual_input()
+
+    def recheck(self, prefixes, on_switch=None):
+        pool = ThreadPoolExecutor(max_workers=len(prefixes))
+        for prefix, latency in zip(prefixes, pool.map(self.probe_proxy, prefixes)):
+            self.scores.record(prefix, latency)
+        pool.shutdown()
+        best = self.scores.best(prefixes)
+        if best:
+            self.scores.set_winner(best)
+        self.scores.save()
+        # 仅在当前代理已失效时切换，避免频繁变动
+        if best and best != self.current_proxy and self.current_proxy not in self.scores.healthy(prefixes):
+            self.current_proxy = best
+            self.parent.log(f"当前代理失效，切换为：{best}")
+            if on_switch:
+                on_switch(best)
+
+    def manual_input(self):
+        text, ok = self.parent.ask_text("输入代理前缀", "自动检测失败，请输入代理前缀（如：https://gh-proxy.com/）:")
+        if ok and text.strip():
+            if self.test_proxy(text.strip()):
+                self.current_proxy = text.strip()
+                self.parent.log(f"手动设置代理为：{text.strip()}")
+                return True
+            self.parent.log("代理测试失败，请重试")
+            self.parent.notify("warning", "无效代理", "代理测试失败，请重试")
+            return self.manual_input()
+        else:
+            self.parent.log("未设置有效代理")
+            self.parent.notify("warning", "代理设置", "未设置代理，可能影响下载速度")
+            return False
@@ -0,0 +1,452 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+# --------- 查询日志增量读取与统计 ---------
+# 只读取上次偏移之后新增的内容（按偏移定位读取，不映射文件，避免读取中被截断时触发 SIGBUS），
+# 偏移按 (inode, offset) 持久化，
+# 日志被轮转时先读完旧文件余下部分再从新文件开头继续；被截断时从头开始。
+# 有inotify时由目录事件唤醒，否则按间隔轮询。
+MAX_CHUNK = 8 * 1024 * 1024
+HIST_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)  # 毫秒，最后一格为溢出
+ERROR_CODES = frozenset(("SERVFAIL", "NETWORK_ERROR", "SERVER_TIMEOUT", "RESPONSE_ERROR", "PARSE_ERROR", "NOT_READY"))
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+
+
+@lru_cache(maxsize=4096)
+def _parse_time(text):
+    # 同一秒的日志行共用一个时间戳字符串，缓存后解析开销可忽略
+    try:
+        if text.isdigit():
+            return float(text)
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+
+def _ltsv(line):
+    fields = {}
+    for part in line.split("\t"):
+        k, sep, v = part.partition(":")
+        if sep:
+            fields[k] = v
+    return fields
+
+
+def parse_query(line, fmt="tsv"):
+    # 返回 (时间, 域名, 类型, 返回码, 耗时ms, 服务器, 是否命中缓存)，无法解析返回None
+    if fmt == "ltsv":
+        f = _ltsv(line)
+        ts = _parse_time(f.get("time", ""))
+        if ts is None or "message" not in f:
+            return None
+        try:
+            ms = int(f.get("duration", "0"))
+        except ValueError:
+            ms = 0
+        server = f.get("server", "-") or "-"
+        return ts, f["message"], f.get("type", ""), f.get("return", ""), ms, server, f.get("cached") == "1"
+    parts = line.split("\t")
+    if len(parts) < 7 or not parts[0].startswith("["):
+        return None
+    ts = _parse_time(parts[0][1:-1])
+    if ts is None:
+        return None
+    try:
+        ms = int(parts[5].rstrip("ms") or 0)
+    except ValueError:
+        ms = 0
+    server = parts[6] or "-"
+    # tsv格式没有缓存标记，命中缓存的应答服务器列为 "-"
+    return ts, parts[2], parts[3], parts[4], ms, server, server == "-" and parts[4] == "PASS"
+
+
+def parse_nx(line, fmt="tsv"):
+    # 返回 (时间, 域名)
+    if fmt == "ltsv":
+        f = _ltsv(line)
+        ts = _parse_time(f.get("time", ""))
+        return (ts, f["message"]) if ts is not None and "message" in f else None
+    parts = line.split("\t")
+    if len(parts) < 3 or not parts[0].startswith("["):
+        return None
+    ts = _parse_time(parts[0][1:-1])
+    return None if ts is None else (ts, parts[2])
+
+
+class OffsetStore:
+    def __init__(self, path):
+        self.path = Path(path) if path else None
+        self.offsets = {}
+        self.lock = threading.Lock()
+        if self.path:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.offsets = {k: tuple(v) for k, v in json.load(f).items()}
+            except (OSError, ValueError, TypeError):
+                self.offsets = {}
+
+    def get(self, path):
+        return self.offsets.get(str(path))
+
+    def set(self, path, inode, offset):
+        with self.lock:
+            self.offsets[str(path)] = (inode, offset)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = dict(self.offsets)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+class LogTailer:
+    def __init__(self, path, offsets=None, from_end=True, max_chunk=MAX_CHUNK):
+        self.path = Path(path)
+        self.offsets = offsets or OffsetStore(None)
+        self.from_end = from_end
+        self.max_chunk = max_chunk
+        self.f = None
+        self.inode = None
+        self.offset = 0
+        self.behind = False
+
+    def open(self, st, offset):
+        self.close()
+        self.f = open(self.path, "rb")
+        self.inode = os.fstat(self.f.fileno()).st_ino
+        self.offset = offset if self.inode == st.st_ino else 0
+
+    def initial_offset(self, st):
+        saved = self.offsets.get(self.path)
+        if saved and saved[0] == st.st_ino and saved[1] <= st.st_size:
+            return saved[1]
+        return st.st_size if self.from_end else 0
+
+    def read_at(self, offset, length):
+        if hasattr(os, "pread"):
+            return os.pread(self.f.fileno(), length, offset)
+        # Windows 没有 pread；句柄只在监控线程内使用，seek 后读取即可
+        self.f.seek(offset)
+        return self.f.read(length)
+
+    def read_chunk(self, size):
+        # 读取 [offset, min(size, offset+max_chunk)) 区间，只消费到最后一个完整行；
+        # size 取得后文件若被截断，读到的会比预期短，不影响结果
+        if size <= self.offset:
+            return []
+        data = self.read_at(self.offset, min(size - self.offset, self.max_chunk))
+        nl = data.rfind(b"\n")
+        if nl < 0:
+            if len(data) >= self.max_chunk:
+                # 超长的单行直接跳过
+                self.offset += len(data)
+            return []
+        self.offset += nl + 1
+        return data[:nl + 1].decode("utf-8", "replace").splitlines()
+
+    def poll(self):
+        lines = []
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            st = None
+        if self.f is None:
+            if st is None:
+                return lines
+            self.open(st, self.initial_offset(st))
+        elif st is not None and st.st_ino != self.inode:
+            # 已轮转：旧句柄仍指向被改名的文件，读完剩余部分再切换
+            old_size = os.fstat(self.f.fileno()).st_size
+            while True:
+                chunk = self.read_chunk(old_size)
+                if not chunk:
+                    break
+                lines.extend(chunk)
+            self.open(st, 0)
+        size = os.fstat(self.f.fileno()).st_size
+        if size < self.offset:
+            # 被截断：以打开的句柄为准判断，从头开始
+            self.offset = 0
+        lines.extend(self.read_chunk(size))
+        self.behind = size - self.offset >= self.max_chunk
+        self.offsets.set(self.path, self.inode, self.offset)
+        return lines
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+
+class InotifyWatcher:
+    def __init__(self, dirs):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        watched = 0
+        for d in dirs:
+            if libc.inotify_add_watch(self.fd, os.fsencode(str(d)), mask) >= 0:
+                watched += 1
+        if not watched:
+            os.close(self.fd)
+            raise OSError("没有可监视的目录")
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollWatcher:
+    def __init__(self):
+        self.event = threading.Event()
+
+    def wait(self, timeout):
+        self.event.wait(timeout)
+        return False
+
+    def close(self):
+        self.event.set()
+
+
+def make_watcher(dirs):
+    try:
+        return InotifyWatcher(dirs)
+    except (OSError, AttributeError):
+        return PollWatcher()
+
+
+class Agg:
+    __slots__ = ("count", "errors", "nx", "cached", "latency_sum", "hist")
+
+    def __init__(self):
+        self.count = self.errors = self.nx = self.cached = self.latency_sum = 0
+        self.hist = [0] * (len(HIST_BOUNDS) + 1)
+
+    def add(self, code, ms, cached):
+        self.count += 1
+        if code in ERROR_CODES:
+            self.errors += 1
+        elif code == "NXDOMAIN":
+            self.nx += 1
+        if cached:
+            self.cached += 1
+        else:
+            self.latency_sum += ms
+            i = 0
+            while i < len(HIST_BOUNDS) and ms > HIST_BOUNDS[i]:
+                i += 1
+            self.hist[i] += 1
+
+    def merge(self, other, sign=1):
+        self.count += sign * other.count
+        self.errors += sign * other.errors
+        self.nx += sign * other.nx
+        self.cached += sign * other.cached
+        self.latency_sum += sign * other.latency_sum
+        self.hist = [a + sign * b for a, b in zip(self.hist, other.hist)]
+
+    def percentile(self, q):
+        # 以直方图的上界近似，溢出格返回None
+        total = sum(self.hist)
+        if not total:
+            return None
+        need = q * total
+        acc = 0
+        for i, n in enumerate(self.hist):
+            acc += n
+            if acc >= need:
+                return HIST_BOUNDS[i] if i < len(HIST_BOUNDS) else None
+        return None
+
+
+def _counter_sub(total, other):
+    for k, v in other.items():
+        n = total[k] - v
+        if n > 0:
+            total[k] = n
+        else:
+            del total[k]
+
+
+class QueryStats:
+    # 按秒分桶的滑动窗口；新增与过期都只做增量加减，快照不需要重新扫描所有条目
+    def __init__(self, window=60, clock=time.time):
+        self.window = window
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.total = Agg()
+        self.resolvers = {}
+        self.domains = Counter()
+        self.nx_domains = Counter()
+
+    def bucket(self, ts):
+        sec = int(ts)
+        b = self.buckets.get(sec)
+        if b is None:
+            b = self.buckets[sec] = (Agg(), {}, Counter(), Counter())
+        return b
+
+    def add_queries(self, entries):
+        now = self.clock()
+        with self.lock:
+            for ts, qname, qtype, code, ms, server, cached in entries:
+                if ts <= now - self.window:
+                    continue
+                total, resolvers, domains, _ = self.bucket(ts)
+                total.add(code, ms, cached)
+                self.total.add(code, ms, cached)
+                agg = resolvers.get(server)
+                if agg is None:
+                    agg = resolvers[server] = Agg()
+                agg.add(code, ms, cached)
+                agg = self.resolvers.get(server)
+                if agg is None:
+                    agg = self.resolvers[server] = Agg()
+                agg.add(code, ms, cached)
+                domains[qname] += 1
+                self.domains[qname] += 1
+
+    def add_nx(self, entries):
+        now = self.clock()
+        with self.lock:
+            for ts, qname in entries:
+                if ts <= now - self.window:
+                    continue
+                self.bucket(ts)[3][qname] += 1
+                self.nx_domains[qname] += 1
+
+    def expire(self, now=None):
+        cutoff = (self.clock() if now is None else now) - self.window
+        with self.lock:
+            for sec in [s for s in self.buckets if s + 1 <= cutoff]:
+                total, resolvers, domains, nx = self.buckets.pop(sec)
+                self.total.merge(total, -1)
+                for name, agg in resolvers.items():
+                    self.resolvers[name].merge(agg, -1)
+                    if not self.resolvers[name].count:
+                        del self.resolvers[name]
+                _counter_sub(self.domains, domains)
+                _counter_sub(self.nx_domains, nx)
+
+    def snapshot(self, top=20):
+        self.expire()
+        with self.lock:
+            t = self.total
+            resolvers = []
+            for name, agg in self.resolvers.items():
+                if name == "-":
+                    continue
+                resolvers.append({
+                    "name": name,
+                    "count": agg.count,
+                    "qps": agg.count / self.window,
+                    "p50": agg.percentile(0.5),
+                    "p95": agg.percentile(0.95),
+                    "error_rate": agg.errors / agg.count,
+                })
+            resolvers.sort(key=lambda r: -r["count"])
+            domains = [(name, n, self.nx_domains.get(name, 0)) for name, n in self.domains.most_common(top)]
+            return {
+                "count": t.count,
+                "qps": t.count / self.window,
+                "cache_ratio": t.cached / t.count if t.count else 0.0,
+                "error_rate": t.errors / t.count if t.count else 0.0,
+                "nx_rate": t.nx / t.count if t.count else 0.0,
+                "p50": t.percentile(0.5),
+                "p95": t.percentile(0.95),
+                "resolvers": resolvers,
+                "domains": domains,
+                "nx_domains": self.nx_domains.most_common(top),
+            }
+
+
+class QueryLogMonitor:
+    def __init__(self, stats, query_log=None, nx_log=None, fmt="tsv", offsets_path=None, interval=1.0,
+                 from_end=True):
+        self.stats = stats
+        self.fmt = fmt
+        self.interval = interval
+        self.offsets = OffsetStore(offsets_path)
+        self.query = LogTailer(query_log, self.offsets, from_end) if query_log else None
+        self.nx = LogTailer(nx_log, self.offsets, from_end) if nx_log else None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def poll_once(self):
+        if self.query:
+            entries = [e for e in (parse_query(line, self.fmt) for line in self.query.poll()) if e]
+            if entries:
+                self.stats.add_queries(entries)
+        if self.nx:
+            entries = [e for e in (parse_nx(line, self.fmt) for line in self.nx.poll()) if e]
+            if entries:
+                self.stats.add_nx(entries)
+        return any(t.behind for t in (self.query, self.nx) if t)
+
+    def start(self):
+        if self.thread is None and (self.query or self.nx):
+            self.thread = threading.Thread(target=self.run, name="query-log", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        dirs = {t.path.parent for t in (self.query, self.nx) if t}
+        watcher = make_watcher(dirs)
+        last_save = time.monotonic()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    behind = self.poll_once()
+                except (OSError, ValueError):
+                    behind = False
+                if time.monotonic() - last_save > 5:
+                    self.offsets.save()
+                    last_save = time.monotonic()
+                if not behind:
+                    watcher.wait(self.interval)
+        finally:
+            watcher.close()
+            self.offsets.save()
+
+    def close(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        for t in (self.query, self.nx):
+            if t:
+                t.close()
@@ -0,0 +1,173 @@
+import json
+import os
+import platform
+import re
+import threading
+from pathlib import Path
+
+from http_client import get_client
+
+# --------- 发行版本元数据缓存与资源索引 ---------
+RELEASES_URL = "https://api.github.com/repos/DNSCrypt/dnscrypt-proxy/releases"
+CACHE_VERSION = 1
+
+# 资源名形如 dnscrypt-proxy-linux_x86_64-2.1.5.tar.gz / dnscrypt-proxy-win64-2.1.5.zip
+_ASSET_RE = re.compile(r"^dnscrypt-proxy-(?P<plat>[a-z0-9_]+)-(?P<ver>[0-9][\w.\-]*?)\.(?P<kind>tar\.gz|zip)$")
+_OS_ALIASES = {"win64": ("windows", "x86_64"), "win32": ("windows", "i386"), "macos": "darwin"}
+_ARCH_ALIASES = {
+    "amd64": "x86_64",
+    "x64": "x86_64",
+    "aarch64": "arm64",
+    "armv7l": "arm",
+    "armv7": "arm",
+    "armv6l": "arm",
+    "x86": "i386",
+    "i686": "i386",
+    "386": "i386",
+}
+
+
+def normalize_arch(arch):
+    arch = arch.lower()
+    return _ARCH_ALIASES.get(arch, arch)
+
+
+def asset_key(name):
+    # 返回 (系统, 架构, 归档类型)，无法识别（如 .minisig）返回None
+    m = _ASSET_RE.match(name)
+    if not m:
+        return None
+    plat = m.group("plat")
+    if plat in _OS_ALIASES and isinstance(_OS_ALIASES[plat], tuple):
+        os_name, arch = _OS_ALIASES[plat]
+    else:
+        os_name, _, arch = plat.partition("_")
+        os_name = _OS_ALIASES.get(os_name, os_name)
+        if not arch:
+            return None
+    return os_name, normalize_arch(arch), m.group("kind")
+
+
+def platform_key(system=None, machine=None):
+    system = (system or platform.system()).lower()
+    arch = normalize_arch(machine or platform.machine())
+    kinds = ("zip", "tar.gz") if system == "windows" else ("tar.gz", "zip")
+    return system, arch, kinds
+
+
+def _trim(release):
+    # 只保留安装需要的字段，缓存文件保持紧凑
+    return {
+        "tag_name": release.get("tag_name", ""),
+        "prerelease": release.get("prerelease", False),
+        "draft": release.get("draft", False),
+        "assets": [
+            {k: a.get(k) for k in ("name", "browser_download_url", "digest", "size")}
+            for a in release.get("assets", [])
+        ],
+    }
+
+
+class ReleaseIndex:
+    # 一次构建：每个版本的 (系统, 架构, 类型)->资源 映射，以及每个平台按新旧排列的可安装版本
+    def __init__(self, releases):
+        self.releases = list(releases)
+        self.by_tag = {}
+        self.by_platform = {}
+        for release in self.releases:
+            assets = {}
+            for asset in release.get("assets", []):
+                key = asset_key(asset.get("name", ""))
+                if key and key not in assets:
+                    assets[key] = asset
+            self.by_tag[release.get("tag_name", "")] = assets
+            for key in assets:
+                self.by_platform.setdefault(key, []).append(release)
+
+    def asset(self, release, system=None, machine=None):
+        os_name, arch, kinds = platform_key(system, machine)
+        assets = self.by_tag.get(release.get("tag_name", ""), {})
+        for kind in kinds:
+            asset = assets.get((os_name, arch, kind))
+            if asset:
+                return asset
+        return None
+
+    def installable(self, system=None, machine=None, prerelease=False):
+        # 按新到旧返回当前平台有可用资源的版本；与 /releases/latest 一致，默认不含预发布版与草稿
+        os_name, arch, kinds = platform_key(system, machine)
+        seen = set()
+        candidates = []
+        for kind in kinds:
+            for release in self.by_platform.get((os_name, arch, kind), []):
+                if release.get("draft") or (release.get("prerelease") and not prerelease):
+                    continue
+                if release["tag_name"] not in seen:
+                    seen.add(release["tag_name"])
+                    candidates.append(release)
+        order = {r["tag_name"]: i for i, r in enumerate(self.releases)}
+        return sorted(candidates, key=lambda r: order[r["tag_name"]])
+
+    def newest(self, system=None, machine=None):
+        found = self.installable(system, machine)
+        return found[0] if found else None
+
+
+class ReleaseCache:
+    def __init__(self, path, client=None, url=RELEASES_URL, per_page=30):
+        self.path = Path(path) if path else None
+        self.client = client or get_client()
+        self.url = url
+        self.per_page = per_page
+        self.lock = threading.Lock()
+        self.etag = None
+        self.releases = None
+        self.index = None
+
+    def load(self):
+        if not self.path:
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_VERSION or data.get("per_page") != self.per_page:
+                return None
+        except (OSError, ValueError):
+            return None
+        self.set(data.get("releases", []), data.get("etag"))
+        return self.releases
+
+    def set(self, releases, etag):
+        with self.lock:
+            self.releases = releases
+            self.etag = etag
+            self.index = ReleaseIndex(releases)
+
+    def save(self):
+        if not self.path:
+            return
+        data = {"version": CACHE_VERSION, "per_page": self.per_page, "etag": self.etag, "releases": self.releases}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def fetch(self, timeout=15):
+        # 只取第一页（最近 per_page 个版本），带ETag条件请求；304时直接用缓存
+        if self.releases is None:
+            self.load()
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.etag and self.releases is not None:
+            headers["If-None-Match"] = self.etag
+        r = self.client.get(self.url, params={"per_page": self.per_page}, headers=headers, timeout=timeout)
+        if r.status_code == 304 and self.releases is not None:
+            return self.releases
+        r.raise_for_status()
+        releases = [_trim(rel) for rel in r.json() if not rel.get("draft")]
+        self.set(releases, r.headers.get("ETag"))
+        self.save()
+        return releases
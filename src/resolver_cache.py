@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import metrics
+from http_client import get_client
+from resolvers import Resolver, ResolverIndex, iter_resolvers
+
+# --------- 服务器列表本地缓存 ---------
+# 缓存解析后的列表与每个镜像的 ETag/Last-Modified；启动时先读盘展示，再后台条件请求更新
+CACHE_VERSION = 1
+
+
+def _hashed_lines(lines, h, cancel=None):
+    for line in lines:
+        if cancel is not None and cancel.is_set():
+            return
+        h.update(line.encode("utf-8"))
+        h.update(b"\n")
+        yield line
+
+
+class ResolverCache:
+    def __init__(self, path, urls, client=None):
+        self.path = Path(path) if path else None
+        self.urls = list(urls)
+        self.client = client or get_client()
+        self.lock = threading.Lock()
+        self.index = None
+        self.digest = None
+        self.validators = {}
+
+    def load(self):
+        if not self.path:
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_VERSION:
+                return None
+            index = ResolverIndex(
+                Resolver(name, desc, stamps, country=country)
+                for name, desc, stamps, country in data["resolvers"]
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        with self.lock:
+            self.index = index
+            self.digest = data.get("digest")
+            self.validators = data.get("validators", {})
+        return index
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {
+                "version": CACHE_VERSION,
+                "digest": self.digest,
+                "validators": self.validators,
+                "resolvers": [[r.name, r.description, list(r.stamps), r.country] for r in self.index or ()],
+            }
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+    def conditional_headers(self, url):
+        # 没有缓存内容时不发条件请求，否则304无法使用
+        if self.index is None:
+            return {}
+        v = self.validators.get(url, {})
+        headers = {}
+        if v.get("etag"):
+            headers["If-None-Match"] = v["etag"]
+        if v.get("last_modified"):
+            headers["If-Modified-Since"] = v["last_modified"]
+        return headers
+
+    def refresh(self, proxy_prefix=None, timeout=10, proxied=True, cancel=None):
+        # 返回 (状态, 列表)，状态为 modified / not_modified / failed / cancelled；
+        # proxy_prefix为None时使用客户端当前代理，proxied=False 则直连；cancel 为 threading.Event，置位后尽快放弃
+        with metrics.span("resolvers.fetch", proxied=proxied) as attrs:
+            status, index = self.fetch(proxy_prefix, timeout, proxied, cancel)
+            attrs["status"] = "ok" if status in ("modified", "not_modified") else status
+            attrs["result"] = status
+            return status, index
+
+    def fetch(self, proxy_prefix, timeout, proxied, cancel):
+        for url in self.urls:
+            if cancel is not None and cancel.is_set():
+                return "cancelled", self.index
+            try:
+                with self.client.get(url, prefix=proxy_prefix, proxied=proxied, headers=self.conditional_headers(url),
+                                     timeout=timeout, stream=True) as r:
+                    if r.status_code == 304:
+                        return "not_modified", self.index
+                    if r.status_code != 200:
+                        continue
+                    r.encoding = "utf-8"
+                    h = hashlib.sha256()
+                    lines = list(_hashed_lines(r.iter_lines(decode_unicode=True), h, cancel))
+                    if cancel is not None and cancel.is_set():
+                        return "cancelled", self.index
+                    validators = {
+                        "etag": r.headers.get("ETag"),
+                        "last_modified": r.headers.get("Last-Modified"),
+                    }
+            except Exception:
+                continue
+            digest = h.hexdigest()
+            # 内容哈希未变（如镜像换了ETag）则不重新解析
+            if digest == self.digest and self.index is not None:
+                with self.lock:
+                    self.validators[url] = validators
+                self.save()
+                return "not_modified", self.index
+            with metrics.span("resolvers.parse", lines=len(lines)) as attrs:
+                index = ResolverIndex(iter_resolvers(lines))
+                attrs["entries"] = len(index)
+            if not index:
+                continue
+            with self.lock:
+                self.validators[url] = validators
+                self.index = index
+                self.digest = digest
+            self.save()
+            return "modified", index
+        return "failed", self.index
@@ -0,0 +1,206 @@
+import re
+
+from stamps import decode_batch
+
+# --------- 协议与属性 ---------
+PROTOCOLS = {
+    0x00: "DNS",
+    0x01: "DNSCrypt",
+    0x02: "DoH",
+    0x03: "DoT",
+    0x04: "DoQ",
+    0x05: "ODoH",
+    0x81: "DNSCrypt relay",
+    0x85: "ODoH relay",
+}
+PROTOCOL_IDS = {v.lower(): k for k, v in PROTOCOLS.items()}
+
+PROP_DNSSEC = 1 << 0
+PROP_NOLOG = 1 << 1
+PROP_NOFILTER = 1 << 2
+
+# ISO 3166-1 alpha-2，用于从服务器名中猜测国家（如 ams-dnscrypt-nl、dnscrypt.ca-1）
+COUNTRY_CODES = frozenset("""
+ad ae af ag ai al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bl bm bn bo bq br bs bt bv bw by bz
+ca cc cd cf cg ch ci ck cl cm cn co cr cu cv cw cx cy cz de dj dk dm do dz ec ee eg eh er es et fi fj fk fm fo fr
+ga gb gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy hk hm hn hr ht hu id ie il im in io iq ir is it je jm jo
+jp ke kg kh ki km kn kp kr kw ky kz la lb lc li lk lr ls lt lu lv ly ma mc md me mf mg mh mk ml mm mn mo mp mq mr
+ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np nr nu nz om pa pe pf pg ph pk pl pm pn pr ps pt pw py qa re ro
+rs ru rw sa sb sc sd se sg sh si sj sk sl sm sn so sr ss st sv sx sy sz tc td tf tg th tj tk tl tm tn to tr tt tv
+tw tz ua ug uk um us uy uz va vc ve vg vi vn vu wf ws ye yt za zm zw
+""".split())
+
+_NAME_TOKEN = re.compile(r"[-._]")
+
+
+def guess_country(name):
+    # 从后往前取第一个两字母片段，命中国家代码即认为是所在国家；仅为启发式结果
+    for token in reversed(_NAME_TOKEN.split(name.lower())):
+        if len(token) == 2 and token.isalpha():
+            return token.upper() if token in COUNTRY_CODES else None
+    return None
+
+
+# --------- 解析结果 ---------
+class Resolver:
+    __slots__ = ("name", "description", "stamps", "decoded", "country")
+
+    def __init__(self, name, description="", stamps=(), decoded=None, country=None):
+        self.name = name
+        self.description = description
+        self.stamps = tuple(stamps)
+        self.decoded = tuple(decoded) if decoded is not None else tuple(decode_batch(self.stamps))
+        self.country = country
+
+    @classmethod
+    def from_entry(cls, name, description, stamps):
+        return cls(name, description, stamps, country=guess_country(name))
+
+    @property
+    def stamp(self):
+        return self.decoded[0] if self.decoded else None
+
+    @property
+    def proto(self):
+        st = self.stamp
+        return st.proto if st else None
+
+    @property
+    def props(self):
+        st = self.stamp
+        return st.props if st else 0
+
+    @property
+    def endpoints(self):
+        return [ep for ep in (st.endpoint() for st in self.decoded if st) if ep]
+
+    @property
+    def address(self):
+        eps = self.endpoints
+        if not eps:
+            return ""
+        host, port = eps[0]
+        return f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+    @property
+    def protocol(self):
+        return PROTOCOLS.get(self.proto, "")
+
+    @property
+    def dnssec(self):
+        return bool(self.props & PROP_DNSSEC)
+
+    @property
+    def nolog(self):
+        return bool(self.props & PROP_NOLOG)
+
+    @property
+    def nofilter(self):
+        return bool(self.props & PROP_NOFILTER)
+
+    def __repr__(self):
+        return f"Resolver({self.name!r}, {self.protocol!r})"
+
+
+def iter_resolvers(lines):
+    # 逐行解析 public-resolvers.md：'## 名称' 开始一个条目，sdns:// 行为stamp，其余为描述
+    name = None
+    desc = []
+    stamps = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", "replace")
+        line = line.strip()
+        if line.startswith("## "):
+            if name and stamps:
+                yield Resolver.from_entry(name, " ".join(desc), stamps)
+            name = line[3:].strip()
+            desc = []
+            stamps = []
+        elif name is None or not line:
+            continue
+        elif line.startswith("sdns://"):
+            stamps.append(line)
+        else:
+            desc.append(line)
+    if name and stamps:
+        yield Resolver.from_entry(name, " ".join(desc), stamps)
+
+
+def _iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# --------- 内存索引 ---------
+class ResolverIndex:
+    # 每个属性对应一个整数位图，过滤只需按位与，无需重新遍历记录
+    def __init__(self, records=()):
+        self.records = []
+        self.by_name = {}
+        self.by_proto = {}
+        self.by_country = {}
+        self.dnssec = 0
+        self.nolog = 0
+        self.nofilter = 0
+        for r in records:
+            self.add(r)
+
+    def add(self, r):
+        i = len(self.records)
+        bit = 1 << i
+        self.records.append(r)
+        self.by_name[r.name] = i
+        self.by_proto[r.proto] = self.by_proto.get(r.proto, 0) | bit
+        if r.country:
+            self.by_country[r.country] = self.by_country.get(r.country, 0) | bit
+        if r.props & PROP_DNSSEC:
+            self.dnssec |= bit
+        if r.props & PROP_NOLOG:
+            self.nolog |= bit
+        if r.props & PROP_NOFILTER:
+            self.nofilter |= bit
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, i):
+        return self.records[i]
+
+    def get(self, name):
+        i = self.by_name.get(name)
+        return None if i is None else self.records[i]
+
+    @property
+    def all_mask(self):
+        return (1 << len(self.records)) - 1
+
+    def protocols(self):
+        return sorted(PROTOCOLS[p] for p in self.by_proto if p in PROTOCOLS)
+
+    def countries(self):
+        return sorted(self.by_country)
+
+    def mask(self, proto=None, dnssec=None, nolog=None, nofilter=None, country=None):
+        m = self.all_mask
+        if proto is not None:
+            if isinstance(proto, str):
+                proto = PROTOCOL_IDS.get(proto.lower())
+            m &= self.by_proto.get(proto, 0)
+        if country is not None:
+            m &= self.by_country.get(country.upper(), 0)
+        for flag, bits in ((dnssec, self.dnssec), (nolog, self.nolog), (nofilter, self.nofilter)):
+            if flag is True:
+                m &= bits
+            elif flag is False:
+                m &= ~bits
+        return m
+
+    def filter(self, **kw):
+        records = self.records
+        return [records[i] for i in _iter_bits(self.mask(**kw))]
@@ -0,0 +1,170 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+# --------- 服务器列表模型 ---------
+# 视图只对可见行调用data()，不再为每个服务器创建控件；勾选状态保存在集合中。
+COLUMNS = ["名称", "协议", "地址", "国家", "DNSSEC", "无日志", "无过滤", "延迟(ms)"]
+COL_NAME, COL_PROTO, COL_ADDR, COL_COUNTRY, COL_DNSSEC, COL_NOLOG, COL_NOFILTER, COL_LATENCY = range(len(COLUMNS))
+SortKeyRole = Qt.UserRole + 1
+
+
+def _flag(value):
+    return "✓" if value else ""
+
+
+class ServerTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.servers = []
+        self.order = []
+        self.latency = {}
+        self.selected = set()
+        self.haystack = []
+
+    def set_servers(self, servers, latency=None, selected=None):
+        self.beginResetModel()
+        self.servers = list(servers)
+        self.order = list(range(len(self.servers)))
+        self.latency = latency or {}
+        self.selected = {s.name for s in self.servers} if selected is None else set(selected)
+        self.haystack = [f"{s.name} {s.description} {s.country or ''}".lower() for s in self.servers]
+        self.endResetModel()
+
+    def record(self, row):
+        return self.servers[self.order[row]]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def median_ms(self, s):
+        r = self.latency.get(s.name)
+        return r.median * 1000 if r is not None and r.ok else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        s = self.record(index.row())
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col == COL_NAME:
+                return s.name
+            if col == COL_PROTO:
+                return s.protocol
+            if col == COL_ADDR:
+                return s.address
+            if col == COL_COUNTRY:
+                return s.country or ""
+            if col == COL_DNSSEC:
+                return _flag(s.dnssec)
+            if col == COL_NOLOG:
+                return _flag(s.nolog)
+            if col == COL_NOFILTER:
+                return _flag(s.nofilter)
+            if col == COL_LATENCY:
+                r = self.latency.get(s.name)
+                if r is None:
+                    return ""
+                return f"{r.median * 1000:.0f}" if r.ok else "超时"
+        elif role == Qt.CheckStateRole and col == COL_NAME:
+            return Qt.Checked if s.name in self.selected else Qt.Unchecked
+        elif role == Qt.ToolTipRole and col == COL_NAME:
+            if s.name in self.latency:
+                return f"{s.description}\n{self.latency[s.name].summary()}"
+            return s.description or None
+        elif role == Qt.UserRole:
+            return s
+        return None
+
+    def flags(self, index):
+        f = super().flags(index)
+        if index.isValid() and index.column() == COL_NAME:
+            f |= Qt.ItemIsUserCheckable
+        return f
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or index.column() != COL_NAME:
+            return False
+        name = self.record(index.row()).name
+        if value == Qt.Checked:
+            self.selected.add(name)
+        else:
+            self.selected.discard(name)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def set_all_checked(self, names, checked):
+        if checked:
+            self.selected.update(names)
+        else:
+            self.selected.difference_update(names)
+        if self.order:
+            self.dataChanged.emit(self.index(0, COL_NAME), self.index(len(self.order) - 1, COL_NAME),
+                                  [Qt.CheckStateRole])
+
+    def selected_names(self):
+        # 按当前排序返回已勾选的服务器
+        return [self.servers[i].name for i in self.order if self.servers[i].name in self.selected]
+
+    def sort_key(self, column):
+        servers = self.servers
+        if column == COL_LATENCY:
+            def key(i):
+                ms = self.median_ms(servers[i])
+                r = self.latency.get(servers[i].name)
+                return (ms is None, r is None, ms or 0)
+            return key
+        if column in (COL_DNSSEC, COL_NOLOG, COL_NOFILTER):
+            attr = {COL_DNSSEC: "dnssec", COL_NOLOG: "nolog", COL_NOFILTER: "nofilter"}[column]
+            return lambda i: not getattr(servers[i], attr)
+        attr = {COL_NAME: "name", COL_PROTO: "protocol", COL_ADDR: "address", COL_COUNTRY: "country"}[column]
+        return lambda i: (getattr(servers[i], attr) or "").lower()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # 在Python侧对行号排序，避免代理模型逐次比较时反复调用data()
+        if column < 0 or not self.servers:
+            return
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        old_rows = [(self.order[i.row()], i.column()) for i in old]
+        self.order.sort(key=self.sort_key(column), reverse=order == Qt.DescendingOrder)
+        pos = {rec: row for row, rec in enumerate(self.order)}
+        self.changePersistentIndexList(old, [self.index(pos[r], c) for r, c in old_rows])
+        self.layoutChanged.emit()
+
+
+class ServerFilterProxy(QSortFilterProxyModel):
+    # 文本过滤走预先小写化的搜索串；属性过滤直接使用 ResolverIndex 的位图
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.needle = ""
+        self.mask = None
+        self.setDynamicSortFilter(False)
+
+    def set_text(self, text):
+        self.needle = text.strip().lower()
+        self.invalidateFilter()
+
+    def set_mask(self, mask):
+        self.mask = mask
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        model = self.sourceModel()
+        rec = model.order[source_row]
+        if self.mask is not None and not (self.mask >> rec) & 1:
+            return False
+        return not self.needle or self.needle in model.haystack[rec]
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def visible_names(self):
+        model = self.sourceModel()
+        return [model.record(self.mapToSource(self.index(r, 0)).row()).name for r in range(self.rowCount())]
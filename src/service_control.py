@@ -0,0 +1,145 @@
+import subprocess
+import threading
+
+import metrics
+
+# --------- systemd 服务控制 ---------
+# 所有命令都在后台线程执行，界面线程只负责投递请求。连续点击时只保留一个待执行的动作，
+# 状态通过一次 `systemctl show` 批量读取若干属性，变化时才回调。
+ACTIONS = ("start", "stop", "restart")
+STATUS_PROPERTIES = ("ActiveState", "SubState", "MainPID", "NRestarts", "ExecMainStartTimestamp", "Result")
+STATE_LABELS = {
+    "active": "运行中",
+    "reloading": "重新加载中",
+    "inactive": "已停止",
+    "failed": "运行失败",
+    "activating": "启动中",
+    "deactivating": "停止中",
+}
+
+
+def parse_show(text):
+    status = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            status[key.strip()] = value.strip()
+    return status
+
+
+def describe(status):
+    if not status:
+        return "未知"
+    state = status.get("ActiveState", "")
+    label = STATE_LABELS.get(state, state or "未知")
+    sub = status.get("SubState")
+    if sub and sub != state:
+        label += f" ({sub})"
+    pid = status.get("MainPID")
+    if pid and pid != "0":
+        label += f" PID {pid}"
+    return label
+
+
+class ServiceController:
+    def __init__(self, unit="dnscrypt-proxy", systemctl=("sudo", "systemctl"), show_cmd=("systemctl",),
+                 on_result=None, on_status=None, timeout=20, poll_interval=3.0):
+        self.unit = unit
+        self.systemctl = list(systemctl)
+        self.show_cmd = list(show_cmd)
+        self.on_result = on_result
+        self.on_status = on_status
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.running = None
+        self.pending = None
+        self.merged = [0, 0]  # 被正在执行/待执行动作吸收的请求数
+        self.worker = None
+        self.status = {}
+        self.stopped = threading.Event()
+        self.wake = threading.Event()
+        self.poller = None
+
+    def run(self, argv):
+        try:
+            r = subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=self.timeout)
+            return r.returncode == 0, (r.stdout + r.stderr).strip()
+        except subprocess.TimeoutExpired:
+            return False, f"超时（{self.timeout}秒）"
+        except OSError as e:
+            return False, str(e)
+
+    def perform(self, action):
+        # 同步执行 start/stop/restart；状态轮询走 refresh()，不计入埋点
+        with metrics.span("service", action=action, unit=self.unit) as attrs:
+            ok, out = self.run(self.systemctl + [action, self.unit])
+            attrs["status"] = "ok" if ok else "failed"
+        metrics.count("service_actions", action=action, result="ok" if ok else "failed")
+        return ok, out
+
+    def request(self, action):
+        # 返回False表示已与待执行的动作合并
+        if action not in ACTIONS:
+            raise ValueError(f"未知操作: {action}")
+        with self.lock:
+            if self.running is not None:
+                # 执行中最多再排一个动作，以最后一次请求为准；start/stop 与正在执行的相同则直接丢弃
+                if self.pending is None and (action == "restart" or action != self.running):
+                    self.pending = action
+                    return True
+                if self.pending is not None:
+                    self.pending = action
+                    self.merged[1] += 1
+                else:
+                    self.merged[0] += 1
+                return False
+            self.running = action
+            self.worker = threading.Thread(target=self.work, name="service-control", daemon=True)
+            self.worker.start()
+            return True
+
+    def work(self):
+        while True:
+            action = self.running
+            ok, out = self.perform(action)
+            with self.lock:
+                merged = self.merged[0]
+            if self.on_result:
+                self.on_result(action, ok, out, merged)
+            self.refresh()
+            with self.lock:
+                self.running, self.pending = self.pending, None
+                self.merged = [self.merged[1], 0]
+                if self.running is None:
+                    self.worker = None
+                    return
+
+    def busy(self):
+        with self.lock:
+            return self.running is not None
+
+    def refresh(self):
+        ok, out = self.run(self.show_cmd + ["show", self.unit, "--property=" + ",".join(STATUS_PROPERTIES)])
+        status = parse_show(out) if ok else {}
+        with self.lock:
+            changed = status != self.status
+            self.status = status
+        if changed and self.on_status:
+            self.on_status(status)
+        return status
+
+    def start_polling(self):
+        if self.poller is None:
+            self.poller = threading.Thread(target=self.poll, name="service-status", daemon=True)
+            self.poller.start()
+
+    def poll(self):
+        while not self.stopped.is_set():
+            self.refresh()
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+
+    def close(self):
+        self.stopped.set()
+        self.wake.set()
@@ -0,0 +1,159 @@
+import base64
+from functools import lru_cache
+
+# --------- sdns:// stamp 解码 ---------
+# 格式参见 https://dnscrypt.info/stamps-specifications
+DEFAULT_PORTS = {
+    0x00: 53,
+    0x01: 443,
+    0x02: 443,
+    0x03: 853,
+    0x04: 853,
+    0x05: 443,
+    0x81: 443,
+    0x85: 443,
+}
+
+
+class StampError(ValueError):
+    pass
+
+
+class Stamp:
+    __slots__ = ("proto", "props", "address", "hashes", "provider", "path", "bootstrap")
+
+    def __init__(self, proto, props=0, address="", hashes=(), provider="", path="", bootstrap=()):
+        self.proto = proto
+        self.props = props
+        self.address = address
+        self.hashes = hashes
+        self.provider = provider
+        self.path = path
+        self.bootstrap = bootstrap
+
+    @property
+    def host(self):
+        return split_address(self.address, self.proto)[0] or self.provider_host
+
+    @property
+    def port(self):
+        return split_address(self.address, self.proto)[1]
+
+    @property
+    def provider_host(self):
+        # DoH/DoT 的hostname可能自带端口；DNSCrypt的provider形如 2.dnscrypt-cert.xxx，不可直接连接
+        if self.proto == 0x01:
+            return ""
+        return split_address(self.provider, self.proto)[0]
+
+    def endpoint(self):
+        host = self.host
+        return (host, self.port) if host else None
+
+    def __repr__(self):
+        return f"Stamp(0x{self.proto:02x}, {self.address!r}, {self.provider!r})"
+
+
+def split_address(addr, proto):
+    port = DEFAULT_PORTS.get(proto, 443)
+    if not addr:
+        return "", port
+    if addr.startswith("["):
+        end = addr.find("]")
+        host = addr[1:end]
+        rest = addr[end + 1:]
+        if rest.startswith(":") and rest[1:].isdigit():
+            port = int(rest[1:])
+        return host, port
+    host, sep, p = addr.rpartition(":")
+    if sep and p.isdigit() and ":" not in host:
+        return host, int(p)
+    return addr, port
+
+
+class _Reader:
+    __slots__ = ("raw", "pos")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.pos = 1
+
+    def take(self, n):
+        if self.pos + n > len(self.raw):
+            raise StampError("stamp截断")
+        chunk = self.raw[self.pos:self.pos + n]
+        self.pos += n
+        return chunk
+
+    def props(self):
+        return int.from_bytes(self.take(8), "little")
+
+    def lp(self):
+        return self.take(self.take(1)[0])
+
+    def lp_str(self):
+        return self.lp().decode("utf-8", "replace")
+
+    def vlp(self):
+        items = []
+        while True:
+            n = self.take(1)[0]
+            items.append(self.take(n & 0x7F))
+            if not n & 0x80:
+                return tuple(items)
+
+    def done(self):
+        return self.pos >= len(self.raw)
+
+
+def _decode(stamp):
+    if not stamp.startswith("sdns://"):
+        raise StampError("不是sdns://格式")
+    body = stamp[7:]
+    try:
+        raw = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+    except (ValueError, TypeError) as e:
+        raise StampError(f"base64解码失败: {e}")
+    if not raw:
+        raise StampError("空stamp")
+    proto = raw[0]
+    rd = _Reader(raw)
+    if proto == 0x81:
+        return Stamp(proto, address=rd.lp_str())
+    props = rd.props()
+    if proto == 0x00:
+        return Stamp(proto, props, rd.lp_str())
+    if proto == 0x01:
+        addr = rd.lp_str()
+        pk = rd.lp()
+        return Stamp(proto, props, addr, (pk,), rd.lp_str())
+    if proto == 0x05:
+        host = rd.lp_str()
+        return Stamp(proto, props, provider=host, path=rd.lp_str())
+    if proto in (0x02, 0x03, 0x04, 0x85):
+        addr = rd.lp_str()
+        hashes = tuple(h for h in rd.vlp() if h)
+        host = rd.lp_str()
+        path = rd.lp_str() if proto in (0x02, 0x85) else ""
+        bootstrap = ()
+        if not rd.done():
+            bootstrap = tuple(b.decode("utf-8", "replace") for b in rd.vlp())
+        return Stamp(proto, props, addr, hashes, host, path, bootstrap)
+    raise StampError(f"未知协议 0x{proto:02x}")
+
+
+@lru_cache(maxsize=None)
+def decode_stamp(stamp):
+    # 按stamp字符串缓存，重复加载/过滤时不会重复解码；非法stamp返回None（同样缓存）
+    try:
+        return _decode(stamp)
+    except StampError:
+        return None
+
+
+def decode_batch(stamps):
+    return [decode_stamp(s) for s in stamps]
+
+
+def clear_cache():
+    decode_stamp.cache_clear()
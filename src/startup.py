@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+import queue
+from contextlib import contextmanager
+from pathlib import Path
+
+import metrics
+
+# --------- 启动流程：任务依赖图与耗时记录 ---------
+# 各阶段声明依赖后并发执行，依赖完成即启动；每个任务和关键时间点（如首次显示服务器列表）
+# 都记录在同一条时间线上，时间相对于进程导入本模块的时刻。
+PROCESS_START = time.monotonic()
+
+
+class Timeline:
+    def __init__(self, start=None):
+        self.start = PROCESS_START if start is None else start
+        self.lock = threading.Lock()
+        self.spans = []
+        self.marks = {}
+
+    def now(self):
+        return time.monotonic() - self.start
+
+    @contextmanager
+    def span(self, name):
+        begin = self.now()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.add(name, begin, self.now(), status)
+
+    def add(self, name, begin, end, status="ok"):
+        with self.lock:
+            self.spans.append({"name": name, "start": begin, "end": end, "status": status,
+                               "thread": threading.current_thread().name})
+        metrics.record(f"startup.{name}", self.start + begin, end - begin, status=status)
+
+    def mark(self, name, once=True):
+        # 返回是否为首次记录
+        with self.lock:
+            if once and name in self.marks:
+                return False
+            self.marks[name] = self.now()
+        metrics.mark(f"startup.{name}")
+        return True
+
+    def summary(self):
+        with self.lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+            marks = sorted(self.marks.items(), key=lambda kv: kv[1])
+        lines = [
+            f"{s['name']:<20} {s['start'] * 1000:7.0f} → {s['end'] * 1000:7.0f} ms"
+            f"  ({(s['end'] - s['start']) * 1000:.0f} ms{'' if s['status'] == 'ok' else ', ' + s['status']})"
+            for s in spans
+        ]
+        lines += [f"{name:<20} @ {t * 1000:7.0f} ms" for name, t in marks]
+        return lines
+
+    def to_dict(self):
+        with self.lock:
+            return {"time": time.time(), "spans": list(self.spans), "marks": dict(self.marks)}
+
+    def save(self, path, keep=200):
+        # 每次启动追加一行，保留最近 keep 次，便于观察启动耗时的变化
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    lines = f.read().splitlines()[-(keep - 1):]
+            except OSError:
+                lines = []
+            lines.append(json.dumps(self.to_dict(), ensure_ascii=False))
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+
+class TaskGraph:
+    # 任务函数接收graph本身，可通过 graph.results 读取依赖的结果、graph.cancelled(name) 检查是否被取消
+    def __init__(self, timeline=None, max_workers=6):
+        self.timeline = timeline or Timeline()
+        self.max_workers = max_workers
+        self.tasks = {}
+        self.results = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+        self.events = {}
+        self.pending = set()
+        self.finished = threading.Event()
+        self.queue = queue.SimpleQueue()
+        self.workers = []
+
+    def add(self, name, fn, deps=()):
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"任务 {name} 依赖未定义的 {dep}")
+        self.tasks[name] = (fn, tuple(deps))
+        self.events[name] = threading.Event()
+        return self
+
+    def cancel(self, name):
+        self.events[name].set()
+
+    def cancelled(self, name):
+        return self.events[name].is_set()
+
+    def cancel_event(self, name):
+        return self.events[name]
+
+    def start(self):
+        # 工作线程设为守护线程：任务可能卡在网络或等待界面输入，不能因此拖住进程退出
+        self.pending = set(self.tasks)
+        for i in range(min(self.max_workers, len(self.tasks))):
+            t = threading.Thread(target=self.work, name=f"startup_{i}", daemon=True)
+            t.start()
+            self.workers.append(t)
+        self.schedule()
+        return self
+
+    def work(self):
+        while True:
+            name = self.queue.get()
+            if name is None:
+                return
+            self.execute(name)
+
+    def shutdown(self, cancel=False):
+        # cancel=True 时取消尚未完成的任务（窗口关闭时），正在运行的任务自行检查 cancelled()
+        if cancel:
+            for name in self.tasks:
+                self.cancel(name)
+        for _ in self.workers:
+            self.queue.put(None)
+
+    def run(self, timeout=None):
+        self.start()
+        return self.wait(timeout)
+
+    def wait(self, timeout=None):
+        done = self.finished.wait(timeout)
+        if done:
+            self.shutdown()
+        return done
+
+    def schedule(self):
+        with self.lock:
+            done = set(self.results) | set(self.errors)
+            ready = [n for n in self.pending if all(d in done for d in self.tasks[n][1])]
+            self.pending.difference_update(ready)
+            finished = not self.pending and len(done) == len(self.tasks)
+        for name in ready:
+            self.queue.put(name)
+        if finished:
+            self.finished.set()
+
+    def execute(self, name):
+        fn = self.tasks[name][0]
+        if self.cancelled(name):
+            self.timeline.add(name, self.timeline.now(), self.timeline.now(), "cancelled")
+            with self.lock:
+                self.results[name] = None
+        else:
+            begin = self.timeline.now()
+            try:
+                result = fn(self)
+            except Exception as e:
+                self.timeline.add(name, begin, self.timeline.now(), "error")
+                with self.lock:
+                    self.errors[name] = e
+            else:
+                status = "cancelled" if self.cancelled(name) else "ok"
+                self.timeline.add(name, begin, self.timeline.now(), status)
+                with self.lock:
+                    self.results[name] = result
+        self.schedule()
@@ -0,0 +1,74 @@
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QHBoxLayout, QHeaderView, QLabel, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget
+
+# --------- 查询统计面板 ---------
+# 统计在后台线程累加，面板每秒取一次快照刷新；表格行数很少，直接用 QTableWidget。
+RESOLVER_COLUMNS = ["服务器", "请求数", "QPS", "P50(ms)", "P95(ms)", "错误率"]
+DOMAIN_COLUMNS = ["域名", "次数", "NXDOMAIN"]
+
+
+def _ms(value):
+    return "-" if value is None else f"≤{value}"
+
+
+def _pct(value):
+    return f"{value * 100:.1f}%"
+
+
+def _table(columns):
+    table = QTableWidget(0, len(columns))
+    table.setHorizontalHeaderLabels(columns)
+    table.verticalHeader().hide()
+    table.setEditTriggers(QTableWidget.NoEditTriggers)
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+    table.horizontalHeader().setStretchLastSection(True)
+    return table
+
+
+def _fill(table, rows):
+    table.setUpdatesEnabled(False)
+    table.setRowCount(len(rows))
+    for r, row in enumerate(rows):
+        for c, value in enumerate(row):
+            item = table.item(r, c)
+            if item is None:
+                table.setItem(r, c, QTableWidgetItem(str(value)))
+            elif item.text() != str(value):
+                item.setText(str(value))
+    table.setUpdatesEnabled(True)
+
+
+class StatsPanel(QWidget):
+    def __init__(self, stats, parent=None, interval_ms=1000):
+        super().__init__(parent)
+        self.stats = stats
+        layout = QVBoxLayout()
+        self.summary = QLabel("暂无查询日志数据")
+        layout.addWidget(self.summary)
+        tables = QHBoxLayout()
+        self.resolver_table = _table(RESOLVER_COLUMNS)
+        self.domain_table = _table(DOMAIN_COLUMNS)
+        tables.addWidget(self.resolver_table, stretch=3)
+        tables.addWidget(self.domain_table, stretch=2)
+        layout.addLayout(tables)
+        self.setLayout(layout)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(interval_ms)
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        snap = self.stats.snapshot()
+        if not snap["count"] and not self.resolver_table.rowCount():
+            return
+        self.summary.setText(
+            f"最近{self.stats.window}秒: {snap['count']} 次查询  QPS {snap['qps']:.1f}  "
+            f"缓存命中 {_pct(snap['cache_ratio'])}  错误 {_pct(snap['error_rate'])}  "
+            f"NXDOMAIN {_pct(snap['nx_rate'])}  P50 {_ms(snap['p50'])}ms  P95 {_ms(snap['p95'])}ms"
+        )
+        _fill(self.resolver_table, [
+            (r["name"], r["count"], f"{r['qps']:.2f}", _ms(r["p50"]), _ms(r["p95"]), _pct(r["error_rate"]))
+            for r in snap["resolvers"]
+        ])
+        _fill(self.domain_table, snap["domains"])
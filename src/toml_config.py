@@ -0,0 +1,308 @@
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+try:
+    import tomllib
+except ImportError:
+    # Python 3.10 及更早没有 tomllib，使用同接口的 tomli
+    import tomli as tomllib
+
+import metrics
+
+# --------- dnscrypt-proxy.toml 结构化编辑 ---------
+# 只做一次扫描，记录每个 (表, 键) 的值在原文中的位置；修改时仅替换值的文本，
+# 注释、空行与其它格式原样保留。多个修改在一次事务中应用，校验可解析后经临时文件原子替换。
+
+_COMMENTED_KEY = re.compile(r"[ \t]*#[ \t]*([A-Za-z0-9_.\-'\"]+)[ \t]*=")
+
+
+class ConfigError(Exception):
+    pass
+
+
+def _norm_key(raw):
+    return ".".join(part.strip().strip("'\"") for part in raw.strip().split("."))
+
+
+def _skip_string(text, i):
+    # i 指向引号，返回字符串结束后的位置
+    for q in ('"""', "'''"):
+        if text.startswith(q, i):
+            end = text.find(q, i + 3)
+            if end < 0:
+                raise ConfigError("多行字符串未闭合")
+            end += 3
+            while end < len(text) and text[end] == q[0]:
+                end += 1
+            return end
+    q = text[i]
+    j = i + 1
+    while j < len(text):
+        c = text[j]
+        if c == "\\" and q == '"':
+            j += 2
+            continue
+        if c == q:
+            return j + 1
+        if c == "\n":
+            break
+        j += 1
+    raise ConfigError("字符串未闭合")
+
+
+def _line_end(text, i):
+    end = text.find("\n", i)
+    return len(text) if end < 0 else end
+
+
+def _scan_value(text, i):
+    # 返回值文本的结束位置（不含行尾空白与注释），支持跨行数组/内联表
+    depth = 0
+    n = len(text)
+    last = i
+    while i < n:
+        c = text[i]
+        if c in "\"'":
+            i = _skip_string(text, i)
+            last = i
+            continue
+        if c == "#":
+            if depth == 0:
+                break
+            i = _line_end(text, i)
+            continue
+        if c == "\n" and depth == 0:
+            break
+        if c in "[{":
+            depth += 1
+        elif c in "]}":
+            depth -= 1
+        i += 1
+        if not c.isspace():
+            last = i
+    return last
+
+
+def scan(text):
+    entries = {}
+    table_end = {}
+    commented = {}
+    first_table = None
+    table = ""
+    i = 0
+    n = len(text)
+    while i < n:
+        j = i
+        while j < n and text[j] in " \t":
+            j += 1
+        if j >= n:
+            break
+        c = text[j]
+        if c in "\r\n":
+            i = j + 1
+            continue
+        if c == "#":
+            end = _line_end(text, j)
+            m = _COMMENTED_KEY.match(text, i, end)
+            if m:
+                commented.setdefault((table, _norm_key(m.group(1))), end)
+            i = end + 1
+            continue
+        if c == "[":
+            double = text.startswith("[[", j)
+            close = text.find("]]" if double else "]", j)
+            if close < 0:
+                raise ConfigError("表头未闭合")
+            table = _norm_key(text[j + (2 if double else 1):close])
+            if first_table is None:
+                first_table = j
+            end = _line_end(text, close)
+            table_end.setdefault(table, end)
+            i = end + 1
+            continue
+        eq = j
+        while eq < n and text[eq] not in "=\n":
+            eq = _skip_string(text, eq) if text[eq] in "\"'" else eq + 1
+        if eq >= n or text[eq] != "=":
+            raise ConfigError(f"无法解析的行: {text[j:_line_end(text, j)]!r}")
+        key = _norm_key(text[j:eq])
+        vstart = eq + 1
+        while vstart < n and text[vstart] in " \t":
+            vstart += 1
+        vend = _scan_value(text, vstart)
+        entries[(table, key)] = (vstart, vend)
+        end = _line_end(text, vend)
+        table_end[table] = end
+        i = end + 1
+    return entries, table_end, commented, first_table
+
+
+def dump_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(dump_value(v) for v in value) + "]"
+    if isinstance(value, dict):
+        return "{ " + ", ".join(f"{k} = {dump_value(v)}" for k, v in value.items()) + " }"
+    raise ConfigError(f"不支持的值类型: {type(value).__name__}")
+
+
+def _lookup(data, table, key):
+    node = data
+    for part in ([p for p in table.split(".")] if table else []) + key.split("."):
+        if isinstance(node, list):
+            node = node[-1]
+        if not isinstance(node, dict) or part not in node:
+            raise KeyError(key)
+        node = node[part]
+    return node
+
+
+def apply_edits(text, edits):
+    # edits: [(table, key, value)]；返回新文本
+    entries, table_end, commented, first_table = scan(text)
+    replaces = []
+    inserts = {}
+    appends = {}
+    for table, key, value in edits:
+        rendered = dump_value(value)
+        if (table, key) in entries:
+            s, e = entries[(table, key)]
+            replaces.append((s, e, rendered))
+            continue
+        line = f"{key} = {rendered}\n"
+        # 优先放在被注释掉的同名键之后，其次放在该表最后一个键之后
+        if (table, key) in commented:
+            pos = commented[(table, key)]
+        elif table in table_end:
+            pos = table_end[table]
+        elif not table:
+            pos = first_table - 1 if first_table is not None else len(text)
+        else:
+            appends.setdefault(table, []).append(line)
+            continue
+        inserts.setdefault(pos, []).append(line)
+    ops = [(s, e, r) for s, e, r in replaces]
+    for pos, lines in inserts.items():
+        if pos < 0:
+            ops.append((0, 0, "".join(lines)))
+        elif pos >= len(text):
+            ops.append((len(text), len(text), ("\n" if text and not text.endswith("\n") else "") + "".join(lines)))
+        else:
+            ops.append((pos + 1, pos + 1, "".join(lines)))
+    for s, e, r in sorted(ops, key=lambda op: op[0], reverse=True):
+        text = text[:s] + r + text[e:]
+    for table, lines in appends.items():
+        if text and not text.endswith("\n"):
+            text += "\n"
+        text += f"\n[{table}]\n" + "".join(lines)
+    return text
+
+
+class Transaction:
+    def __init__(self, config):
+        self.config = config
+        self.edits = []
+
+    def set(self, key, value, table=""):
+        self.edits.append((table or "", key, value))
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.edits:
+            self.config.commit(self.edits)
+        return False
+
+
+class TomlConfig:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.RLock()
+        self.stat = None
+        self.text = None
+        self.data = None
+
+    def load(self):
+        # 按 mtime/size 缓存，文件未变时不重新读取解析
+        with self.lock:
+            st = os.stat(self.path)
+            key = (st.st_mtime_ns, st.st_size)
+            if key != self.stat:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                try:
+                    data = tomllib.loads(text)
+                except tomllib.TOMLDecodeError as e:
+                    raise ConfigError(f"配置文件解析失败: {e}")
+                self.text, self.data, self.stat = text, data, key
+            return self.data
+
+    def get(self, key, table="", default=None):
+        try:
+            return _lookup(self.load(), table, key)
+        except KeyError:
+            return default
+
+    def transaction(self):
+        return Transaction(self)
+
+    def update(self, values, table=""):
+        with self.transaction() as tx:
+            for k, v in values.items():
+                tx.set(k, v, table)
+
+    def commit(self, edits):
+        with metrics.span("config.write", keys=[key for _, key, _ in edits]), self.lock:
+            self.load()
+            text = apply_edits(self.text, edits)
+            try:
+                data = tomllib.loads(text)
+            except tomllib.TOMLDecodeError as e:
+                raise ConfigError(f"修改后的配置无法解析: {e}")
+            for table, key, value in edits:
+                try:
+                    got = _lookup(data, table, key)
+                except KeyError:
+                    raise ConfigError(f"修改后未找到 {key}")
+                if got != (list(value) if isinstance(value, tuple) else value):
+                    raise ConfigError(f"{key} 写入结果不一致")
+            self.write_atomic(text)
+            st = os.stat(self.path)
+            self.text, self.data, self.stat = text, data, (st.st_mtime_ns, st.st_size)
+
+    def write_atomic(self, text):
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            shutil.copymode(self.path, tmp)
+            os.replace(tmp, self.path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+def open_config(path):
+    # 同一路径共用一个实例，以便复用缓存
+    path = os.path.abspath(path)
+    with _configs_lock:
+        if path not in _configs:
+            _configs[path] = TomlConfig(path)
+        return _configs[path]
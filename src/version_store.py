@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tarfile
+import zipfile
+from pathlib import Path
+
+import metrics
+
+# --------- 多版本并存安装 ---------
+# versions/<tag>-<归档哈希前12位>/ 为解压后的完整目录，其中的文件都是 objects/ 下按内容哈希命名的硬链接，
+# 相同文件只占一份空间。当前版本由 active 符号链接指向，切换/回滚只需原子替换该链接。
+# Windows 创建符号链接需要管理员或开发者模式，改为把版本复制成真实目录再改名换入，
+# 目录里的 .active-version 记录当前版本。
+HASH_LEN = 12
+ACTIVE_MARK = ".active-version"
+USE_SYMLINKS = os.name != "nt"
+
+
+def extract_archive(archive, outdir):
+    archive = Path(archive)
+    if archive.suffix == ".zip":
+        with zipfile.ZipFile(archive, 'r') as zip_ref:
+            zip_ref.extractall(outdir)
+    else:
+        with tarfile.open(archive, "r:gz") as tar_ref:
+            if hasattr(tarfile, "data_filter"):
+                tar_ref.extractall(outdir, filter="data")
+            else:
+                tar_ref.extractall(outdir)
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _copy_writable(src, dst):
+    # 版本目录里的文件是只读对象的硬链接；复制出的文件需可写，之后才能在 Windows 上删除
+    shutil.copyfile(src, dst)
+    os.chmod(dst, 0o755 if os.stat(src).st_mode & stat.S_IXUSR else 0o644)
+    return dst
+
+
+def _remove(path):
+    if path.is_symlink() or path.is_file():
+        path.unlink()
+    elif path.exists():
+        shutil.rmtree(path)
+
+
+def find_binary(root):
+    for p in sorted(Path(root).rglob("dnscrypt-proxy*")):
+        if p.is_file() and p.name in ("dnscrypt-proxy", "dnscrypt-proxy.exe"):
+            return p
+    return None
+
+
+class VersionStore:
+    def __init__(self, root, active, symlinks=None):
+        self.root = Path(root)
+        self.active = Path(active)
+        self.symlinks = USE_SYMLINKS if symlinks is None else symlinks
+        self.objects = self.root / "objects"
+        self.versions = self.root / "versions"
+        self.history_path = self.root / "history.json"
+
+    @staticmethod
+    def key(tag, archive_sha256):
+        return f"{tag}-{archive_sha256[:HASH_LEN]}"
+
+    def path(self, key):
+        return self.versions / key
+
+    def has(self, key):
+        return (self.path(key) / ".complete").exists()
+
+    def list_versions(self):
+        if not self.versions.exists():
+            return []
+        return sorted(p.name for p in self.versions.iterdir() if (p / ".complete").exists())
+
+    def find_tag(self, tag):
+        # 同一tag可能对应多个归档（如重新打包），取最近写入的一个
+        found = [p for p in self.versions.glob(f"{tag}-*") if (p / ".complete").exists()] if self.versions.exists() else []
+        if not found:
+            return None
+        return max(found, key=lambda p: p.stat().st_mtime).name
+
+    def current(self):
+        if self.active.is_symlink():
+            target = Path(os.readlink(self.active))
+            return target.name if target.parent == self.versions else None
+        try:
+            return (self.active / ACTIVE_MARK).read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+    def add(self, tag, archive, archive_sha256=None):
+        archive_sha256 = archive_sha256 or _file_sha256(archive)
+        key = self.key(tag, archive_sha256)
+        if self.has(key):
+            return key
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.versions.mkdir(parents=True, exist_ok=True)
+        staging = self.versions / f".tmp-{key}-{os.getpid()}"
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir()
+        try:
+            with metrics.span("install.extract", archive=Path(archive).name):
+                extract_archive(archive, staging)
+            binary = find_binary(staging)
+            if binary is None:
+                raise RuntimeError("归档中未找到dnscrypt-proxy可执行文件")
+            binary.chmod(0o755)
+            with metrics.span("install.dedupe"):
+                for p in staging.rglob("*"):
+                    if p.is_file() and not p.is_symlink():
+                        self.dedupe(p)
+            (staging / ".complete").write_text(archive_sha256, encoding="utf-8")
+            target = self.path(key)
+            if target.exists():
+                shutil.rmtree(target)
+            os.replace(staging, target)
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging)
+        return key
+
+    def dedupe(self, path):
+        # 按内容+可执行位入库；对象只读，避免在某个版本目录里原地修改影响其他版本
+        executable = bool(path.stat().st_mode & stat.S_IXUSR)
+        obj = self.objects / (_file_sha256(path) + (".x" if executable else ""))
+        if not obj.exists():
+            os.replace(path, obj)
+            obj.chmod(0o555 if executable else 0o444)
+        else:
+            path.unlink()
+        try:
+            os.link(obj, path)
+        except OSError:
+            shutil.copy2(obj, path)
+
+    def activate(self, key):
+        if not self.has(key):
+            raise RuntimeError(f"版本 {key} 不存在")
+        self.active.parent.mkdir(parents=True, exist_ok=True)
+        if self.active.is_dir() and not self.active.is_symlink() and not (self.active / ACTIVE_MARK).exists():
+            # 旧式安装的真实目录，保留一份备份后再换入新版本
+            legacy = self.active.with_name(self.active.name + ".old")
+            _remove(legacy)
+            os.replace(self.active, legacy)
+        new = None
+        if self.symlinks:
+            new = self.active.with_name(f".{self.active.name}.{os.getpid()}.lnk")
+            _remove(new)
+            try:
+                os.symlink(self.path(key), new, target_is_directory=True)
+            except OSError:
+                # 文件系统不支持符号链接时同样退回复制
+                new = None
+        if new is None:
+            new = self.active.with_name(f".{self.active.name}.{os.getpid()}.new")
+            _remove(new)
+            shutil.copytree(self.path(key), new, copy_function=_copy_writable,
+                            ignore=shutil.ignore_patterns(".complete"))
+            (new / ACTIVE_MARK).write_text(key, encoding="utf-8")
+        self.swap_in(new)
+        history = [k for k in self.history() if k != key]
+        history.append(key)
+        self.save_history(history)
+        return self.active
+
+    def swap_in(self, new):
+        # 链接换链接可原子替换；涉及真实目录时先把旧的改名移开，换入失败则还原
+        if new.is_symlink() and (self.active.is_symlink() or not self.active.exists()):
+            os.replace(new, self.active)
+            return
+        prev = self.active.with_name(f".{self.active.name}.{os.getpid()}.prev")
+        _remove(prev)
+        had_prev = self.active.is_symlink() or self.active.exists()
+        if had_prev:
+            os.replace(self.active, prev)
+        try:
+            os.replace(new, self.active)
+        except OSError:
+            if had_prev:
+                os.replace(prev, self.active)
+            _remove(new)
+            raise
+        _remove(prev)
+
+    def history(self):
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                return [k for k in json.load(f) if self.has(k)]
+        except (OSError, ValueError):
+            return []
+
+    def save_history(self, history):
+        tmp = self.history_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(history[-20:], f)
+        os.replace(tmp, self.history_path)
+
+    def rollback(self):
+        history = self.history()
+        current = self.current()
+        if current in history:
+            history.remove(current)
+        if not history:
+            return None
+        key = history[-1]
+        self.activate(key)
+        return key
+
+    def binary(self, key=None):
+        root = self.path(key) if key else self.active
+        return find_binary(root)
@@ -0,0 +1,71 @@
+import unittest
+import tempfile
+import os
+import sys
+import json
+import shutil
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import bench
+
+
+class TestStandIn(unittest.TestCase):
+    def setUp(self):
+        self.stand_in = bench.StandIn()
+
+    def tearDown(self):
+        self.stand_in.close()
+
+    def test_routes(self):
+        ok = self.stand_in.route("ok", body=b"hello", etag='"e1"')
+        broken = self.stand_in.route("broken", status=503)
+        dead = self.stand_in.route("dead", drop=True)
+        r = requests.get(ok + "any/path", timeout=5)
+        self.assertEqual((r.status_code, r.text, r.headers["ETag"]), (200, "hello", '"e1"'))
+        self.assertEqual(requests.get(ok, headers={"If-None-Match": '"e1"'}, timeout=5).status_code, 304)
+        self.assertEqual(requests.get(broken, timeout=5).status_code, 503)
+        with self.assertRaises(requests.ConnectionError):
+            requests.get(dead, timeout=5)
+        self.assertEqual(requests.get(self.stand_in.base + "/unknown/", timeout=5).status_code, 404)
+        self.assertEqual(self.stand_in.hits["ok"], 2)
+
+
+class TestBench(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_run_and_save(self):
+        names = ["resolvers_parse", "config_rewrite", "proxy_detection", "list_fetch", "archive_extraction"]
+        report = bench.run(names, scale=0.02, repeat=2)
+        self.assertEqual(list(report["results"]), names)
+        for name, entry in report["results"].items():
+            self.assertNotIn("error", entry, name)
+            self.assertEqual(len(entry["runs"]), 2)
+            self.assertLessEqual(entry["min"], entry["median"])
+        path = os.path.join(self.temp_dir, "out", "bench.json")
+        bench.save(report, path)
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["meta"]["repeat"], 2)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            bench.run(["nope"])
+
+    def test_compare(self):
+        base = {"results": {"a": {"median": 0.1}, "b": {"median": 0.2}, "c": {"skipped": "x"}}}
+        current = {"results": {"a": {"median": 0.13}, "b": {"median": 0.19}, "c": {"median": 0.1},
+                               "d": {"error": "boom"}}}
+        lines, regressions = bench.compare(base, current, threshold=0.2)
+        self.assertEqual(regressions, ["a"])
+        self.assertEqual(len(lines), 5)
+        self.assertIn("+30.0%", lines[1])
+        self.assertIn("回退", lines[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from blocklist import BlocklistCompiler, compress, iter_keys, parse_line, to_key, from_key
+
+HOSTS = """# hosts 格式
+127.0.0.1 localhost
+0.0.0.0 ads.example.com tracker.example.com
+0.0.0.0 Ads.Example.com.
+::1 ip6-localhost
+0.0.0.0 metrics.shop.net # 行内注释
+"""
+
+DOMAINS = """! 域名列表
+example.com
+*.bad.org
+=exact.org
+=shop.net
+||adblock.io^
+||ignored.io^$third-party
+ads.*
+*sex*
+not_a domain here
+中文.com
+"""
+
+
+def order(names):
+    # 输出按键排序（即按反转后的域名排序）
+    return sorted(names, key=lambda n: to_key(n[1:], exact=True) if n.startswith("=") else to_key(n))
+
+
+class TestParse(unittest.TestCase):
+    def test_key_roundtrip(self):
+        self.assertEqual(to_key("a.example.com"), "moc elpmaxe a")
+        self.assertEqual(from_key(to_key("a.example.com")), "a.example.com")
+        self.assertEqual(from_key(to_key("exact.org", exact=True)), "=exact.org")
+
+    def test_formats(self):
+        self.assertEqual(parse_line("*.bad.org"), ("key", to_key("bad.org")))
+        self.assertEqual(parse_line("=exact.org"), ("key", to_key("exact.org", exact=True)))
+        self.assertEqual(parse_line("||adblock.io^"), ("key", to_key("adblock.io")))
+        self.assertEqual(parse_line("ads.*"), ("pattern", "ads.*"))
+        self.assertIsNone(parse_line("||ignored.io^$third-party"))
+        self.assertIsNone(parse_line("# 注释"))
+        self.assertIsNone(parse_line("localhost"))
+        self.assertEqual(parse_line("中文.com"), ("key", to_key("xn--fiq228c.com")))
+
+    def test_hosts(self):
+        patterns = set()
+        keys = list(iter_keys(HOSTS.splitlines() + ["ads.*"], patterns))
+        self.assertEqual([from_key(k) for k in keys],
+                         ["ads.example.com", "tracker.example.com", "ads.example.com", "metrics.shop.net"])
+        self.assertEqual(patterns, {"ads.*"})
+
+    def test_compress(self):
+        names = ["example.com", "a.example.com", "b.a.example.com", "example-x.com", "=example.com",
+                 "=other.com", "x.other.com", "other.com"]
+        keys = [(to_key(n[1:], exact=True) if n.startswith("=") else to_key(n)) + "\n" for n in order(names + names)]
+        counts = {}
+        self.assertEqual([line.strip() for line in compress(keys, counts)],
+                         order(["example.com", "example-x.com", "other.com"]))
+        self.assertEqual(counts, {"unique": 8, "written": 3})
+        keys = sorted([to_key("shop.net", exact=True) + "\n", to_key("a.shop.net") + "\n"])
+        self.assertEqual([line.strip() for line in compress(keys)], ["=shop.net", "a.shop.net"])
+
+
+class TestCompiler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.hosts = os.path.join(self.temp_dir, "hosts")
+        self.domains = os.path.join(self.temp_dir, "domains.txt")
+        self.output = os.path.join(self.temp_dir, "out", "blocked-names.txt")
+        with open(self.hosts, "w", encoding="utf-8") as f:
+            f.write(HOSTS)
+        with open(self.domains, "w", encoding="utf-8") as f:
+            f.write(DOMAINS)
+        self.logs = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def compiler(self, chunk=3):
+        return BlocklistCompiler(os.path.join(self.temp_dir, "work"), chunk=chunk)
+
+    def read_output(self):
+        with open(self.output, encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f if not line.startswith("#")]
+
+    def test_build(self):
+        stats = self.compiler().build([self.hosts, self.domains], self.output, log=self.logs.append)
+        self.assertTrue(stats["changed"])
+        self.assertEqual(self.read_output(), ["*sex*", "ads.*"] + order([
+            "example.com", "xn--fiq228c.com", "adblock.io", "=shop.net", "metrics.shop.net", "bad.org", "=exact.org",
+        ]))
+        # ads/tracker.example.com 被 example.com 覆盖
+        self.assertEqual(stats["covered"], 2)
+        self.assertEqual(stats["patterns"], 2)
+
+    def test_incremental(self):
+        c = self.compiler()
+        c.build([self.hosts, self.domains], self.output, log=self.logs.append)
+        self.logs.clear()
+        stats = self.compiler().build([self.hosts, self.domains], self.output, log=self.logs.append)
+        self.assertFalse(stats["changed"])
+        self.assertEqual(sum("未变化" in line for line in self.logs), 3)
+        with open(self.hosts, "a", encoding="utf-8") as f:
+            f.write("0.0.0.0 new.tracker.net\n")
+        self.logs.clear()
+        before = os.stat(self.output).st_ino
+        stats = self.compiler().build([self.hosts, self.domains], self.output, log=self.logs.append)
+        self.assertTrue(stats["changed"])
+        self.assertIn("new.tracker.net", self.read_output())
+        self.assertNotEqual(os.stat(self.output).st_ino, before)
+        # 只有修改过的来源被重新解析
+        self.assertTrue(any(line.startswith(self.domains) and "未变化" in line for line in self.logs))
+        self.assertFalse(any(line.startswith(self.hosts) and "未变化" in line for line in self.logs))
+        # 旧的 run 文件已清理
+        runs = [r for e in self.compiler().manifest["sources"].values() for r in e["runs"]]
+        self.assertEqual(sorted(os.listdir(os.path.join(self.temp_dir, "work", "sources"))),
+                         sorted(os.path.basename(r) for r in runs))
+
+    def test_remove_source(self):
+        self.compiler().build([self.hosts, self.domains], self.output, log=self.logs.append)
+        stats = self.compiler().build([self.hosts], self.output, log=self.logs.append)
+        self.assertTrue(stats["changed"])
+        self.assertEqual(self.read_output(), order(["ads.example.com", "tracker.example.com", "metrics.shop.net"]))
+
+    def test_failed_source_keeps_previous(self):
+        self.compiler().build([self.hosts, self.domains], self.output, log=self.logs.append)
+        expected = self.read_output()
+        os.unlink(self.domains)
+        self.compiler().build([self.hosts, self.domains], self.output, log=self.logs.append, force=True)
+        self.assertEqual(self.read_output(), expected)
+        with self.assertRaises(OSError):
+            self.compiler().build([os.path.join(self.temp_dir, "missing")], self.output, log=self.logs.append)
+
+    def test_large_chunks(self):
+        # 分块数远多于 1 时归并结果仍然有序且去重
+        with open(self.hosts, "w", encoding="utf-8") as f:
+            for i in range(5000):
+                f.write(f"0.0.0.0 h{i % 2500}.example{i % 7}.com\n")
+            f.write("0.0.0.0 example3.com\n")
+        stats = BlocklistCompiler(os.path.join(self.temp_dir, "work"), chunk=97).build([self.hosts], self.output,
+                                                                                        log=self.logs.append)
+        lines = self.read_output()
+        covered = sum(1 for i in range(5000) if i % 7 == 3)
+        self.assertEqual(stats["unique"], 5001)
+        self.assertEqual(stats["covered"], covered)
+        self.assertEqual(len(lines), 5001 - covered)
+        self.assertIn("example3.com", lines)
+        self.assertFalse(any(line.endswith(".example3.com") for line in lines))
+        self.assertEqual(lines, order(lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
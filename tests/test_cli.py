@@ -0,0 +1,96 @@
+import unittest
+import tempfile
+import os
+import sys
+import json
+import shutil
+import subprocess
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from resolver_cache import ResolverCache
+from resolvers import ResolverIndex, iter_resolvers
+from test_resolvers import SAMPLE
+from toml_config import tomllib
+
+
+class TestCli(unittest.TestCase):
+    # 以子进程运行，HOME 指向临时目录，缓存与配置都不触及真实环境
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.config = os.path.join(self.home, "dnscrypt-proxy.toml")
+        with open(self.config, "w", encoding="utf-8") as f:
+            f.write("# 配置\nserver_names = ['old']\n\n[query_log]\nformat = 'tsv'\n")
+        cache = ResolverCache(os.path.join(self.home, ".dnscrypt_gui", "resolvers_cache.json"), [])
+        cache.index = ResolverIndex(iter_resolvers(SAMPLE.splitlines()))
+        cache.save()
+
+    def tearDown(self):
+        shutil.rmtree(self.home)
+
+    def run_cli(self, *args, stdin=None):
+        env = dict(os.environ, HOME=self.home, PYTHONPATH=SRC)
+        r = subprocess.run([sys.executable, "-m", "cli", *args], input=stdin, capture_output=True, text=True,
+                           env=env, cwd=SRC, timeout=30)
+        return r
+
+    def test_resolvers_filter_from_cache(self):
+        r = self.run_cli("resolvers", "--proto", "dnscrypt", "--names")
+        self.assertEqual(r.returncode, 0, r.stderr)
+        self.assertEqual(r.stdout.split(), ["ams-dnscrypt-nl", "adguard-dns"])
+        r = self.run_cli("resolvers", "--country", "nl", "--json")
+        self.assertEqual([x["name"] for x in json.loads(r.stdout)], ["ams-dnscrypt-nl"])
+        r = self.run_cli("resolvers", "--proto", "dnscrypt", "--nolog", "--names")
+        self.assertEqual(r.stdout.split(), ["ams-dnscrypt-nl"])
+
+    def test_set_servers_from_pipe(self):
+        names = self.run_cli("resolvers", "--dnssec", "--names").stdout
+        r = self.run_cli("--config", self.config, "set-servers", "--stdin", stdin=names)
+        self.assertEqual(r.returncode, 0, r.stderr)
+        with open(self.config, encoding="utf-8") as f:
+            text = f.read()
+        self.assertTrue(text.startswith("# 配置\n"))
+        self.assertEqual(tomllib.loads(text)["server_names"], ["ams-dnscrypt-nl", "cloudflare", "adguard-dns"])
+
+    def test_set_servers_without_names_fails(self):
+        r = self.run_cli("--config", self.config, "set-servers")
+        self.assertEqual(r.returncode, 2)
+
+    def test_blocklist_apply(self):
+        source = os.path.join(self.home, "hosts")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("0.0.0.0 ads.example.com\nexample.com\n")
+        r = self.run_cli("-q", "--config", self.config, "blocklist", source, "--apply", "--json")
+        self.assertEqual(r.returncode, 0, r.stderr)
+        stats = json.loads(r.stdout)
+        self.assertEqual((stats["written"], stats["covered"]), (1, 1))
+        with open(self.config, encoding="utf-8") as f:
+            data = tomllib.loads(f.read())
+        self.assertEqual(data["blocked_names"]["blocked_names_file"], os.path.join(self.home, "blocked-names.txt"))
+        self.assertEqual(data["query_log"]["format"], "tsv")
+        # 不指定来源时沿用上次的来源，内容未变则不重写
+        r = self.run_cli("-q", "--config", self.config, "blocklist", "--json")
+        self.assertFalse(json.loads(r.stdout)["changed"])
+
+    def test_lazy_imports_and_startup(self):
+        code = (
+            "import sys, time; t = time.perf_counter(); import cli; "
+            f"cli.main(['-q', '--config', {self.config!r}, 'set-servers', 'a']); "
+            "print(time.perf_counter() - t); "
+            "print(' '.join(m for m in ('PyQt5', 'requests', 'urllib3') if m in sys.modules))"
+        )
+        env = dict(os.environ, HOME=self.home, PYTHONPATH=SRC)
+        start = time.monotonic()
+        r = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, timeout=30)
+        wall = time.monotonic() - start
+        elapsed, loaded = (r.stdout.splitlines() + ["", ""])[:2]
+        self.assertEqual(r.returncode, 0, r.stderr)
+        self.assertEqual(loaded, "")
+        self.assertLess(float(elapsed), 0.5)
+        self.assertLess(wall, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
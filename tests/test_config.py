@@ -1,28 +1,14 @@
 import unittest
 import tempfile
 import os
+import sys
 import shutil
 
-# 用于写入配置文件中的server_names字段的函数（示例）
-def write_server_names(path, server_names):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        found = False
-        new_lines = []
-        for line in lines:
-            if line.strip().startswith("server_names"):
-                new_lines.append('server_names = ["' + '","'.join(server_names) + '"]\n')
-                found = True
-            else:
-                new_lines.append(line)
-        if not found:
-            new_lines.append('server_names = ["' + '","'.join(server_names) + '"]\n')
-        with open(path, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
-        return True, None
-    except Exception as e:
-        return False, str(e)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# 直接测试真实的 core.write_server_names，而不是测试文件里的副本
+from core import write_server_names
+from toml_config import tomllib
 
 # 用于检测配置文件格式及内容的简单函数示例
 def validate_config_file(path):
@@ -61,7 +47,9 @@ class TestConfigFile(unittest.TestCase):
         self.assertIsNone(err)
         with open(self.config_file, "r", encoding="utf-8") as f:
             content = f.read()
-        self.assertIn('server_names = ["server1","server2"]', content)
+        self.assertEqual(tomllib.loads(content)["server_names"], ["server1", "server2"])
+        # 其它键保持不变
+        self.assertIn("bootstrap_resolvers = ['8.8.8.8:53']", content)
 
     def test_write_server_names_file_missing(self):
         bad_path = os.path.join(self.temp_dir, "missing.toml")
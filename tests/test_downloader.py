@@ -0,0 +1,109 @@
+import unittest
+import tempfile
+import hashlib
+import json
+import os
+import sys
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from downloader import SegmentedDownloader, DownloadError, split_ranges, parse_digest
+
+PAYLOAD = os.urandom(1024 * 1024 + 123)
+SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    # 模拟镜像：可开关Range支持，并记录每次请求的Range头
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        srv = self.server
+        rng = self.headers.get("Range")
+        srv.ranges.append(rng)
+        if rng and srv.accept_ranges:
+            start, end = rng.split("=")[1].split("-")
+            start, end = int(start), int(end)
+            body = PAYLOAD[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        else:
+            body = PAYLOAD
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDownloader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dest = os.path.join(self.temp_dir, "dnscrypt-proxy-linux_x86_64.tar.gz")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        self.server.accept_ranges = True
+        self.server.ranges = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/archive.tar.gz"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_split_ranges(self):
+        self.assertEqual(split_ranges(100, 4), [(0, 99)])
+        ranges = split_ranges(len(PAYLOAD), 4)
+        self.assertEqual(len(ranges), 4)
+        self.assertEqual(ranges[-1][1], len(PAYLOAD) - 1)
+        self.assertEqual(sum(e - s + 1 for s, e in ranges), len(PAYLOAD))
+
+    def test_parse_digest(self):
+        self.assertEqual(parse_digest("sha256:ABC"), "abc")
+        self.assertIsNone(parse_digest(None))
+        self.assertIsNone(parse_digest("md5:abc"))
+
+    def test_segmented_download_with_checksum(self):
+        progress = []
+        SegmentedDownloader(self.url, self.dest, progress=lambda d, t: progress.append((d, t))).run(SHA256)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        self.assertEqual(progress[-1], (len(PAYLOAD), len(PAYLOAD)))
+        self.assertEqual(len(self.server.ranges), 5)
+        self.assertEqual(os.listdir(self.temp_dir), [os.path.basename(self.dest)])
+
+    def test_checksum_mismatch_leaves_nothing(self):
+        with self.assertRaises(DownloadError):
+            SegmentedDownloader(self.url, self.dest).run("0" * 64)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_resume_from_partial_segment(self):
+        ranges = split_ranges(len(PAYLOAD), 4)
+        with open(self.dest + ".parts.json", "w", encoding="utf-8") as f:
+            json.dump({"url": self.url, "total": len(PAYLOAD), "ranges": ranges}, f)
+        s, e = ranges[0]
+        with open(self.dest + ".part0", "wb") as f:
+            f.write(PAYLOAD[s:s + 1000])
+        for i, (s, e) in enumerate(ranges[1:], 1):
+            with open(self.dest + f".part{i}", "wb") as f:
+                f.write(PAYLOAD[s:e + 1])
+        SegmentedDownloader(self.url, self.dest).run(SHA256)
+        # 只补齐第一段剩余部分
+        self.assertEqual(self.server.ranges[1:], [f"bytes=1000-{ranges[0][1]}"])
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+
+    def test_fallback_without_range_support(self):
+        self.server.accept_ranges = False
+        SegmentedDownloader(self.url, self.dest).run(SHA256)
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from health_monitor import HealthMonitor, HealthPolicy, HealthWindow
+from latency import ProbeResult
+from resolvers import Resolver
+from test_latency import dnscrypt
+
+
+class FakeNet:
+    # 每个服务器的固定延迟，None 表示不可达；记录每轮探测了哪些服务器
+    def __init__(self, latencies):
+        self.latencies = latencies
+        self.rounds = []
+
+    def probe(self, resolvers, attempts=2, timeout=2.0):
+        self.rounds.append([r.name for r in resolvers])
+        results = {}
+        for r in resolvers:
+            res = ProbeResult(r.name)
+            lat = self.latencies.get(r.name)
+            for _ in range(attempts):
+                if lat is None:
+                    res.failures += 1
+                else:
+                    res.samples.append(lat)
+            results[r.name] = res
+        return results
+
+
+class TestHealthMonitor(unittest.TestCase):
+    def setUp(self):
+        self.config = ["a", "b"]
+        self.applied = []
+        self.events = []
+        self.now = [0.0]
+        self.net = FakeNet({"a": 0.05, "b": 0.06, "c": 0.03, "d": 0.08, "e": 0.02})
+        self.stampless = set()
+
+    def lookup(self, name):
+        return Resolver(name) if name in self.stampless else Resolver(name, stamps=[dnscrypt("127.0.0.1:443")])
+
+    def make(self, **kw):
+        def apply(names):
+            self.applied.append(list(names))
+            self.config[:] = names
+            return True, None
+
+        kw.setdefault("policy", HealthPolicy(max_latency=0.3, strikes=2, cooldown=100, min_samples=2))
+        return HealthMonitor(
+            servers=lambda: self.config, lookup=self.lookup, candidates=lambda: ["a", "b", "c", "d", "e"],
+            apply=apply, probe=self.net.probe, on_event=self.events.append, clock=lambda: self.now[0],
+            budget=3, **kw,
+        )
+
+    def test_probe_budget_round_robin(self):
+        mon = self.make()
+        for _ in range(3):
+            mon.run_round()
+        self.assertEqual(self.net.rounds, [["a", "b", "c"], ["a", "b", "d"], ["a", "b", "e"]])
+
+    def test_failover_after_strikes(self):
+        mon = self.make(window=4)
+        for _ in range(3):
+            mon.run_round()
+        self.net.latencies["b"] = None
+        # 第一轮窗口内仍有一半成功样本，之后需连续两轮劣化才切换
+        self.assertIsNone(mon.run_round())
+        self.assertIsNone(mon.run_round())
+        self.assertEqual(mon.run_round(), ("b", "e"))
+        self.assertEqual(self.config, ["a", "e"])
+        self.assertEqual(len(self.applied), 1)
+
+    def test_cooldown_prevents_flapping(self):
+        mon = self.make(window=4)
+        for _ in range(3):
+            mon.run_round()
+        self.net.latencies["b"] = None
+        for _ in range(3):
+            mon.run_round()
+        self.net.latencies["e"] = None
+        for _ in range(4):
+            mon.run_round()
+        self.assertEqual(len(self.applied), 1)
+        self.now[0] = 200
+        mon.run_round()
+        self.assertEqual(len(self.applied), 2)
+        self.assertNotIn("e", self.config)
+
+    def test_transient_blip_is_ignored(self):
+        mon = self.make(window=4)
+        for _ in range(3):
+            mon.run_round()
+        self.net.latencies["a"] = None
+        mon.run_round()
+        self.net.latencies["a"] = 0.05
+        for _ in range(4):
+            mon.run_round()
+        self.assertEqual(self.applied, [])
+
+    def test_no_candidate_no_switch(self):
+        self.net.latencies.update({"c": None, "d": None, "e": None})
+        mon = self.make()
+        self.net.latencies["b"] = None
+        for _ in range(4):
+            mon.run_round()
+        self.assertEqual(self.applied, [])
+        self.assertTrue(any("暂无可替换" in e for e in self.events))
+
+    def test_unprobeable_server_is_skipped(self):
+        # 无法测速的配置服务器不探测、不计为劣化，也就不会被自动换掉
+        self.stampless.add("b")
+        mon = self.make()
+        for _ in range(5):
+            mon.run_round()
+        self.assertEqual(self.applied, [])
+        self.assertTrue(all("b" not in names for names in self.net.rounds))
+        self.assertEqual(sum("b 无法测速" in e for e in self.events), 1)
+
+    def test_window_hysteresis(self):
+        policy = HealthPolicy(max_latency=0.3, good_ratio=0.7, min_samples=2)
+        w = HealthWindow(4)
+        r = ProbeResult("x")
+        r.samples = [0.25, 0.25]
+        w.add(r)
+        # 介于两个阈值之间：既不算劣化，也不算可作为替换的健康候选
+        self.assertFalse(w.degraded(policy))
+        self.assertFalse(w.healthy(policy))
+
+
+if __name__ == "__main__":
+    unittest.main()
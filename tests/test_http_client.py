@@ -0,0 +1,110 @@
+import unittest
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from http_client import HttpClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    # 支持keep-alive；/flaky 前N次返回503
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        srv = self.server
+        srv.paths.append(self.path)
+        if self.path.startswith("/flaky") and srv.failures > 0:
+            srv.failures -= 1
+            status, body = 503, b"busy"
+        else:
+            status, body = 200, b"ok:" + self.path.encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.paths = []
+        self.server.failures = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.client = HttpClient()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keepalive_and_timings(self):
+        seen = []
+        self.client.listeners.append(seen.append)
+        self.client.get(self.base + "/a", timeout=5)
+        self.client.get(self.base + "/b", timeout=5)
+        first, second = self.client.recent()
+        self.assertFalse(first.reused)
+        self.assertGreater(first.connect, 0)
+        self.assertTrue(second.reused)
+        self.assertEqual(second.connect, 0)
+        self.assertEqual(second.status, 200)
+        self.assertGreaterEqual(second.total, second.first_byte)
+        self.assertEqual(seen, [first, second])
+        self.assertEqual(len(self.client.recent(host="127.0.0.1")), 2)
+
+    def test_prefix_rewrite(self):
+        r = self.client.get("x", prefix=self.base + "/proxy/", timeout=5)
+        self.assertEqual(r.text, "ok:/proxy/x")
+        self.client.proxy_prefix = self.base + "/p/"
+        self.assertEqual(self.client.get("y", timeout=5).text, "ok:/p/y")
+        self.assertEqual(self.client.rewrite("https://example.org/", proxied=False), "https://example.org/")
+
+    def test_retry_policy(self):
+        self.server.failures = 1
+        self.assertEqual(self.client.get(self.base + "/flaky", timeout=5).status_code, 200)
+        self.server.failures = 1
+        # 测速请求不重试
+        self.assertEqual(self.client.get(self.base + "/flaky", retry=False, timeout=5).status_code, 503)
+
+    def test_stream_total_recorded_on_close(self):
+        with self.client.get(self.base + "/s", stream=True, timeout=5) as r:
+            r.content
+            self.assertEqual(self.client.recent(), [])
+        self.assertEqual(len(self.client.recent()), 1)
+        self.assertIsNotNone(self.client.recent()[0].total)
+
+    def test_error_recorded(self):
+        with self.assertRaises(Exception):
+            self.client.get("http://127.0.0.1:1/", retry=False, timeout=1)
+        self.assertEqual(self.client.recent()[-1].error, "ConnectionError")
+
+    def test_failed_connect_tried_once_per_address(self):
+        # 建连失败时每个解析出的地址只连一次，不再按主机名重连（超时会翻倍）
+        calls = []
+        connect = socket.socket.connect
+
+        def counting(sock, address):
+            calls.append(address)
+            return connect(sock, address)
+
+        with mock.patch.object(socket.socket, "connect", counting):
+            for url in ("http://127.0.0.1:1/", "http://localhost:1/"):
+                calls.clear()
+                with self.assertRaises(Exception):
+                    self.client.get(url, retry=False, timeout=1)
+                self.assertTrue(calls)
+                self.assertEqual(len(calls), len(set(calls)), calls)
+        self.assertGreater(self.client.recent()[-1].dns, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
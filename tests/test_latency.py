@@ -0,0 +1,124 @@
+import unittest
+import asyncio
+import base64
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from latency import probe_all, rank, fastest, percentile
+from resolvers import Resolver
+
+
+def lp(s):
+    return bytes([len(s)]) + s.encode()
+
+
+def encode(raw):
+    return "sdns://" + base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+PROPS = (0).to_bytes(8, "little")
+
+
+def dnscrypt(addr):
+    return encode(b"\x01" + PROPS + lp(addr) + lp("k" * 32) + lp("2.dnscrypt-cert.local"))
+
+
+def doh(addr):
+    return encode(b"\x02" + PROPS + lp(addr) + b"\x00" + lp("localhost") + lp("/dns-query"))
+
+
+def doq(addr):
+    return encode(b"\x04" + PROPS + lp(addr) + b"\x00" + lp("localhost"))
+
+
+class StubDNS(asyncio.DatagramProtocol):
+    # 本地UDP替身：延迟后原样回显（ID一致即视为应答）
+    def __init__(self, delay):
+        self.delay = delay
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        asyncio.get_running_loop().call_later(self.delay, self.transport.sendto, data, addr)
+
+
+class StubQuic(asyncio.DatagramProtocol):
+    # 本地QUIC替身：对未知版本的长包头首包回复版本协商包（RFC 9000 §6），过短的包不回应
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 1200 or not data[0] & 0x80:
+            return
+        dcid = data[6:6 + data[5]]
+        rest = data[6 + data[5]:]
+        scid = rest[1:1 + rest[0]]
+        reply = b"\x80\x00\x00\x00\x00" + bytes([len(scid)]) + scid + bytes([len(dcid)]) + dcid + b"\x00\x00\x00\x01"
+        self.transport.sendto(reply, addr)
+
+
+class TestLatency(unittest.TestCase):
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        self.assertIsNone(percentile([], 95))
+
+    def test_probe_local_servers(self):
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            fast, _ = await loop.create_datagram_endpoint(lambda: StubDNS(0.0), local_addr=("127.0.0.1", 0))
+            slow, _ = await loop.create_datagram_endpoint(lambda: StubDNS(0.1), local_addr=("127.0.0.1", 0))
+            tcp = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+            fast_port = fast.get_extra_info("sockname")[1]
+            slow_port = slow.get_extra_info("sockname")[1]
+            tcp_port = tcp.sockets[0].getsockname()[1]
+            resolvers = [
+                Resolver("slow", stamps=[dnscrypt(f"127.0.0.1:{slow_port}")]),
+                Resolver("fast", stamps=[dnscrypt(f"127.0.0.1:{fast_port}")]),
+                Resolver("doh", stamps=[doh(f"127.0.0.1:{tcp_port}")]),
+                Resolver("dead", stamps=[dnscrypt("127.0.0.1:9")]),
+                Resolver("nostamp"),
+            ]
+            try:
+                return await probe_all(resolvers, attempts=3, concurrency=4, timeout=0.5)
+            finally:
+                fast.close()
+                slow.close()
+                tcp.close()
+                await tcp.wait_closed()
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(results["fast"].samples), 3)
+        self.assertGreaterEqual(results["slow"].min, 0.1)
+        self.assertTrue(results["doh"].ok)
+        self.assertFalse(results["dead"].ok)
+        self.assertEqual(results["nostamp"].failures, 3)
+        self.assertEqual([r.name for r in rank(results)][-2:], ["dead", "nostamp"])
+        self.assertIn(fastest(results, 2)[0], ("fast", "doh"))
+        self.assertNotIn("slow", fastest(results, 2))
+
+    def test_doq_probed_over_udp(self):
+        # DoQ 跑在UDP上：以版本协商包的往返计时，不能去连同端口的TCP而算成丢包
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            quic, _ = await loop.create_datagram_endpoint(StubQuic, local_addr=("127.0.0.1", 0))
+            port = quic.get_extra_info("sockname")[1]
+            try:
+                return await probe_all([Resolver("doq", stamps=[doq(f"127.0.0.1:{port}")]),
+                                        Resolver("doq-dead", stamps=[doq("127.0.0.1:9")])],
+                                       attempts=3, concurrency=4, timeout=0.5)
+            finally:
+                quic.close()
+
+        results = asyncio.run(scenario())
+        self.assertEqual(results["doq"].loss, 0.0)
+        self.assertEqual(len(results["doq"].samples), 3)
+        self.assertEqual(results["doq-dead"].loss, 1.0)
+        self.assertEqual(fastest(results, 1), ["doq"])
+
+
+if __name__ == "__main__":
+    unittest.main()
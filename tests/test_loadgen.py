@@ -0,0 +1,120 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+import socket
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from loadgen import run_load, sequence, load_corpus, parse_listen, listen_targets, compare, DEFAULT_CORPUS
+
+
+class StubResolver:
+    # 本地UDP替身：按域名首个标签决定应答，drop 不应答、fail 返回SERVFAIL、nx 返回NXDOMAIN，
+    # slow 等 50ms 再应答（逐个串行处理，相当于每秒只能应答20个）
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.names = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while not self.stopped.is_set():
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except socket.timeout:
+                continue
+            label = data[13:13 + data[12]].decode()
+            self.names.append(label)
+            if label == "drop":
+                continue
+            if label == "slow":
+                time.sleep(0.05)
+            rcode = {"fail": 2, "nx": 3}.get(label, 0)
+            reply = bytearray(data)
+            reply[2] |= 0x80
+            reply[3] = (reply[3] & 0xF0) | rcode
+            self.sock.sendto(bytes(reply), addr)
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.sock.close()
+
+
+class TestLoadgen(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubResolver()
+        self.target = ("127.0.0.1", self.stub.port)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.stub.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_counts_and_percentiles(self):
+        corpus = [("ok.test", "A"), ("nx.test", "A"), ("fail.test", "AAAA"), ("drop.test", "A")]
+        r = run_load(self.target, corpus, count=400, concurrency=32, timeout=0.3)
+        self.assertEqual(r.sent, 400)
+        self.assertEqual(r.answered, 300)
+        self.assertEqual(r.timeouts, 100)
+        self.assertEqual(r.errors, 100)
+        self.assertEqual(r.rcodes["NXDOMAIN"], 100)
+        d = r.to_dict()
+        self.assertLessEqual(d["p50_ms"], d["p95_ms"])
+        self.assertLessEqual(d["p95_ms"], d["p99_ms"])
+
+    def test_target_qps_is_respected(self):
+        r = run_load(self.target, count=100, qps=500, concurrency=8)
+        self.assertEqual(r.answered, 100)
+        self.assertGreater(r.duration, 0.18)
+        self.assertLess(r.throughput, 600)
+
+    def test_backlog_counts_in_latency(self):
+        # 目标200qps远超替身处理能力，并发2很快占满，后面的查询只能排队等发送：
+        # 延迟从计划发送时刻算起，分位数必须包含这段积压等待，而不只是50ms的应答时间
+        r = run_load(self.target, [("slow.test", "A")], count=20, qps=200, concurrency=2)
+        self.assertEqual(r.answered, 20)
+        self.assertGreater(r.late, 10)
+        self.assertGreater(r.pct(99), 600)
+        self.assertGreater(r.pct(50), 300)
+        self.assertIn("late", r.to_dict())
+
+    def test_replayable_sequence(self):
+        self.assertEqual(sequence(DEFAULT_CORPUS, 50, seed=7), sequence(DEFAULT_CORPUS, 50, seed=7))
+        self.assertNotEqual(sequence(DEFAULT_CORPUS, 50, seed=7), sequence(DEFAULT_CORPUS, 50, seed=8))
+        run_load(self.target, [("a.x", "A"), ("b.x", "A"), ("c.x", "A")], count=9, concurrency=1, seed=3)
+        first = list(self.stub.names)
+        self.stub.names.clear()
+        run_load(self.target, [("a.x", "A"), ("b.x", "A"), ("c.x", "A")], count=9, concurrency=1, seed=3)
+        self.assertEqual(self.stub.names, first)
+
+    def test_corpus_and_config(self):
+        path = os.path.join(self.temp_dir, "corpus.txt")
+        with open(path, "w") as f:
+            f.write("# 注释\nexample.com\nexample.org AAAA\n"
+                    "[2024-05-01 12:00:00]\t127.0.0.1\tlog.example\tMX\tPASS\t3ms\tquad9\n")
+        self.assertEqual(load_corpus(path), [("example.com", "A"), ("example.org", "AAAA"), ("log.example", "MX")])
+        self.assertEqual(parse_listen("[::1]:5353"), ("::1", 5353))
+        self.assertEqual(parse_listen("0.0.0.0:53"), ("127.0.0.1", 53))
+        cfg = os.path.join(self.temp_dir, "dnscrypt-proxy.toml")
+        with open(cfg, "w") as f:
+            f.write("listen_addresses = ['127.0.0.1:53', '[::1]:53']\n")
+        self.assertEqual(listen_targets(cfg), [("127.0.0.1", 53), ("::1", 53)])
+
+    def test_compare_table(self):
+        r = run_load(self.target, count=20)
+        lines = compare([("cache=512", r), ("cache=4096", r)])
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith("cache=512"))
+
+
+if __name__ == "__main__":
+    unittest.main()
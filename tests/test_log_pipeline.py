@@ -0,0 +1,62 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from log_pipeline import LogPipeline
+
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "logs", "gui.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_batched_from_many_threads(self):
+        batches = []
+        pipe = LogPipeline(self.path, capacity=1000, fps=20, console=False)
+        pipe.add_sink(batches.append)
+
+        def worker(n):
+            for i in range(2000):
+                pipe.write(f"t{n} {i}")
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        pipe.close()
+        # 8000行只触发少量批次，且环形缓冲保持上限
+        self.assertLess(len(batches), 20)
+        self.assertEqual(len(pipe.recent()), 1000)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(sum(1 for _ in f), 8000)
+
+    def test_rotation(self):
+        pipe = LogPipeline(self.path, max_bytes=2000, backups=2, console=False)
+        for i in range(500):
+            pipe.write("x" * 40)
+        time.sleep(0.3)
+        pipe.close()
+        names = sorted(os.listdir(os.path.dirname(self.path)))
+        self.assertEqual(names, ["gui.log", "gui.log.1", "gui.log.2"])
+        self.assertLess(os.path.getsize(self.path + ".1"), 4000)
+
+    def test_flush_on_close(self):
+        lines = []
+        pipe = LogPipeline(None, fps=1, console=False)
+        pipe.add_sink(lines.extend)
+        pipe.write("last words")
+        pipe.close()
+        self.assertTrue(lines[-1].endswith("last words"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import tempfile
+import os
+import sys
+import json
+import shutil
+import subprocess
+import threading
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from metrics import JsonlTrace, Profiler, Registry, breakdown, load_runs
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry(run_id="r1")
+
+    def test_span_nesting_and_attrs(self):
+        with self.registry.span("outer", url="u") as attrs:
+            with self.registry.span("inner"):
+                pass
+            self.registry.record("http.fetch", 0.0, 0.1, status=200)
+            attrs["bytes"] = 10
+        inner, fetch, outer = self.registry.recent()
+        self.assertEqual((inner["name"], inner.get("parent")), ("inner", "outer"))
+        self.assertEqual(fetch["parent"], "outer")
+        self.assertEqual(fetch["status"], 200)
+        self.assertNotIn("parent", outer)
+        self.assertEqual(outer["attrs"], {"url": "u", "bytes": 10})
+
+    def test_error_status(self):
+        with self.assertRaises(ValueError):
+            with self.registry.span("boom"):
+                raise ValueError("x")
+        with self.registry.span("soft") as attrs:
+            attrs["status"] = "failed"
+        boom, soft = self.registry.recent()
+        self.assertEqual((boom["status"], boom["error"]), ("error", "ValueError"))
+        self.assertEqual(soft["status"], "failed")
+        self.assertEqual(self.registry.spans["boom"]["errors"], 1)
+        self.assertEqual(self.registry.spans["soft"]["errors"], 1)
+
+    def test_thread_stacks_are_separate(self):
+        with self.registry.span("ui"):
+            t = threading.Thread(target=lambda: self.registry.mark("worker"))
+            t.start()
+            t.join()
+        self.assertNotIn("parent", self.registry.recent()[0])
+
+    def test_prometheus(self):
+        with self.registry.span("config.write"):
+            pass
+        self.registry.count("http_requests", host="a", result="ok")
+        self.registry.count("http_requests", 2, host="a", result="ok")
+        self.registry.count("http_requests", host='q"b', result="failed")
+        text = self.registry.prometheus()
+        self.assertIn('dnscrypt_gui_span_seconds_count{span="config.write"} 1', text)
+        self.assertIn("# TYPE dnscrypt_gui_span_seconds summary", text)
+        self.assertIn('dnscrypt_gui_http_requests_total{host="a",result="ok"} 3', text)
+        self.assertIn('dnscrypt_gui_http_requests_total{host="q\\"b",result="failed"} 1', text)
+        self.assertEqual(text.count("# TYPE dnscrypt_gui_http_requests_total counter"), 1)
+        self.assertTrue(text.endswith("\n"))
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "metrics", "trace.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_runs_and_breakdown(self):
+        trace = JsonlTrace(self.path, max_bytes=600)
+        for run_id in ("a", "b"):
+            registry = Registry(run_id=run_id)
+            registry.add_sink(trace)
+            for _ in range(2):
+                with registry.span("parse"):
+                    pass
+            registry.mark("first_paint")
+            registry.record("fetch", registry.origin, 0.5, status="failed")
+        trace.close()
+        # 超过上限时轮转到 .1，读取时两份一起读
+        self.assertTrue(os.path.exists(self.path + ".1"))
+        runs = load_runs(self.path)
+        self.assertEqual(list(runs), ["a", "b"])
+        self.assertEqual(len(runs["b"]), 4)
+        phases = breakdown(runs["b"])
+        self.assertEqual([p["name"] for p in phases], ["fetch", "parse"])
+        self.assertEqual((phases[0]["errors"], phases[1]["count"]), (1, 2))
+
+    def test_load_missing(self):
+        self.assertEqual(load_runs(self.path), {})
+
+
+class TestProfiler(unittest.TestCase):
+    def test_start_stop(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            profiler = Profiler()
+            self.assertEqual(profiler.stop(), "")
+            profiler.start()
+            self.assertTrue(profiler.active)
+            sorted(range(1000), key=str)
+            path = os.path.join(temp_dir, "p", "run.prof")
+            report = profiler.stop(path)
+            self.assertFalse(profiler.active)
+            self.assertIn("function calls", report)
+            self.assertTrue(os.path.exists(path))
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestCliExport(unittest.TestCase):
+    def test_textfile_and_trace(self):
+        home = tempfile.mkdtemp()
+        try:
+            config = os.path.join(home, "dnscrypt-proxy.toml")
+            with open(config, "w", encoding="utf-8") as f:
+                f.write("server_names = ['old']\n")
+            textfile = os.path.join(home, "textfile", "dnscrypt_gui.prom")
+            env = dict(os.environ, HOME=home, PYTHONPATH=SRC)
+            r = subprocess.run([sys.executable, "-m", "cli", "-q", "--config", config, "--textfile", textfile,
+                                "set-servers", "a"], capture_output=True, text=True, env=env, cwd=SRC, timeout=30)
+            self.assertEqual(r.returncode, 0, r.stderr)
+            with open(textfile, encoding="utf-8") as f:
+                text = f.read()
+            self.assertIn('dnscrypt_gui_span_seconds_count{span="config.write"} 1', text)
+            self.assertIn('dnscrypt_gui_span_seconds_count{span="cli.set-servers"} 1', text)
+            with open(os.path.join(home, ".dnscrypt_gui", "metrics", "trace.jsonl"), encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual([r["name"] for r in records], ["config.write", "cli.set-servers"])
+            self.assertEqual(records[0]["parent"], "cli.set-servers")
+        finally:
+            shutil.rmtree(home)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import tempfile
+import os
+import sys
+import time
+import shutil
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from proxy_manager import ProxyManager, ProxyScoreStore
+
+
+class FakeParent:
+    def __init__(self):
+        self.lines = []
+
+    def log(self, msg):
+        self.lines.append(msg)
+
+
+class FakeProxyManager(ProxyManager):
+    # 用固定延迟模拟各代理，None表示不可用
+    def __init__(self, parent, score_path, latencies):
+        super().__init__(parent, score_path)
+        self.latencies = latencies
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def probe_proxy(self, prefix):
+        with self.lock:
+            self.calls.append(prefix)
+        delay = self.latencies.get(prefix)
+        if delay is None:
+            time.sleep(0.05)
+            return None
+        time.sleep(delay)
+        return delay
+
+
+class TestProxyRace(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.score_path = os.path.join(self.temp_dir, "proxy_scores.json")
+        self.latencies = {
+            "https://gh-proxy.com/": None,
+            "https://gh.jasonzeng.dev/": 0.3,
+            "https://proxy.pipers.cn/": 0.02,
+            "https://hub.gitmirror.com/": None,
+            "https://dgithub.xyz/": 0.1,
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_race_picks_fastest(self):
+        pm = FakeProxyManager(FakeParent(), self.score_path, self.latencies)
+        start = time.monotonic()
+        self.assertTrue(pm.auto_detect())
+        # 并行探测，耗时应接近最快代理而非所有延迟之和
+        self.assertLess(time.monotonic() - start, 0.25)
+        self.assertEqual(pm.current_proxy, "https://proxy.pipers.cn/")
+
+    def test_winner_reused_on_next_launch(self):
+        pm = FakeProxyManager(FakeParent(), self.score_path, self.latencies)
+        pm.auto_detect()
+        time.sleep(0.4)  # 等待其余探测写入评分
+        pm2 = FakeProxyManager(FakeParent(), self.score_path, self.latencies)
+        self.assertEqual(pm2.scores.fresh_winner(), "https://proxy.pipers.cn/")
+        self.assertTrue(pm2.auto_detect())
+        self.assertEqual(pm2.current_proxy, "https://proxy.pipers.cn/")
+        self.assertIn("沿用上次代理", pm2.parent.lines[0])
+
+    def test_expired_winner_is_ignored(self):
+        store = ProxyScoreStore(self.score_path, ttl=0)
+        store.record("https://dgithub.xyz/", 0.1)
+        store.set_winner("https://dgithub.xyz/")
+        time.sleep(0.01)
+        self.assertIsNone(store.fresh_winner())
+
+    def test_recheck_switches_when_current_fails(self):
+        switched = []
+        pm = FakeProxyManager(FakeParent(), self.score_path, self.latencies)
+        pm.current_proxy = "https://gh-proxy.com/"
+        pm.recheck(list(self.latencies), on_switch=switched.append)
+        self.assertEqual(switched, ["https://proxy.pipers.cn/"])
+        self.assertEqual(pm.current_proxy, "https://proxy.pipers.cn/")
+
+    def test_ewma_and_failures(self):
+        store = ProxyScoreStore(self.score_path, alpha=0.5)
+        store.record("a", 1.0)
+        store.record("a", 0.0)
+        store.record("b", None)
+        self.assertAlmostEqual(store.data["proxies"]["a"]["ewma"], 0.5)
+        self.assertEqual(store.data["proxies"]["b"]["failures"], 1)
+        self.assertEqual(store.best(["a", "b"]), "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from query_log import LogTailer, OffsetStore, QueryStats, QueryLogMonitor, parse_query, parse_nx, make_watcher
+
+NOW = datetime(2024, 5, 1, 12, 0, 30).timestamp()
+
+
+def tsv(sec, qname, code="PASS", ms=12, server="cloudflare"):
+    return f"[2024-05-01 12:00:{sec:02d}]\t127.0.0.1\t{qname}\tA\t{code}\t{ms}ms\t{server}\n"
+
+
+class TestParse(unittest.TestCase):
+    def test_tsv(self):
+        e = parse_query(tsv(5, "example.com").rstrip("\n"))
+        self.assertEqual(e[1:], ("example.com", "A", "PASS", 12, "cloudflare", False))
+        self.assertEqual(e[0], datetime(2024, 5, 1, 12, 0, 5).timestamp())
+        self.assertTrue(parse_query(tsv(5, "a.com", ms=0, server="-").rstrip("\n"))[6])
+        self.assertIsNone(parse_query("garbage"))
+
+    def test_ltsv(self):
+        line = "time:1714564805\thost:127.0.0.1\tmessage:a.com\ttype:AAAA\treturn:SERVFAIL\tcached:0\tduration:30\tserver:quad9"
+        self.assertEqual(parse_query(line, "ltsv"), (1714564805.0, "a.com", "AAAA", "SERVFAIL", 30, "quad9", False))
+        self.assertEqual(parse_nx("time:1714564805\thost:127.0.0.1\tmessage:x.test\ttype:A", "ltsv"),
+                         (1714564805.0, "x.test"))
+
+
+class TestLogTailer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "query.log")
+        self.offsets = OffsetStore(os.path.join(self.temp_dir, "offsets.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def append(self, text, path=None):
+        with open(path or self.path, "a") as f:
+            f.write(text)
+
+    def test_incremental_and_partial_line(self):
+        self.append("old\n")
+        t = LogTailer(self.path, self.offsets)
+        self.assertEqual(t.poll(), [])  # 默认从文件末尾开始
+        self.append("a\nb\npart")
+        self.assertEqual(t.poll(), ["a", "b"])
+        self.append("ial\n")
+        self.assertEqual(t.poll(), ["partial"])
+        t.close()
+
+    def test_offset_survives_restart(self):
+        self.append("a\n")
+        t = LogTailer(self.path, self.offsets, from_end=False)
+        self.assertEqual(t.poll(), ["a"])
+        t.close()
+        self.offsets.save()
+        self.append("b\n")
+        t = LogTailer(self.path, OffsetStore(self.offsets.path))
+        self.assertEqual(t.poll(), ["b"])
+        t.close()
+
+    def test_rotation_reads_rest_of_old_file(self):
+        self.append("a\n")
+        t = LogTailer(self.path, self.offsets, from_end=False)
+        self.assertEqual(t.poll(), ["a"])
+        self.append("b\n")
+        os.rename(self.path, self.path + ".1")
+        self.append("c\n")
+        self.assertEqual(t.poll(), ["b", "c"])
+        t.close()
+
+    def test_truncation_restarts(self):
+        self.append("aaaa\nbbbb\n")
+        t = LogTailer(self.path, self.offsets, from_end=False)
+        t.poll()
+        with open(self.path, "w") as f:
+            f.write("c\n")
+        self.assertEqual(t.poll(), ["c"])
+        t.close()
+
+    def test_truncated_after_size_taken(self):
+        # 取得大小之后、读取之前被截断：不报错，下次轮询从头开始
+        self.append("aaaa\n")
+        t = LogTailer(self.path, self.offsets, from_end=False)
+        self.assertEqual(t.poll(), ["aaaa"])
+        self.append("bbbb\ncccc\n")
+        stale = os.path.getsize(self.path)
+        with open(self.path, "w") as f:
+            f.write("d\n")
+        self.assertEqual(t.read_chunk(stale), [])
+        self.assertEqual(t.poll(), ["d"])
+        t.close()
+
+    def test_large_backlog_read_in_chunks(self):
+        line = "x" * 99 + "\n"
+        self.append(line * 5000)
+        t = LogTailer(self.path, self.offsets, from_end=False, max_chunk=64 * 1024)
+        first = t.poll()
+        self.assertTrue(t.behind)
+        self.assertLess(len(first), 700)
+        total = len(first)
+        while t.behind:
+            total += len(t.poll())
+        total += len(t.poll())
+        self.assertEqual(total, 5000)
+        t.close()
+
+    def test_watcher_wakes_on_write(self):
+        w = make_watcher([self.temp_dir])
+        try:
+            self.append("a\n")
+            start = time.monotonic()
+            w.wait(0.5)
+            self.assertLess(time.monotonic() - start, 0.6)
+        finally:
+            w.close()
+
+
+class TestQueryStats(unittest.TestCase):
+    def test_aggregates_and_expiry(self):
+        now = [NOW]
+        stats = QueryStats(window=10, clock=lambda: now[0])
+        lines = [tsv(25, "a.com", ms=5), tsv(26, "a.com", ms=40), tsv(27, "b.com", code="SERVFAIL", ms=900, server="quad9"),
+                 tsv(28, "a.com", ms=0, server="-"), tsv(10, "old.com")]
+        stats.add_queries([parse_query(line.rstrip("\n")) for line in lines])
+        stats.add_nx([(NOW - 1, "b.com")])
+        snap = stats.snapshot()
+        self.assertEqual(snap["count"], 4)
+        self.assertAlmostEqual(snap["cache_ratio"], 0.25)
+        self.assertAlmostEqual(snap["error_rate"], 0.25)
+        by_name = {r["name"]: r for r in snap["resolvers"]}
+        self.assertEqual(by_name["cloudflare"]["count"], 2)
+        self.assertEqual(by_name["cloudflare"]["p50"], 5)
+        self.assertEqual(by_name["cloudflare"]["p95"], 50)
+        self.assertEqual(by_name["quad9"]["error_rate"], 1.0)
+        self.assertEqual(snap["domains"][0], ("a.com", 3, 0))
+        self.assertIn(("b.com", 1, 1), snap["domains"])
+        now[0] = NOW + 8
+        snap = stats.snapshot()
+        self.assertEqual(snap["count"], 1)
+        self.assertEqual([r["name"] for r in snap["resolvers"]], [])
+        now[0] = NOW + 20
+        snap = stats.snapshot()
+        self.assertEqual(snap["count"], 0)
+        self.assertEqual(snap["domains"], [])
+        self.assertEqual(stats.resolvers, {})
+
+    def test_monitor_feeds_stats(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            qpath = os.path.join(temp_dir, "query.log")
+            open(qpath, "w").close()
+            stats = QueryStats(window=60, clock=lambda: NOW)
+            mon = QueryLogMonitor(stats, qpath, None, interval=0.05)
+            mon.start()
+            time.sleep(0.1)
+            with open(qpath, "a") as f:
+                f.write(tsv(29, "a.com") * 3)
+            deadline = time.monotonic() + 3
+            while stats.snapshot()["count"] < 3 and time.monotonic() < deadline:
+                time.sleep(0.02)
+            mon.close()
+            self.assertEqual(stats.snapshot()["count"], 3)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
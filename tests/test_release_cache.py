@@ -0,0 +1,105 @@
+import unittest
+import tempfile
+import json
+import os
+import sys
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from release_cache import ReleaseCache, ReleaseIndex, asset_key
+from http_client import HttpClient
+
+
+def release(tag, platforms):
+    assets = []
+    for plat, ext in platforms:
+        name = f"dnscrypt-proxy-{plat}-{tag}.{ext}"
+        assets.append({"name": name, "browser_download_url": f"https://example.org/{name}", "digest": None, "size": 1})
+        assets.append({"name": name + ".minisig", "browser_download_url": "x", "digest": None, "size": 1})
+    return {"tag_name": tag, "prerelease": False, "draft": False, "assets": assets}
+
+
+RELEASES = [
+    release("2.1.6", [("win64", "zip")]),
+    release("2.1.5", [("linux_x86_64", "tar.gz"), ("win64", "zip"), ("macos_arm64", "zip")]),
+    release("2.1.4", [("linux_x86_64", "tar.gz"), ("linux_arm64", "tar.gz")]),
+]
+
+
+class ReleasesHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        srv = self.server
+        srv.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == '"r1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(RELEASES).encode()
+        self.send_response(200)
+        self.send_header("ETag", '"r1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReleaseIndex(unittest.TestCase):
+    def test_asset_key(self):
+        self.assertEqual(asset_key("dnscrypt-proxy-linux_x86_64-2.1.5.tar.gz"), ("linux", "x86_64", "tar.gz"))
+        self.assertEqual(asset_key("dnscrypt-proxy-win64-2.1.5.zip"), ("windows", "x86_64", "zip"))
+        self.assertEqual(asset_key("dnscrypt-proxy-macos_arm64-2.1.5.zip"), ("darwin", "arm64", "zip"))
+        self.assertIsNone(asset_key("dnscrypt-proxy-linux_x86_64-2.1.5.tar.gz.minisig"))
+
+    def test_lookup(self):
+        index = ReleaseIndex(RELEASES)
+        self.assertEqual(index.newest("Linux", "x86_64")["tag_name"], "2.1.5")
+        self.assertEqual(index.newest("Linux", "aarch64")["tag_name"], "2.1.4")
+        self.assertEqual(index.newest("Windows", "AMD64")["tag_name"], "2.1.6")
+        # macOS 只有zip包也能选中
+        self.assertEqual(index.asset(RELEASES[1], "Darwin", "arm64")["name"], "dnscrypt-proxy-macos_arm64-2.1.5.zip")
+        self.assertEqual([r["tag_name"] for r in index.installable("Linux", "amd64")], ["2.1.5", "2.1.4"])
+        self.assertIsNone(index.newest("Linux", "riscv64"))
+
+    def test_prerelease_skipped(self):
+        beta = dict(release("2.1.7-beta1", [("linux_x86_64", "tar.gz")]), prerelease=True)
+        draft = dict(release("2.1.8", [("linux_x86_64", "tar.gz")]), draft=True)
+        index = ReleaseIndex([draft, beta] + RELEASES)
+        self.assertEqual(index.newest("Linux", "x86_64")["tag_name"], "2.1.5")
+        self.assertEqual([r["tag_name"] for r in index.installable("Linux", "x86_64")], ["2.1.5", "2.1.4"])
+        self.assertEqual([r["tag_name"] for r in index.installable("Linux", "x86_64", prerelease=True)],
+                         ["2.1.7-beta1", "2.1.5", "2.1.4"])
+
+
+class TestReleaseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "releases_cache.json")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ReleasesHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/releases"
+        self.client = HttpClient()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_etag_revalidation(self):
+        releases = ReleaseCache(self.path, self.client, self.url, per_page=10).fetch()
+        self.assertEqual(len(releases), 3)
+        self.assertEqual(self.server.requests[0], ("/releases?per_page=10", None))
+        cache = ReleaseCache(self.path, self.client, self.url, per_page=10)
+        self.assertEqual(cache.fetch(), releases)
+        self.assertEqual(self.server.requests[1][1], '"r1"')
+        self.assertEqual(cache.index.newest("Linux", "x86_64")["tag_name"], "2.1.5")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from resolver_cache import ResolverCache
+from test_resolvers import SAMPLE
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    # 模拟镜像：支持ETag条件请求，并记录收到的请求头
+    def do_GET(self):
+        srv = self.server
+        srv.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == srv.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = srv.body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", srv.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestResolverCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.temp_dir, "resolvers_cache.json")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MirrorHandler)
+        self.server.body = SAMPLE
+        self.server.etag = '"v1"'
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.urls = [f"http://127.0.0.1:{self.server.server_port}/public-resolvers.md"]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_first_fetch_then_304(self):
+        status, index = ResolverCache(self.cache_path, self.urls).refresh()
+        self.assertEqual(status, "modified")
+        self.assertEqual(len(index), 3)
+        self.assertNotIn("If-None-Match", self.server.requests[0])
+
+        cache = ResolverCache(self.cache_path, self.urls)
+        cached = cache.load()
+        self.assertEqual([r.name for r in cached], [r.name for r in index])
+        self.assertEqual(cached.get("cloudflare").address, "1.0.0.1:443")
+        status, index = cache.refresh()
+        self.assertEqual(status, "not_modified")
+        self.assertIs(index, cached)
+        self.assertEqual(self.server.requests[-1]["If-None-Match"], '"v1"')
+
+    def test_new_content_replaces_cache(self):
+        ResolverCache(self.cache_path, self.urls).refresh()
+        self.server.etag = '"v2"'
+        self.server.body = SAMPLE.split("## adguard-dns")[0]
+        cache = ResolverCache(self.cache_path, self.urls)
+        cache.load()
+        status, index = cache.refresh()
+        self.assertEqual(status, "modified")
+        self.assertEqual(len(index), 2)
+        self.assertEqual(len(ResolverCache(self.cache_path, self.urls).load()), 2)
+
+    def test_same_content_new_etag_not_reparsed(self):
+        ResolverCache(self.cache_path, self.urls).refresh()
+        self.server.etag = '"v1-gzip"'
+        cache = ResolverCache(self.cache_path, self.urls)
+        cache.load()
+        status, _ = cache.refresh()
+        self.assertEqual(status, "not_modified")
+
+    def test_all_mirrors_down(self):
+        cache = ResolverCache(self.cache_path, ["http://127.0.0.1:1/none"])
+        status, index = cache.refresh(timeout=1)
+        self.assertEqual(status, "failed")
+        self.assertIsNone(index)
+
+    def test_cancelled_refresh_keeps_cache(self):
+        cancel = threading.Event()
+        cancel.set()
+        cache = ResolverCache(self.cache_path, self.urls)
+        status, index = cache.refresh(cancel=cancel)
+        self.assertEqual(status, "cancelled")
+        self.assertIsNone(index)
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(os.path.exists(self.cache_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import base64
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from resolvers import (
+    ResolverIndex, iter_resolvers, guess_country,
+    PROP_DNSSEC, PROP_NOLOG, PROP_NOFILTER,
+)
+
+
+def lp(s):
+    return bytes([len(s)]) + s.encode()
+
+
+def make_stamp(proto, props, addr):
+    raw = bytes([proto]) + props.to_bytes(8, "little") + lp(addr)
+    if proto == 0x01:
+        raw += lp("k" * 32) + lp("2.dnscrypt-cert.example")
+    elif proto == 0x02:
+        raw += b"\x00" + lp("dns.example.org") + lp("/dns-query")
+    return "sdns://" + base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+SAMPLE = f"""# public-resolvers
+
+This is an extensive list of public DNS resolvers.
+
+--
+
+## ams-dnscrypt-nl
+
+Resolver in Amsterdam. Dnscrypt protocol.
+Non-logging, non-filtering, DNSSEC.
+
+{make_stamp(0x01, PROP_DNSSEC | PROP_NOLOG | PROP_NOFILTER, "51.15.122.250:443")}
+
+## cloudflare
+
+Cloudflare DNS (anycast) - aka 1.1.1.1 / 1.0.0.1
+
+{make_stamp(0x02, PROP_DNSSEC | PROP_NOLOG, "1.0.0.1")}
+{make_stamp(0x02, PROP_DNSSEC | PROP_NOLOG, "[2606:4700::1111]")}
+
+## adguard-dns
+
+Remove ads and protect your computer from malware
+
+{make_stamp(0x01, PROP_DNSSEC, "94.140.14.14:5443")}
+
+## broken-entry
+
+No stamp at all
+"""
+
+
+class TestResolverParser(unittest.TestCase):
+    def setUp(self):
+        self.index = ResolverIndex(iter_resolvers(SAMPLE.splitlines()))
+
+    def test_parse_entries(self):
+        self.assertEqual([r.name for r in self.index], ["ams-dnscrypt-nl", "cloudflare", "adguard-dns"])
+        cf = self.index.get("cloudflare")
+        self.assertEqual(cf.protocol, "DoH")
+        self.assertEqual(len(cf.stamps), 2)
+        self.assertTrue(cf.nolog)
+        self.assertFalse(cf.nofilter)
+        self.assertIn("anycast", cf.description)
+        self.assertEqual(cf.address, "1.0.0.1:443")
+        self.assertEqual(cf.endpoints[1], ("2606:4700::1111", 443))
+
+    def test_parse_bytes_lines(self):
+        index = ResolverIndex(iter_resolvers(line.encode() for line in SAMPLE.splitlines()))
+        self.assertEqual(len(index), 3)
+
+    def test_filter(self):
+        names = lambda rs: [r.name for r in rs]
+        self.assertEqual(names(self.index.filter(proto="DNSCrypt")), ["ams-dnscrypt-nl", "adguard-dns"])
+        self.assertEqual(names(self.index.filter(nolog=True, nofilter=True)), ["ams-dnscrypt-nl"])
+        self.assertEqual(names(self.index.filter(nolog=False)), ["adguard-dns"])
+        self.assertEqual(names(self.index.filter(country="nl")), ["ams-dnscrypt-nl"])
+        self.assertEqual(names(self.index.filter(proto=0x02, dnssec=True)), ["cloudflare"])
+        self.assertEqual(self.index.filter(proto="DoT"), [])
+
+    def test_guess_country(self):
+        self.assertEqual(guess_country("dnscrypt.ca-1"), "CA")
+        self.assertEqual(guess_country("uncensoreddns-dk-ipv4"), "DK")
+        self.assertIsNone(guess_country("cloudflare"))
+
+
+if __name__ == "__main__":
+    unittest.main()
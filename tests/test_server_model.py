@@ -0,0 +1,54 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from PyQt5.QtCore import Qt
+
+from resolvers import ResolverIndex, iter_resolvers
+from server_model import ServerTableModel, ServerFilterProxy, COL_NAME, COL_LATENCY
+from latency import ProbeResult
+from test_resolvers import SAMPLE
+
+
+def probe(name, *samples):
+    r = ProbeResult(name)
+    r.samples.extend(samples)
+    r.failures = 0 if samples else 3
+    return r
+
+
+class TestServerModel(unittest.TestCase):
+    def setUp(self):
+        self.index = ResolverIndex(iter_resolvers(SAMPLE.splitlines()))
+        self.model = ServerTableModel()
+        self.proxy = ServerFilterProxy()
+        self.proxy.setSourceModel(self.model)
+        latency = {"cloudflare": probe("cloudflare", 0.01), "adguard-dns": probe("adguard-dns")}
+        self.model.set_servers(self.index, latency)
+
+    def test_default_all_selected_and_toggle(self):
+        self.assertEqual(self.model.selected_names(), ["ams-dnscrypt-nl", "cloudflare", "adguard-dns"])
+        self.model.setData(self.model.index(0, COL_NAME), Qt.Unchecked, Qt.CheckStateRole)
+        self.assertEqual(self.model.selected_names(), ["cloudflare", "adguard-dns"])
+
+    def test_sort_by_latency(self):
+        self.proxy.sort(COL_LATENCY, Qt.AscendingOrder)
+        names = [self.model.record(r).name for r in range(self.model.rowCount())]
+        # 已测速可用 < 超时 < 未测速
+        self.assertEqual(names, ["cloudflare", "adguard-dns", "ams-dnscrypt-nl"])
+        self.assertEqual(self.model.data(self.model.index(1, COL_LATENCY)), "超时")
+
+    def test_text_and_mask_filter(self):
+        self.proxy.set_text("ANYCAST")
+        self.assertEqual(self.proxy.visible_names(), ["cloudflare"])
+        self.proxy.set_text("")
+        self.proxy.set_mask(self.index.mask(proto="DNSCrypt"))
+        self.assertEqual(self.proxy.visible_names(), ["ams-dnscrypt-nl", "adguard-dns"])
+        self.model.set_all_checked(self.proxy.visible_names(), False)
+        self.assertEqual(self.model.selected_names(), ["cloudflare"])
+
+
+if __name__ == "__main__":
+    unittest.main()
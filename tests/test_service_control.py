@@ -0,0 +1,122 @@
+import unittest
+import tempfile
+import os
+import sys
+import shutil
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from service_control import ServiceController, parse_show, describe
+
+# 假的systemctl：动作写入调用日志并修改状态文件，show 按状态文件输出属性
+FAKE_SYSTEMCTL = r'''
+import os, sys, time
+state_dir = os.path.dirname(os.path.abspath(__file__))
+args = sys.argv[1:]
+with open(os.path.join(state_dir, "calls.log"), "a") as f:
+    f.write(" ".join(args) + "\n")
+state_file = os.path.join(state_dir, "state")
+state = open(state_file).read().strip() if os.path.exists(state_file) else "inactive"
+if args[0] == "show":
+    pid = "1234" if state == "active" else "0"
+    print(f"ActiveState={state}\nSubState={'running' if state == 'active' else 'dead'}\nMainPID={pid}")
+    sys.exit(0)
+time.sleep(float(os.environ.get("FAKE_DELAY", "0.2")))
+if args[0] == "fail":
+    print("Job failed", file=sys.stderr)
+    sys.exit(1)
+with open(state_file, "w") as f:
+    f.write("inactive" if args[0] == "stop" else "active")
+'''
+
+
+class TestServiceController(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.fake = os.path.join(self.temp_dir, "systemctl.py")
+        with open(self.fake, "w") as f:
+            f.write(FAKE_SYSTEMCTL)
+        self.results = []
+        self.statuses = []
+        self.done = threading.Event()
+
+        def on_result(action, ok, out, merged):
+            self.results.append((action, ok, merged))
+
+        self.ctl = ServiceController(
+            systemctl=(sys.executable, self.fake), show_cmd=(sys.executable, self.fake),
+            on_result=on_result, on_status=self.statuses.append, timeout=5, poll_interval=0.05,
+        )
+
+    def tearDown(self):
+        self.ctl.close()
+        shutil.rmtree(self.temp_dir)
+
+    def calls(self):
+        with open(os.path.join(self.temp_dir, "calls.log")) as f:
+            return [line.split()[0] for line in f]
+
+    def wait_idle(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while self.ctl.busy() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(self.ctl.busy())
+
+    def test_request_returns_immediately(self):
+        start = time.monotonic()
+        self.assertTrue(self.ctl.request("start"))
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.wait_idle()
+        self.assertEqual(self.results, [("start", True, 0)])
+        self.assertEqual(self.ctl.status["ActiveState"], "active")
+
+    def test_repeated_restarts_coalesce(self):
+        self.assertTrue(self.ctl.request("restart"))
+        self.assertTrue(self.ctl.request("restart"))
+        for _ in range(5):
+            self.assertFalse(self.ctl.request("restart"))
+        self.wait_idle()
+        self.assertEqual([c for c in self.calls() if c != "show"], ["restart", "restart"])
+        self.assertEqual(self.results[-1], ("restart", True, 5))
+
+    def test_last_action_wins(self):
+        self.ctl.request("start")
+        self.ctl.request("stop")
+        self.ctl.request("restart")
+        self.ctl.request("stop")
+        self.wait_idle()
+        self.assertEqual([c for c in self.calls() if c != "show"], ["start", "stop"])
+        self.assertEqual(self.ctl.status["ActiveState"], "inactive")
+
+    def test_same_start_while_running_dropped(self):
+        self.ctl.request("start")
+        self.assertFalse(self.ctl.request("start"))
+        self.wait_idle()
+        self.assertEqual([c for c in self.calls() if c != "show"], ["start"])
+
+    def test_failure_reported(self):
+        self.ctl.systemctl.append("fail")
+        self.ctl.request("stop")
+        self.wait_idle()
+        self.assertEqual(self.results, [("stop", False, 0)])
+
+    def test_polling_reports_changes_only(self):
+        self.ctl.start_polling()
+        time.sleep(0.3)
+        self.assertEqual(len(self.statuses), 1)
+        self.ctl.request("start")
+        self.wait_idle()
+        time.sleep(0.2)
+        self.assertEqual([s["ActiveState"] for s in self.statuses], ["inactive", "active"])
+
+    def test_parse_and_describe(self):
+        status = parse_show("ActiveState=active\nSubState=running\nMainPID=42\n")
+        self.assertEqual(status["MainPID"], "42")
+        self.assertEqual(describe(status), "运行中 (running) PID 42")
+        self.assertEqual(describe({}), "未知")
+
+
+if __name__ == "__main__":
+    unittest.main()
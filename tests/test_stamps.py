@@ -0,0 +1,71 @@
+import unittest
+import base64
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import stamps
+from stamps import decode_stamp, decode_batch
+
+
+def lp(s):
+    b = s if isinstance(s, bytes) else s.encode()
+    return bytes([len(b)]) + b
+
+
+def encode(raw):
+    return "sdns://" + base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+PROPS = (7).to_bytes(8, "little")
+DNSCRYPT = encode(b"\x01" + PROPS + lp("51.15.122.250:8443") + lp(b"\xaa" * 32) + lp("2.dnscrypt-cert.scaleway-fr"))
+DOH = encode(b"\x02" + PROPS + lp("") + b"\x81" + b"\x01" + b"\x02" + b"\x02\x03" + lp("dns.example.org") + lp("/dns-query"))
+DOT = encode(b"\x03" + (1).to_bytes(8, "little") + lp("[2620:fe::fe]") + b"\x00" + lp("dns.quad9.net"))
+RELAY = encode(b"\x81" + lp("146.70.48.5:443"))
+
+
+class TestStamps(unittest.TestCase):
+    def setUp(self):
+        stamps.clear_cache()
+
+    def test_dnscrypt(self):
+        st = decode_stamp(DNSCRYPT)
+        self.assertEqual(st.proto, 0x01)
+        self.assertEqual(st.props, 7)
+        self.assertEqual(st.endpoint(), ("51.15.122.250", 8443))
+        self.assertEqual(st.provider, "2.dnscrypt-cert.scaleway-fr")
+        self.assertEqual(st.hashes, (b"\xaa" * 32,))
+
+    def test_doh_vlp_hashes_and_hostname_fallback(self):
+        st = decode_stamp(DOH)
+        self.assertEqual(st.hashes, (b"\x01", b"\x02\x03"))
+        self.assertEqual(st.path, "/dns-query")
+        # 地址为空时使用hostname
+        self.assertEqual(st.endpoint(), ("dns.example.org", 443))
+
+    def test_dot_ipv6_default_port(self):
+        st = decode_stamp(DOT)
+        self.assertEqual(st.endpoint(), ("2620:fe::fe", 853))
+        self.assertEqual(st.hashes, ())
+
+    def test_relay(self):
+        st = decode_stamp(RELAY)
+        self.assertEqual(st.proto, 0x81)
+        self.assertEqual(st.endpoint(), ("146.70.48.5", 443))
+
+    def test_invalid(self):
+        self.assertIsNone(decode_stamp("sdns://!!!"))
+        self.assertIsNone(decode_stamp(encode(b"\x01" + PROPS + b"\x40abc")))
+        self.assertIsNone(decode_stamp("https://example.org"))
+
+    def test_memoized(self):
+        decode_batch([DNSCRYPT, DOH, DNSCRYPT])
+        decode_batch([DNSCRYPT, DOH])
+        info = decode_stamp.cache_info()
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.hits, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import tempfile
+import os
+import sys
+import json
+import shutil
+import subprocess
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from startup import Timeline, TaskGraph
+
+
+class TestTaskGraph(unittest.TestCase):
+    def test_independent_tasks_run_concurrently(self):
+        graph = TaskGraph(Timeline(start=time.monotonic()))
+        graph.add("a", lambda g: time.sleep(0.2) or "a")
+        graph.add("b", lambda g: time.sleep(0.2) or "b")
+        graph.add("c", lambda g: g.results["a"] + g.results["b"], deps=("a", "b"))
+        start = time.monotonic()
+        self.assertTrue(graph.run(timeout=5))
+        self.assertLess(time.monotonic() - start, 0.35)
+        self.assertEqual(graph.results["c"], "ab")
+        spans = {s["name"]: s for s in graph.timeline.spans}
+        self.assertGreaterEqual(spans["c"]["start"], max(spans["a"]["end"], spans["b"]["end"]))
+
+    def test_first_success_cancels_rival(self):
+        slow_started = threading.Event()
+
+        def fast(g):
+            time.sleep(0.05)
+            g.cancel("slow")
+            return "fast"
+
+        def gate(g):
+            time.sleep(0.1)
+
+        def slow(g):
+            slow_started.set()
+            return "slow"
+
+        graph = TaskGraph()
+        graph.add("fast", fast)
+        graph.add("gate", gate)
+        graph.add("slow", slow, deps=("gate",))
+        graph.add("join", lambda g: (g.results["fast"], g.results["slow"]), deps=("fast", "slow"))
+        self.assertTrue(graph.run(timeout=5))
+        self.assertFalse(slow_started.is_set())
+        self.assertEqual(graph.results["join"], ("fast", None))
+        self.assertIn(("slow", "cancelled"), [(s["name"], s["status"]) for s in graph.timeline.spans])
+
+    def test_error_does_not_block_dependents(self):
+        def boom(g):
+            raise RuntimeError("x")
+
+        graph = TaskGraph()
+        graph.add("boom", boom)
+        graph.add("after", lambda g: "boom" in g.errors, deps=("boom",))
+        self.assertTrue(graph.run(timeout=5))
+        self.assertIsInstance(graph.errors["boom"], RuntimeError)
+        self.assertTrue(graph.results["after"])
+
+    def test_blocked_task_does_not_hold_exit(self):
+        # 任务卡住（如等待输入）时 shutdown 取消其余任务，进程仍能正常退出
+        code = (
+            "import threading; from startup import TaskGraph; "
+            "g = TaskGraph(); g.add('stuck', lambda g: threading.Event().wait()); "
+            "g.add('after', lambda g: None, deps=('stuck',)); "
+            "print(g.run(timeout=0.2)); g.shutdown(cancel=True); print(g.cancelled('after'))"
+        )
+        env = dict(os.environ, PYTHONPATH=os.path.join(os.path.dirname(__file__), "..", "src"))
+        r = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, timeout=10)
+        self.assertEqual(r.returncode, 0, r.stderr)
+        self.assertEqual(r.stdout.split(), ["False", "True"])
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            TaskGraph().add("a", lambda g: None, deps=("missing",))
+
+
+class TestTimeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_marks_and_history(self):
+        tl = Timeline(start=time.monotonic())
+        with tl.span("load"):
+            pass
+        self.assertTrue(tl.mark("first_paint"))
+        self.assertFalse(tl.mark("first_paint"))
+        self.assertEqual(len(tl.summary()), 2)
+        path = os.path.join(self.temp_dir, "timings.jsonl")
+        for _ in range(5):
+            tl.save(path, keep=3)
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1]["spans"][0]["name"], "load")
+        self.assertIn("first_paint", rows[-1]["marks"])
+
+
+if __name__ == "__main__":
+    unittest.main()
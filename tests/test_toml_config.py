@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from toml_config import ConfigError, TomlConfig, apply_edits, open_config, tomllib
+
+SAMPLE = """# 顶部注释
+listen_addresses = ['127.0.0.1:53']  # 监听地址
+server_names = [
+  'a',  # 第一个
+  'b',
+]
+# cache_size = 4096
+
+[query_log]
+  # file = 'query.log'
+  format = 'tsv'
+
+[sources.public-resolvers]
+urls = ['https://example.com/a.md']
+"""
+
+
+class TestApplyEdits(unittest.TestCase):
+    def test_replace_multiline_array_keeps_comments(self):
+        out = apply_edits(SAMPLE, [("", "server_names", ["x", "y"])])
+        self.assertEqual(tomllib.loads(out)["server_names"], ["x", "y"])
+        self.assertIn("# 顶部注释", out)
+        self.assertIn("# 监听地址", out)
+        self.assertNotIn("第一个", out)
+
+    def test_commented_key_is_uncommented_in_place(self):
+        out = apply_edits(SAMPLE, [("", "cache_size", 1024)])
+        lines = out.splitlines()
+        self.assertEqual(lines[lines.index("# cache_size = 4096") + 1], "cache_size = 1024")
+        self.assertEqual(tomllib.loads(out)["cache_size"], 1024)
+
+    def test_new_top_level_key_goes_before_tables(self):
+        out = apply_edits(SAMPLE, [("", "ipv6_servers", False)])
+        data = tomllib.loads(out)
+        self.assertIs(data["ipv6_servers"], False)
+        self.assertNotIn("ipv6_servers", data["query_log"])
+        self.assertNotIn("ipv6_servers", data["sources"]["public-resolvers"])
+
+    def test_top_level_key_without_top_level_entries(self):
+        out = apply_edits("[query_log]\nformat = 'tsv'\n", [("", "server_names", ["a"])])
+        self.assertTrue(out.startswith("server_names"))
+        self.assertEqual(tomllib.loads(out)["query_log"], {"format": "tsv"})
+
+    def test_table_keys_and_new_table(self):
+        out = apply_edits(SAMPLE, [
+            ("query_log", "file", "/var/log/q.log"),
+            ("sources.public-resolvers", "refresh_delay", 72),
+            ("blocked_names", "blocked_names_file", "blocked.txt"),
+        ])
+        data = tomllib.loads(out)
+        self.assertEqual(data["query_log"], {"file": "/var/log/q.log", "format": "tsv"})
+        self.assertEqual(data["sources"]["public-resolvers"]["refresh_delay"], 72)
+        self.assertEqual(data["blocked_names"]["blocked_names_file"], "blocked.txt")
+
+    def test_unchanged_text_round_trips(self):
+        self.assertEqual(apply_edits(SAMPLE, []), SAMPLE)
+
+
+class TestTomlConfig(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "dnscrypt-proxy.toml"
+        self.path.write_text(SAMPLE, encoding="utf-8")
+        os.chmod(self.path, 0o640)
+        self.cfg = TomlConfig(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_transaction_writes_once(self):
+        with mock.patch.object(self.cfg, "write_atomic", wraps=self.cfg.write_atomic) as w:
+            with self.cfg.transaction() as tx:
+                tx.set("server_names", ["c"])
+                tx.set("cache_size", 512)
+                tx.set("format", "ltsv", table="query_log")
+        self.assertEqual(w.call_count, 1)
+        data = tomllib.loads(self.path.read_text(encoding="utf-8"))
+        self.assertEqual(data["server_names"], ["c"])
+        self.assertEqual(data["cache_size"], 512)
+        self.assertEqual(data["query_log"]["format"], "ltsv")
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+
+    def test_failed_transaction_writes_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with self.cfg.transaction() as tx:
+                tx.set("server_names", ["c"])
+                raise RuntimeError
+        self.assertEqual(self.path.read_text(encoding="utf-8"), SAMPLE)
+
+    def test_load_is_cached_until_file_changes(self):
+        self.cfg.load()
+        with mock.patch("toml_config.tomllib.loads", side_effect=AssertionError) as loads:
+            self.assertEqual(self.cfg.get("format", table="query_log"), "tsv")
+            loads.assert_not_called()
+        self.path.write_text(SAMPLE + "\n[extra]\nk = 1\n", encoding="utf-8")
+        self.assertEqual(self.cfg.get("k", table="extra"), 1)
+
+    def test_write_failure_keeps_original(self):
+        with mock.patch("toml_config.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.cfg.update({"server_names": ["c"]})
+        self.assertEqual(self.path.read_text(encoding="utf-8"), SAMPLE)
+        self.assertEqual([p.name for p in self.path.parent.iterdir()], [self.path.name])
+
+    def test_unsupported_value_rejected(self):
+        with self.assertRaises(ConfigError):
+            self.cfg.update({"server_names": object()})
+        self.assertEqual(self.path.read_text(encoding="utf-8"), SAMPLE)
+
+    def test_open_config_shares_instance(self):
+        self.assertIs(open_config(self.path), open_config(str(self.path)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import tempfile
+import io
+import os
+import sys
+import shutil
+import tarfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from version_store import VersionStore
+
+
+def make_archive(path, binary):
+    # 模拟官方发布包结构：linux-x86_64/ 下的可执行文件与公共文件
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in (("linux-x86_64/dnscrypt-proxy", binary),
+                           ("linux-x86_64/LICENSE", b"ISC license\n"),
+                           ("linux-x86_64/example-dnscrypt-proxy.toml", b"server_names = []\n")):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+class TestVersionStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.active = self.temp_dir / "dnscrypt-proxy"
+        self.store = VersionStore(self.temp_dir / "store", self.active)
+        self.v1 = self.temp_dir / "v1.tar.gz"
+        self.v2 = self.temp_dir / "v2.tar.gz"
+        make_archive(self.v1, b"binary-2.1.4")
+        make_archive(self.v2, b"binary-2.1.5")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_add_dedupes_identical_files(self):
+        k1 = self.store.add("2.1.4", self.v1)
+        k2 = self.store.add("2.1.5", self.v2)
+        self.assertEqual(self.store.list_versions(), sorted([k1, k2]))
+        lic1 = self.store.path(k1) / "linux-x86_64" / "LICENSE"
+        lic2 = self.store.path(k2) / "linux-x86_64" / "LICENSE"
+        self.assertEqual(lic1.stat().st_ino, lic2.stat().st_ino)
+        bin1 = self.store.binary(k1)
+        self.assertTrue(os.access(bin1, os.X_OK))
+        self.assertNotEqual(bin1.stat().st_ino, self.store.binary(k2).stat().st_ino)
+        # 重复入库直接返回已有版本
+        self.assertEqual(self.store.add("2.1.4", self.v1), k1)
+
+    def test_activate_and_rollback(self):
+        k1 = self.store.add("2.1.4", self.v1)
+        k2 = self.store.add("2.1.5", self.v2)
+        self.store.activate(k1)
+        self.store.activate(k2)
+        self.assertTrue(self.active.is_symlink())
+        self.assertEqual(self.store.current(), k2)
+        self.assertEqual(self.store.binary().read_bytes(), b"binary-2.1.5")
+        self.assertEqual(self.store.rollback(), k1)
+        self.assertEqual(self.store.binary().read_bytes(), b"binary-2.1.4")
+        self.assertEqual(self.store.find_tag("2.1.5"), k2)
+        self.assertIsNone(self.store.find_tag("2.0.0"))
+
+    def test_legacy_install_dir_is_kept(self):
+        self.active.mkdir()
+        (self.active / "dnscrypt-proxy.toml").write_text("x", encoding="utf-8")
+        self.store.activate(self.store.add("2.1.4", self.v1))
+        self.assertTrue(self.active.is_symlink())
+        self.assertTrue((self.temp_dir / "dnscrypt-proxy.old" / "dnscrypt-proxy.toml").exists())
+
+    def test_copy_mode_without_symlinks(self):
+        # Windows 下不建符号链接：复制成真实目录后改名换入
+        store = VersionStore(self.temp_dir / "store", self.active, symlinks=False)
+        k1 = store.add("2.1.4", self.v1)
+        k2 = store.add("2.1.5", self.v2)
+        store.activate(k1)
+        store.activate(k2)
+        self.assertTrue(self.active.is_dir())
+        self.assertFalse(self.active.is_symlink())
+        self.assertEqual(store.current(), k2)
+        self.assertEqual(store.binary().read_bytes(), b"binary-2.1.5")
+        self.assertTrue(os.access(store.binary(), os.W_OK))
+        self.assertEqual(store.rollback(), k1)
+        self.assertEqual(store.binary().read_bytes(), b"binary-2.1.4")
+        # 只留下当前目录，没有残留的临时目录，也不会把自己的复制目录当成旧式安装备份
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir() if p.name.startswith((".", "dnscrypt"))),
+                         ["dnscrypt-proxy"])
+        # 之后换回符号链接模式也能替换掉复制目录
+        self.store.activate(k2)
+        self.assertTrue(self.active.is_symlink())
+        self.assertEqual(self.store.current(), k2)
+
+    def test_symlink_failure_falls_back_to_copy(self):
+        key = self.store.add("2.1.4", self.v1)
+        with mock.patch("version_store.os.symlink", side_effect=OSError("symlinks not permitted")):
+            self.store.activate(key)
+        self.assertFalse(self.active.is_symlink())
+        self.assertEqual(self.store.current(), key)
+        self.assertEqual(self.store.binary().read_bytes(), b"binary-2.1.4")
+
+    def test_broken_archive_leaves_no_version(self):
+        bad = self.temp_dir / "bad.tar.gz"
+        bad.write_bytes(b"not a tarball")
+        with self.assertRaises(Exception):
+            self.store.add("2.1.6", bad)
+        self.assertEqual(self.store.list_versions(), [])
+        self.assertEqual(list(self.store.versions.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()